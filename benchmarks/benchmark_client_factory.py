@@ -0,0 +1,72 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+"""
+Compares the time to construct the Fraud Detector clients of a deploy with a number of rules, creating a client per
+object as before, against the shared client factory.
+
+    export PYTHONPATH=./src
+    python ./benchmarks/benchmark_client_factory.py --rules 10
+"""
+
+import argparse
+import time
+
+import boto3
+from core.client_factory import ClientFactory
+
+
+def construct_per_object(num_clients, region_name):
+    # A fresh session, like the boto3 default session of a new process
+    session = boto3.session.Session()
+    for _ in range(num_clients):
+        session.client('frauddetector', region_name=region_name)
+
+
+def construct_shared(num_clients, region_name):
+    factory = ClientFactory(session=boto3.session.Session())
+    for _ in range(num_clients):
+        # Every object gets a lazy proxy, and the first call builds the single shared client
+        factory.lazy_client('frauddetector', region_name=region_name).meta
+
+
+def benchmark(func, num_clients, region_name, repeat):
+    timings = []
+    for _ in range(repeat):
+        stime = time.perf_counter()
+        func(num_clients, region_name)
+        timings.append(time.perf_counter() - stime)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", help="Number of rules in the deploy", default=10, type=int)
+    parser.add_argument("--repeat", help="Number of times to repeat each measurement", default=3, type=int)
+    parser.add_argument("--region", help="AWS region", default="us-east-1")
+    args = parser.parse_args()
+
+    # The deployer, its utils and the utils of each rule each built a client
+    num_clients = 2 + args.rules
+
+    per_object = benchmark(construct_per_object, num_clients, args.region, args.repeat)
+    shared = benchmark(construct_shared, num_clients, args.region, args.repeat)
+
+    print("Clients requested: {}".format(num_clients))
+    print("Client per object : {:8.1f} ms".format(per_object * 1000))
+    print("Shared factory    : {:8.1f} ms".format(shared * 1000))
+    print("Speed up          : {:8.1f}x".format(per_object / shared))
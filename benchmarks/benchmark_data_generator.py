@@ -0,0 +1,64 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+"""
+Reports the rows per second of the DemoDataTransformer synthetic data generators, for each column and for the whole
+dataset.
+
+    export PYTHONPATH=./src
+    python ./benchmarks/benchmark_data_generator.py --rows 1000000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+from main_demo_data_transformer import DemoDataTransformer, FRAUD_DETECTOR_MANDATORY_LABEL, \
+    FRAUD_DETECTOR_MANDATORY_TIMESTAMP
+
+GENERATORS = [("generate_binary_label", FRAUD_DETECTOR_MANDATORY_LABEL),
+              ("generate_random_date", FRAUD_DETECTOR_MANDATORY_TIMESTAMP),
+              ("generate_random_email", "email"),
+              ("generate_random_ip", "ip")]
+
+
+def benchmark(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        stime = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - stime)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", help="Number of rows to generate", default=1000000, type=int)
+    parser.add_argument("--repeat", help="Number of times to repeat each measurement", default=3, type=int)
+    parser.add_argument("--seed", help="Seed for the random data", default=0, type=int)
+    args = parser.parse_args()
+
+    transformer = DemoDataTransformer(seed=args.seed)
+
+    print("{:<25} {:>10} {:>15}".format("generator", "seconds", "rows/second"))
+    for generator, column in GENERATORS:
+        seconds = benchmark(lambda: getattr(transformer, generator)(pd.DataFrame(index=range(args.rows)), column),
+                            args.repeat)
+        print("{:<25} {:>10.3f} {:>15,.0f}".format(generator, seconds, args.rows / seconds))
+
+    seconds = benchmark(lambda: transformer.generate_random_data(args.rows), args.repeat)
+    print("{:<25} {:>10.3f} {:>15,.0f}".format("generate_random_data", seconds, args.rows / seconds))
@@ -0,0 +1,256 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+"""
+Runs the demo train, deploy and undeploy flows against the in memory fake Fraud Detector client, varying the number
+of columns, rules, models and detector versions, and reports the wall time, API calls by operation and peak memory
+of each flow.
+
+    export PYTHONPATH=./src:.
+    python ./benchmarks/benchmark_flows.py
+    # save the results as the baseline
+    python ./benchmarks/benchmark_flows.py --save-baseline
+    # compare against the baseline, exits with an error on a regression
+    python ./benchmarks/benchmark_flows.py --compare
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from core.api_metrics import default_api_metrics
+from core.client_factory import configure_rate_limits, default_client_factory
+from core.fraud_detector_metadata_cache import METADATA_CACHE_DIR_ENV
+from core.fraud_detector_reconciler import FraudDetectorReconciler
+from main_demo_fraud_detector_deploy import MODEL_TYPE_ONLINE_FRAUD_INSIGHTS, FRAUD_DETECTOR_RULE_MATCH_METHOD
+from main_demo_fraud_detector_deploy import deploy
+from main_demo_fraud_detector_train import EVENT_TYPE_NAME, train
+from main_demo_fraud_detector_undeploy import undeploy
+from rules.detector_rule_model_score_positive import DetectorRuleModelScorePositive
+from tests.fakes.fake_fraud_detector_client import FakeFraudDetectorClient
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline_flows.json")
+
+DETECTOR_NAME = "benchmarkdetector"
+
+BASE_SCENARIO = {"columns": 10, "rules": 1, "models": 1, "history": 0}
+
+# Each dimension is varied on its own from the base scenario
+SCENARIO_DIMENSIONS = {"columns": [10, 100, 500],
+                       "rules": [1, 10, 50],
+                       "models": [1, 3, 5],
+                       "history": [0, 10, 50]}
+
+# Wall time regressions within this ratio of the baseline, or within this many seconds, are treated as noise
+DEFAULT_WALL_TIME_TOLERANCE = 0.25
+MIN_WALL_TIME_REGRESSION_SECONDS = 0.05
+
+
+def scenarios():
+    result = []
+    for dimension, values in SCENARIO_DIMENSIONS.items():
+        for value in values:
+            scenario = dict(BASE_SCENARIO, **{dimension: value})
+            if scenario not in result:
+                result.append(scenario)
+    return result
+
+
+def scenario_name(scenario):
+    return "columns={columns},rules={rules},models={models},history={history}".format(**scenario)
+
+
+def write_sample_data(path, num_columns, num_rows=100, seed=0):
+    """
+    Writes a sample data file with the label and timestamp columns, and num_columns feature columns of mixed types
+    """
+    rnd = random.Random(seed)
+    columns = {"EVENT_LABEL": [rnd.randint(0, 1) for _ in range(num_rows)],
+               "EVENT_TIMESTAMP": ["2020-01-{:02d} 00:00:00".format(1 + i % 28) for i in range(num_rows)]}
+    for c in range(num_columns):
+        kind = c % 4
+        if kind == 0:
+            values = [round(rnd.uniform(0, 1000), 2) for _ in range(num_rows)]
+        elif kind == 1:
+            values = ["user{}@example.com".format(rnd.randint(0, 10 ** 6)) for _ in range(num_rows)]
+        elif kind == 2:
+            values = ["10.{}.{}.{}".format(rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255))
+                      for _ in range(num_rows)]
+        else:
+            values = [rnd.choice(["red", "green", "blue", "amber"]) for _ in range(num_rows)]
+        columns["feature_{}".format(c)] = values
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+
+def model_versions(model_names):
+    return [{"modelId": name, "modelDescription": "Benchmark model", "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+             "modelVersionNumber": "1.0"} for name in model_names]
+
+
+def deploy_rules(model_names, num_rules, threshold_offset=0):
+    return [DetectorRuleModelScorePositive(rule_id="positivescorerule{}".format(i),
+                                           model_name=model_names[i % len(model_names)],
+                                           threshold=900 + i + threshold_offset) for i in range(num_rules)]
+
+
+def run_deploy(model_names, num_rules, threshold_offset=0):
+    if len(model_names) == 1 and num_rules == 1 and threshold_offset == 0:
+        # The demo deploy, a single model with a single rule
+        deploy(model_name=model_names[0], model_version="1.0", detector_name=DETECTOR_NAME,
+               detector_description="Benchmark detector", model_description="Benchmark model",
+               event_name=EVENT_TYPE_NAME)
+    else:
+        # The demo deploy, with more models and rules
+        FraudDetectorReconciler().deploy(detector_name=DETECTOR_NAME, detector_description="Benchmark detector",
+                                         event_type_name=EVENT_TYPE_NAME,
+                                         detector_rules=deploy_rules(model_names, num_rules, threshold_offset),
+                                         rule_execution_mode=FRAUD_DETECTOR_RULE_MATCH_METHOD,
+                                         model_versions=model_versions(model_names))
+
+
+def measure(client, func):
+    """
+    Runs func and returns its wall time, API calls by operation and peak traced memory
+    """
+    client.call_counts.clear()
+    tracemalloc.start()
+    stime = time.perf_counter()
+    func()
+    wall_time = time.perf_counter() - stime
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wallTimeSeconds": round(wall_time, 4),
+            "apiCalls": sum(client.call_counts.values()),
+            "apiCallsByOperation": dict(sorted(client.call_counts.items())),
+            "peakMemoryBytes": peak_memory}
+
+
+def run_scenario(scenario, latency, seed, work_dir):
+    client = FakeFraudDetectorClient(latency=latency, seed=seed)
+    default_client_factory.register_client(client)
+    default_api_metrics.reset()
+    try:
+        sample_data = os.path.join(work_dir, "sample_{}.csv".format(scenario["columns"]))
+        if not os.path.exists(sample_data):
+            write_sample_data(sample_data, scenario["columns"], seed=seed)
+        model_names = ["benchmarkmodel{}".format(i) for i in range(scenario["models"])]
+
+        def train_models():
+            # The demo train prints the model version for the build, so keep it out of the results
+            for name in model_names:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    train(model_name=name, s3uri="s3://benchmark/train.csv", sample_data=sample_data, wait=True,
+                          role="arn:aws:iam::111111111111:role/benchmark")
+
+        # Older detector versions, left behind by previous deploys with different thresholds
+        def deploy_history():
+            for i in range(scenario["history"]):
+                run_deploy(model_names, scenario["rules"], threshold_offset=i + 1)
+
+        def undeploy_all():
+            undeploy(detector_name=DETECTOR_NAME)
+            for name in model_names:
+                undeploy(model_name=name, model_version="1.0")
+
+        result = {"train": measure(client, train_models)}
+        deploy_history()
+        result["deploy"] = measure(client, lambda: run_deploy(model_names, scenario["rules"]))
+        result["redeploy"] = measure(client, lambda: run_deploy(model_names, scenario["rules"]))
+        result["undeploy"] = measure(client, undeploy_all)
+        return result
+    finally:
+        default_client_factory.unregister_client()
+
+
+def compare(results, baseline, wall_time_tolerance):
+    """
+    Returns the regressions against the baseline, more API calls or a slower wall time
+    """
+    regressions = []
+    for name, flows in results.items():
+        for flow, measured in flows.items():
+            expected = baseline.get(name, {}).get(flow)
+            if expected is None:
+                continue
+            if measured["apiCalls"] > expected["apiCalls"]:
+                regressions.append("{} {}: {} API calls, baseline {}".format(name, flow, measured["apiCalls"],
+                                                                             expected["apiCalls"]))
+            if measured["wallTimeSeconds"] > expected["wallTimeSeconds"] * (1 + wall_time_tolerance) \
+                    and measured["wallTimeSeconds"] - expected["wallTimeSeconds"] > MIN_WALL_TIME_REGRESSION_SECONDS:
+                regressions.append("{} {}: {:.3f}s, baseline {:.3f}s".format(name, flow, measured["wallTimeSeconds"],
+                                                                            expected["wallTimeSeconds"]))
+    return regressions
+
+
+def print_results(results):
+    print("{:<45} {:<9} {:>9} {:>9} {:>12}".format("scenario", "flow", "wall (s)", "API calls", "peak (KiB)"))
+    for name, flows in results.items():
+        for flow, measured in flows.items():
+            print("{:<45} {:<9} {:>9.3f} {:>9} {:>12.1f}".format(name, flow, measured["wallTimeSeconds"],
+                                                                 measured["apiCalls"],
+                                                                 measured["peakMemoryBytes"] / 1024))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", help="Seconds each fake API call takes", default=0.002, type=float)
+    parser.add_argument("--rate", help="Calls per second allowed per operation by the client rate limiter",
+                        default=10000, type=float)
+    parser.add_argument("--seed", help="Random seed", default=0, type=int)
+    parser.add_argument("--output", help="The JSON file to write the results to", default=None)
+    parser.add_argument("--save-baseline", help="Save the results as the baseline", action="store_true")
+    parser.add_argument("--compare", help="Compare the results against the baseline", action="store_true")
+    parser.add_argument("--wall-time-tolerance", help="Allowed wall time increase over the baseline, as a ratio",
+                        default=DEFAULT_WALL_TIME_TOLERANCE, type=float)
+    args = parser.parse_args()
+
+    # Measure the flows without the metadata cache of previous runs
+    os.environ.pop(METADATA_CACHE_DIR_ENV, None)
+    configure_rate_limits(default_rate=args.rate, max_rate=args.rate)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for s in scenarios():
+            results[scenario_name(s)] = run_scenario(s, args.latency, args.seed, work_dir)
+
+    print_results(results)
+    report = {"latencySeconds": args.latency, "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Saved baseline to {}".format(BASELINE_FILE))
+
+    if args.compare:
+        with open(BASELINE_FILE) as f:
+            baseline_results = json.load(f)["results"]
+        found_regressions = compare(results, baseline_results, args.wall_time_tolerance)
+        for r in found_regressions:
+            print("REGRESSION {}".format(r))
+        sys.exit(1 if found_regressions else 0)
@@ -12,8 +12,9 @@ virtualenv -p python3 $VIRTUAL_ENV
 pip install -r tests/requirements.txt
 pip install -r src/requirements.txt
 
-#Run tests
+#Run tests, without the metadata cache kept between builds
 export PYTHONPATH=./src
+unset FRAUD_DETECTOR_METADATA_CACHE_DIR
 pytest --tb=short
 
 #Run pyflakes to detect any import / syntax issues
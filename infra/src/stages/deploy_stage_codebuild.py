@@ -118,5 +118,6 @@ class DeployStageCodeBuild(DeployStageBase):
                 environment=aws_codebuild.BuildEnvironment(
                     build_image=aws_codebuild.LinuxBuildImage.from_code_build_image_id(build_image),
                     privileged=True),
-                build_spec=aws_codebuild.BuildSpec.from_source_filename(buildspec_file)
+                build_spec=aws_codebuild.BuildSpec.from_source_filename(buildspec_file),
+                cache=aws_codebuild.Cache.local(aws_codebuild.LocalCacheMode.CUSTOM)
             )
@@ -173,5 +173,6 @@ class TrainStageCodeBuildLongPolling(TrainStageBase):
             environment=aws_codebuild.BuildEnvironment(
                 build_image=aws_codebuild.LinuxBuildImage.from_code_build_image_id(build_image),
                 privileged=True),
-            build_spec=aws_codebuild.BuildSpec.from_source_filename(buildspec_file)
+            build_spec=aws_codebuild.BuildSpec.from_source_filename(buildspec_file),
+            cache=aws_codebuild.Cache.local(aws_codebuild.LocalCacheMode.CUSTOM)
         )
@@ -0,0 +1,281 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import json
+import logging
+import threading
+import time
+
+import botocore
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+THROTTLING_ERROR_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException",
+                          "RequestLimitExceeded", "ProvisionedThroughputExceededException"}
+
+PROMETHEUS_METRIC_PREFIX = "frauddetector_api"
+
+
+class ApiMetrics:
+    """
+    Thread safe per operation call counts, latency histograms, retries, throttles and bytes transferred of the
+    AWS API calls made through an InstrumentedClient
+    """
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        """
+        :param latency_buckets: Sorted upper bounds, in seconds, of the latency histogram buckets
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def _operation(self, service_name, operation_name):
+        key = (service_name, operation_name)
+        if key not in self._operations:
+            self._operations[key] = {"calls": 0,
+                                     "errors": 0,
+                                     "retries": 0,
+                                     "throttles": 0,
+                                     "bytesSent": 0,
+                                     "bytesReceived": 0,
+                                     "latencySumSeconds": 0.0,
+                                     "latencyMaxSeconds": 0.0,
+                                     "latencyBuckets": [0] * (len(self.latency_buckets) + 1)}
+        return self._operations[key]
+
+    def record_call(self, service_name, operation_name, duration, retries=0, error_code=None):
+        """
+        Records a completed call, including all of its retries
+        :param service_name: e.g. frauddetector
+        :param operation_name: The client method name, e.g. get_rules
+        :param duration: The wall clock seconds the caller waited for the call
+        :param retries: The number of retries made by the client
+        :param error_code: The error code if the call failed
+        """
+        bucket = len(self.latency_buckets)
+        for i, upper_bound in enumerate(self.latency_buckets):
+            if duration <= upper_bound:
+                bucket = i
+                break
+
+        with self._lock:
+            operation = self._operation(service_name, operation_name)
+            operation["calls"] += 1
+            operation["retries"] += retries
+            operation["latencySumSeconds"] += duration
+            operation["latencyMaxSeconds"] = max(operation["latencyMaxSeconds"], duration)
+            operation["latencyBuckets"][bucket] += 1
+            if error_code is not None:
+                operation["errors"] += 1
+
+    def record_throttle(self, service_name, operation_name):
+        """
+        Records a throttled attempt, whether or not the client retried it
+        """
+        with self._lock:
+            self._operation(service_name, operation_name)["throttles"] += 1
+
+    def record_bytes(self, service_name, operation_name, sent=0, received=0):
+        with self._lock:
+            operation = self._operation(service_name, operation_name)
+            operation["bytesSent"] += sent
+            operation["bytesReceived"] += received
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+
+    def report(self):
+        """
+        Returns the metrics as a dict, with the latency histogram as cumulative counts per bucket upper bound
+        """
+        with self._lock:
+            operations = []
+            for (service_name, operation_name), operation in sorted(self._operations.items()):
+                item = {k: v for k, v in operation.items() if k != "latencyBuckets"}
+                item["service"] = service_name
+                item["operation"] = operation_name
+                cumulative_count = 0
+                histogram = []
+                for upper_bound, count in zip(self.latency_buckets + ("+Inf",), operation["latencyBuckets"]):
+                    cumulative_count += count
+                    histogram.append({"le": upper_bound, "count": cumulative_count})
+                item["latencyHistogram"] = histogram
+                operations.append(item)
+
+        totals = {k: sum(o[k] for o in operations) for k in
+                  ["calls", "errors", "retries", "throttles", "bytesSent", "bytesReceived", "latencySumSeconds"]}
+        return {"totals": totals, "operations": operations}
+
+    def write_json_report(self, path):
+        self._logger.info("Writing API metrics report to {}".format(path))
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_prometheus_textfile(self, path, labels=None):
+        """
+        Writes the metrics in the Prometheus text format, e.g. for the node exporter textfile collector
+        :param path: The file to write
+        :param labels: A dict of labels added to every sample, e.g. {"stage": "deploy"}
+        """
+        self._logger.info("Writing API metrics Prometheus textfile to {}".format(path))
+        report = self.report()
+        counters = [("calls", "calls_total", "API calls made"),
+                    ("errors", "errors_total", "API calls that failed"),
+                    ("retries", "retries_total", "Retries made by the client"),
+                    ("throttles", "throttles_total", "Throttled attempts"),
+                    ("bytesSent", "sent_bytes_total", "Request bytes sent"),
+                    ("bytesReceived", "received_bytes_total", "Response bytes received")]
+
+        lines = []
+        for key, name, help_text in counters:
+            metric = "{}_{}".format(PROMETHEUS_METRIC_PREFIX, name)
+            lines.append("# HELP {} {}".format(metric, help_text))
+            lines.append("# TYPE {} counter".format(metric))
+            for o in report["operations"]:
+                lines.append("{}{{{}}} {}".format(metric, _prometheus_labels(o, labels), o[key]))
+
+        metric = "{}_latency_seconds".format(PROMETHEUS_METRIC_PREFIX)
+        lines.append("# HELP {} API call latency, including retries".format(metric))
+        lines.append("# TYPE {} histogram".format(metric))
+        for o in report["operations"]:
+            for bucket in o["latencyHistogram"]:
+                lines.append("{}_bucket{{{},le=\"{}\"}} {}".format(metric, _prometheus_labels(o, labels),
+                                                                  bucket["le"], bucket["count"]))
+            lines.append("{}_sum{{{}}} {}".format(metric, _prometheus_labels(o, labels), o["latencySumSeconds"]))
+            lines.append("{}_count{{{}}} {}".format(metric, _prometheus_labels(o, labels), o["calls"]))
+
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _prometheus_labels(operation, labels=None):
+    all_labels = dict(labels or {})
+    all_labels.update({"service": operation["service"], "operation": operation["operation"]})
+    return ",".join("{}=\"{}\"".format(k, v) for k, v in sorted(all_labels.items()))
+
+
+class InstrumentedClient:
+    """
+    Proxy for a client that records the latency, retries, throttles and errors of every API call in an ApiMetrics.
+    For botocore clients, throttled attempts that were retried and the bytes transferred are recorded through the
+    client event hooks.
+    """
+
+    def __init__(self, client, metrics, service_name):
+        """
+        :param client: The client to instrument, a boto3 client or any object with the same methods
+        :param metrics: The ApiMetrics to record the calls in
+        :param service_name: The service name, e.g. frauddetector
+        """
+        self._client = client
+        self._metrics = metrics
+        self._service_name = service_name
+        self._operation_names = None
+
+        meta = getattr(client, "meta", None)
+        method_to_api_mapping = getattr(meta, "method_to_api_mapping", None)
+        if isinstance(method_to_api_mapping, dict):
+            self._operation_names = set(method_to_api_mapping)
+            self._api_to_method_mapping = {v: k for k, v in method_to_api_mapping.items()}
+            self._register_event_handlers(meta.events)
+
+    @property
+    def client(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+        if self._operation_names is not None and name not in self._operation_names:
+            return attribute
+        return self._instrument(name, attribute)
+
+    def _instrument(self, operation_name, operation):
+        def instrumented_operation(*args, **kwargs):
+            stime = time.perf_counter()
+            try:
+                response = operation(*args, **kwargs)
+            except botocore.exceptions.ClientError as error:
+                error_info = error.response.get("Error", {})
+                metadata = error.response.get("ResponseMetadata", {})
+                self._metrics.record_call(self._service_name, operation_name, time.perf_counter() - stime,
+                                          retries=metadata.get("RetryAttempts", 0),
+                                          error_code=error_info.get("Code", "Unknown"))
+                # The botocore hooks already count every throttled attempt
+                if self._operation_names is None and error_info.get("Code") in THROTTLING_ERROR_CODES:
+                    self._metrics.record_throttle(self._service_name, operation_name)
+                raise error
+            except Exception as error:
+                self._metrics.record_call(self._service_name, operation_name, time.perf_counter() - stime,
+                                          error_code=type(error).__name__)
+                raise error
+
+            metadata = response.get("ResponseMetadata", {}) if isinstance(response, dict) else {}
+            self._metrics.record_call(self._service_name, operation_name, time.perf_counter() - stime,
+                                      retries=metadata.get("RetryAttempts", 0))
+            return response
+
+        return instrumented_operation
+
+    def _register_event_handlers(self, events):
+        events.register("before-call", self._on_before_call)
+        events.register("after-call", self._on_after_call)
+        # Registered first, as the retry handlers stop the needs-retry event once they decide to retry
+        events.register_first("needs-retry", self._on_needs_retry)
+
+    def _method_name(self, api_name):
+        return self._api_to_method_mapping.get(api_name, api_name)
+
+    def _on_before_call(self, model, params, **kwargs):
+        body = params.get("body")
+        sent = len(body) if isinstance(body, (bytes, str)) else 0
+        self._metrics.record_bytes(self._service_name, self._method_name(model.name), sent=sent)
+
+    def _on_after_call(self, http_response, model, **kwargs):
+        headers = getattr(http_response, "headers", None) or {}
+        received = int(headers.get("content-length", 0))
+        self._metrics.record_bytes(self._service_name, self._method_name(model.name), received=received)
+
+    def _on_needs_retry(self, response, operation, **kwargs):
+        if response is None:
+            return None
+        parsed = response[1] or {}
+        if parsed.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+            self._metrics.record_throttle(self._service_name, self._method_name(operation.name))
+        return None
+
+
+default_api_metrics = ApiMetrics()
+
+
+def write_api_metrics_reports(json_path=None, prometheus_path=None, labels=None, metrics=None):
+    """
+    Writes the JSON report and the Prometheus textfile of the process wide API metrics, skipping any path not given
+    """
+    metrics = metrics or default_api_metrics
+    if json_path:
+        metrics.write_json_report(json_path)
+    if prometheus_path:
+        metrics.write_prometheus_textfile(prometheus_path, labels=labels)
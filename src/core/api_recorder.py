@@ -0,0 +1,236 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import botocore
+
+API_RECORDING_FILE_ENV = "FRAUD_DETECTOR_API_RECORDING_FILE"
+API_REPLAY_FILE_ENV = "FRAUD_DETECTOR_API_REPLAY_FILE"
+API_REPLAY_LATENCY_SCALE_ENV = "FRAUD_DETECTOR_API_REPLAY_LATENCY_SCALE"
+
+RECORDING_FORMAT_VERSION = 1
+
+
+def _request_key(operation_name, kwargs):
+    return operation_name, json.dumps(kwargs, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ApiRecorder:
+    """
+    Records the requests, responses and timings of API calls to a gzipped JSON lines file, one call per line, e.g.
+    {"t": 1.52, "d": 0.084, "op": "get_rules", "req": {...}, "res": {...}} or {..., "err": {...}} for a failed call.
+    The first line is a header with the format version and region.
+    """
+
+    def __init__(self, path, clock=None):
+        """
+        :param path: The recording file, written on the first call
+        :param clock: Returns the current time in seconds, time.monotonic if not specified
+        """
+        self.path = path
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._file = None
+        self._start_time = None
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Returns a recorder for the file in the environment variable FRAUD_DETECTOR_API_RECORDING_FILE, or None if not
+        set
+        """
+        path = os.environ.get(API_RECORDING_FILE_ENV)
+        return cls(path) if path else None
+
+    def now(self):
+        return self._clock()
+
+    def record(self, region_name, operation_name, request, start_time, duration, response=None, error=None):
+        with self._lock:
+            if self._file is None:
+                self._logger.info("Recording API calls to {}".format(self.path))
+                self._file = gzip.open(self.path, "wt")
+                self._start_time = start_time
+                self._write({"version": RECORDING_FORMAT_VERSION, "region": region_name})
+                # The gzip trailer is only written on close
+                atexit.register(self.close)
+
+            entry = {"t": round(start_time - self._start_time, 6), "d": round(duration, 6), "op": operation_name,
+                     "req": request}
+            if error is not None:
+                entry["err"] = error
+            else:
+                entry["res"] = response
+            self._write(entry)
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecordingClient:
+    """
+    Proxy for a client that records every API call in an ApiRecorder
+    """
+
+    def __init__(self, client, recorder):
+        """
+        :param client: The client to record, a boto3 client or any object with the same methods
+        :param recorder: The ApiRecorder
+        """
+        self._client = client
+        self._recorder = recorder
+        self._operation_names = None
+
+        method_to_api_mapping = getattr(getattr(client, "meta", None), "method_to_api_mapping", None)
+        if isinstance(method_to_api_mapping, dict):
+            self._operation_names = set(method_to_api_mapping)
+
+    @property
+    def client(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+        if self._operation_names is not None and name not in self._operation_names:
+            return attribute
+        return self._record(name, attribute)
+
+    def _record(self, operation_name, operation):
+        def recorded_operation(**kwargs):
+            region_name = getattr(getattr(self._client, "meta", None), "region_name", None)
+            start_time = self._recorder.now()
+            try:
+                response = operation(**kwargs)
+            except botocore.exceptions.ClientError as error:
+                self._recorder.record(region_name, operation_name, kwargs, start_time,
+                                      self._recorder.now() - start_time, error=error.response)
+                raise error
+            self._recorder.record(region_name, operation_name, kwargs, start_time, self._recorder.now() - start_time,
+                                  response=response)
+            return response
+
+        return recorded_operation
+
+
+class ReplayClient:
+    """
+    Serves the API calls of a recording offline, with the recorded latency multiplied by latency_scale.
+
+    Calls are matched on the operation and request. Identical requests, e.g. polling get_model_version, are served
+    the recorded responses in order, and the last one once they run out. Recorded errors are raised as ClientError.
+    """
+
+    def __init__(self, path, latency_scale=1.0, sleep=None):
+        """
+        :param path: The recording file written by an ApiRecorder
+        :param latency_scale: Multiplies the recorded latency, e.g. 0 to replay without waiting
+        :param sleep: Sleeps for the given seconds, time.sleep if not specified
+        """
+        self.path = path
+        self.latency_scale = latency_scale
+        self._sleep = sleep or time.sleep
+        self._lock = threading.RLock()
+        self._recordings = None
+        self._served = defaultdict(int)
+        self._meta = SimpleNamespace(region_name=None)
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Returns a replay client for the file in the environment variable FRAUD_DETECTOR_API_REPLAY_FILE, or None if
+        not set. The latency is scaled by FRAUD_DETECTOR_API_REPLAY_LATENCY_SCALE, 1 by default
+        """
+        path = os.environ.get(API_REPLAY_FILE_ENV)
+        if not path:
+            return None
+        return cls(path, latency_scale=float(os.environ.get(API_REPLAY_LATENCY_SCALE_ENV, 1.0)))
+
+    @property
+    def meta(self):
+        # The region is read from the recording
+        self._load()
+        return self._meta
+
+    def _load(self):
+        with self._lock:
+            return self._load_recordings()
+
+    def _load_recordings(self):
+        if self._recordings is None:
+            self._logger.info("Replaying API calls from {}".format(self.path))
+            recordings = defaultdict(list)
+            with gzip.open(self.path, "rt") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != RECORDING_FORMAT_VERSION:
+                    raise ValueError("Unsupported recording version {} in {}".format(header.get("version"),
+                                                                                      self.path))
+                self._meta.region_name = header.get("region")
+                for line in f:
+                    entry = json.loads(line)
+                    recordings[_request_key(entry["op"], entry["req"])].append(entry)
+            self._recordings = recordings
+        return self._recordings
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def replayed_operation(**kwargs):
+            return self._replay(name, kwargs)
+
+        return replayed_operation
+
+    def _replay(self, operation_name, kwargs):
+        # Round trip the request through JSON, so it matches the recorded request
+        request = json.loads(json.dumps(kwargs, default=str))
+        key = _request_key(operation_name, request)
+        with self._lock:
+            entries = self._load().get(key)
+            if not entries:
+                raise ValueError("No recorded {} call with the request {}".format(operation_name, key[1]))
+            entry = entries[min(self._served[key], len(entries) - 1)]
+            self._served[key] += 1
+
+        self._sleep(entry["d"] * self.latency_scale)
+        if "err" in entry:
+            raise botocore.exceptions.ClientError(entry["err"], operation_name)
+        return entry["res"]
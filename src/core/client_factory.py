@@ -0,0 +1,216 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import logging
+import threading
+
+import boto3
+from botocore.config import Config
+from core.api_metrics import InstrumentedClient, default_api_metrics
+from core.api_recorder import ApiRecorder, RecordingClient, ReplayClient
+from core.rate_limiter import RateLimitedClient, default_rate_limiter
+
+FRAUD_DETECTOR_SERVICE_NAME = 'frauddetector'
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_RETRY_MODE = 'adaptive'
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+
+class ClientFactory:
+    """
+    A registry of boto3 clients keyed by service and region, so each client and its connection pool is only built
+    once per process. All the clients share one session, and so the same credentials
+    """
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, retry_mode=DEFAULT_RETRY_MODE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, session=None, metrics=None,
+                 rate_limiter=None, recorder=None):
+        """
+        :param max_pool_connections: Maximum number of connections kept in each client's pool
+        :param retry_mode: The botocore retry mode, legacy, standard or adaptive
+        :param max_attempts: Maximum number of attempts per call, including the initial attempt
+        :param connect_timeout: Connection timeout in seconds
+        :param read_timeout: Read timeout in seconds
+        :param session: The boto3 session to create the clients with, created on first use if not specified
+        :param metrics: An ApiMetrics to record the calls of every client in, or None to not instrument the clients
+        :param rate_limiter: An AdaptiveRateLimiter shared by the Fraud Detector clients, or None to not rate limit
+            them. The other services, e.g. s3 and sts, are left to the botocore retry mode
+        :param recorder: An ApiRecorder to record the calls of every client in, or None to not record the calls
+        """
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._registered_clients = {}
+        self._session = session
+        # A session built by the factory is built again after clear(), to pick up changed credentials
+        self._owns_session = session is None
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder
+        self._settings = {"max_pool_connections": max_pool_connections,
+                          "retry_mode": retry_mode,
+                          "max_attempts": max_attempts,
+                          "connect_timeout": connect_timeout,
+                          "read_timeout": read_timeout}
+        self.config = self._build_config()
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def configure(self, **kwargs):
+        """
+        Changes the client configuration. Only max_pool_connections, retry_mode, max_attempts, connect_timeout and
+        read_timeout can be changed. Clients already built are discarded, so the next call, including through a
+        LazyClient, builds them with the new configuration
+        """
+        unknown_settings = set(kwargs) - set(self._settings)
+        if unknown_settings:
+            raise ValueError("Unknown client settings {}".format(sorted(unknown_settings)))
+
+        with self._lock:
+            self._settings.update({k: v for k, v in kwargs.items() if v is not None})
+            self.config = self._build_config()
+            self.clear()
+
+    def _build_config(self):
+        return Config(max_pool_connections=self._settings["max_pool_connections"],
+                      retries={"mode": self._settings["retry_mode"],
+                               "total_max_attempts": self._settings["max_attempts"]},
+                      connect_timeout=self._settings["connect_timeout"],
+                      read_timeout=self._settings["read_timeout"])
+
+    def clear(self):
+        """
+        Discards the clients built so far. Unless the session was passed in, the next call also builds a new session,
+        so the credentials are resolved again
+        """
+        with self._lock:
+            self._clients = {}
+            if self._owns_session:
+                self._session = None
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = boto3.session.Session()
+            return self._session
+
+    def get_client(self, service_name=FRAUD_DETECTOR_SERVICE_NAME, region_name=None):
+        """
+        Returns the client for the service and region, building it if required
+        """
+        with self._lock:
+            region_name = region_name or self.session.region_name
+            key = (service_name, region_name)
+
+            # A client registered for the region, or else for every region
+            for registered_key in [key, (service_name, None)]:
+                if registered_key in self._registered_clients:
+                    return self._registered_clients[registered_key]
+
+            if key not in self._clients:
+                self._logger.debug("Creating {} client for region {}".format(service_name, region_name))
+                client = self.session.client(service_name, region_name=region_name, config=self.config)
+                self._clients[key] = self._wrap(client, service_name)
+
+            return self._clients[key]
+
+    def register_client(self, client, service_name=FRAUD_DETECTOR_SERVICE_NAME, region_name=None):
+        """
+        Returns the given client, e.g. a local stand in for benchmarks, for the service in the region instead of
+        building one. The client is rate limited and instrumented like a built client of the service
+        :param region_name: The region to return the client for, or None for every region without a client registered
+                            for it
+        """
+        with self._lock:
+            self._registered_clients[(service_name, region_name)] = self._wrap(client, service_name)
+
+    def unregister_client(self, service_name=FRAUD_DETECTOR_SERVICE_NAME, region_name=None):
+        with self._lock:
+            self._registered_clients.pop((service_name, region_name), None)
+
+    def _wrap(self, client, service_name):
+        if self.recorder is not None:
+            client = RecordingClient(client, self.recorder)
+        # Only Fraud Detector has the TPS quotas the bucket is tuned for, and botocore's adaptive retry mode already
+        # limits the other services, so stacking both would slow e.g. s3 down for no reason
+        if self.rate_limiter is not None and service_name == FRAUD_DETECTOR_SERVICE_NAME:
+            client = RateLimitedClient(client, self.rate_limiter, service_name)
+        if self.metrics is not None:
+            client = InstrumentedClient(client, self.metrics, service_name)
+        return client
+
+    def lazy_client(self, service_name=FRAUD_DETECTOR_SERVICE_NAME, region_name=None):
+        """
+        Returns a proxy that only builds the client when it is first used
+        """
+        return LazyClient(self, service_name, region_name)
+
+
+class LazyClient:
+    """
+    Proxy for a client built by a ClientFactory on first use. The client is looked up in the factory on every access,
+    so it follows the factory being configured or cleared
+    """
+
+    def __init__(self, factory, service_name, region_name=None):
+        self._factory = factory
+        self._service_name = service_name
+        self._region_name = region_name
+
+    @property
+    def client(self):
+        return self._factory.get_client(self._service_name, self._region_name)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+default_client_factory = ClientFactory(metrics=default_api_metrics, rate_limiter=default_rate_limiter,
+                                       recorder=ApiRecorder.from_environment())
+
+# Serve the Fraud Detector calls from a recording, when FRAUD_DETECTOR_API_REPLAY_FILE is set
+_replay_client = ReplayClient.from_environment()
+if _replay_client is not None:
+    default_client_factory.register_client(_replay_client)
+
+
+def get_client(service_name=FRAUD_DETECTOR_SERVICE_NAME, region_name=None):
+    """
+    Returns a lazily built client from the process wide client factory
+    """
+    return default_client_factory.lazy_client(service_name, region_name)
+
+
+def configure_clients(**kwargs):
+    """
+    Configures the process wide client factory, see ClientFactory.configure
+    """
+    default_client_factory.configure(**kwargs)
+
+
+def configure_rate_limits(**kwargs):
+    """
+    Configures the rate limits shared by the clients of the process wide client factory, see
+    AdaptiveRateLimiter.configure
+    """
+    default_rate_limiter.configure(**kwargs)
@@ -40,3 +40,10 @@ class FraudDetectorDeployBase:
         :return:
         """
         raise NotImplementedError
+
+    @staticmethod
+    def _validate_rules(detector_rules=None):
+        for r in detector_rules:
+            error_messages = r.validate()
+            if error_messages:
+                raise ValueError("The rule {} is not valid due to {}".format(r.rule_id, error_messages))
@@ -17,7 +17,8 @@
 
 import logging
 
-import boto3
+from core.client_factory import get_client
+from core.fraud_detector_utils import FraudDetectorUtils
 from features.feature_variables_base import FeatureVariablesBase
 
 FRAUD_DETECTOR_LABEL_KEY_LEGIT = "LEGIT"
@@ -30,8 +31,9 @@ class FraudDetectorEvent:
     Creates a fraud detector event
     """
 
-    def __init__(self, client=None):
-        self.client = client or boto3.client('frauddetector')
+    def __init__(self, client=None, fraud_detector_utils=None):
+        self.client = client or get_client()
+        self.fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils(fraud_detector_client=self.client)
 
     @property
     def _logger(self):
@@ -46,16 +48,16 @@ class FraudDetectorEvent:
         model_labels = model_label_map[FRAUD_DETECTOR_LABEL_KEY_LEGIT] + model_label_map[FRAUD_DETECTOR_LABEL_KEY_FRAUD]
 
         # Create entity type
-        self.client.put_entity_type(
+        self.fraud_detector_utils.create_or_update_entity_type(
             name=entity,
             description=entity_description or description
         )
 
         # Create event type
-        self.client.put_event_type(
+        self.fraud_detector_utils.create_or_update_event_type(
             name=event_type_name,
             description=description,
-            eventVariables=model_features,
+            event_variables=model_features,
             labels=model_labels,
-            entityTypes=[entity]
+            entity_types=[entity]
         )
@@ -0,0 +1,172 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import boto3
+from core.client_factory import get_client
+
+RESOURCE_TYPE_VARIABLE = "variable"
+RESOURCE_TYPE_LABEL = "label"
+RESOURCE_TYPE_OUTCOME = "outcome"
+RESOURCE_TYPE_RULE = "rule"
+RESOURCE_TYPE_MODEL = "model"
+RESOURCE_TYPE_ENTITY_TYPE = "entity_type"
+RESOURCE_TYPE_EVENT_TYPE = "event_type"
+
+# Time to live, in seconds, of each resource type. Variables, labels and outcomes are rarely changed once created
+DEFAULT_TTLS = {
+    RESOURCE_TYPE_VARIABLE: 24 * 60 * 60,
+    RESOURCE_TYPE_LABEL: 24 * 60 * 60,
+    RESOURCE_TYPE_OUTCOME: 24 * 60 * 60,
+    RESOURCE_TYPE_ENTITY_TYPE: 24 * 60 * 60,
+    RESOURCE_TYPE_EVENT_TYPE: 60 * 60,
+    RESOURCE_TYPE_RULE: 60 * 60,
+    RESOURCE_TYPE_MODEL: 60 * 60
+}
+
+# Directory to store the cache in, e.g. a directory cached by code build between runs
+METADATA_CACHE_DIR_ENV = "FRAUD_DETECTOR_METADATA_CACHE_DIR"
+
+METADATA_CACHE_FILE_NAME = "fraud_detector_metadata.sqlite"
+
+_default_caches = {}
+_default_caches_lock = threading.Lock()
+
+
+class FraudDetectorMetadataCache:
+    """
+    A persistent cache of Fraud Detector resource metadata, such as variables, labels, outcomes, rules and models.
+    Entries are keyed by account / region / resource type / resource id and expire after a per resource type TTL.
+    """
+
+    def __init__(self, db_path=":memory:", account_id=None, region=None, ttls=None, clock=None):
+        """
+        :param db_path: Path to the sqlite database file, defaults to an in memory database
+        :param account_id: AWS account id, used to key the entries
+        :param region: AWS region, used to key the entries
+        :param ttls: A dict of resource type to TTL in seconds, overrides DEFAULT_TTLS
+        :param clock: Function returning the current time in seconds, defaults to time.time
+        """
+        self.namespace = "{}/{}".format(account_id or "default", region or "default")
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "namespace TEXT NOT NULL, resource_type TEXT NOT NULL, resource_id TEXT NOT NULL, "
+                "value TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, resource_type, resource_id))")
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    @classmethod
+    def from_environment(cls, fraud_detector_client):
+        """
+        Returns the process wide cache stored in the directory set by the FRAUD_DETECTOR_METADATA_CACHE_DIR
+        environment variable, for the account and region of the client
+        :param fraud_detector_client: The fraud detector client, used to find the region and account
+        :return: The cache or None if the environment variable is not set
+        """
+        cache_dir = os.environ.get(METADATA_CACHE_DIR_ENV)
+        if not cache_dir:
+            return None
+
+        region = fraud_detector_client.meta.region_name
+        credentials = cls._client_credentials(fraud_detector_client)
+        with _default_caches_lock:
+            # Clients with other credentials can belong to another account, so they get their own cache
+            key = (cache_dir, region, credentials.access_key if credentials else None)
+            if key not in _default_caches:
+                account_id = cls._account_id(credentials, region)
+                os.makedirs(cache_dir, exist_ok=True)
+                _default_caches[key] = cls(os.path.join(cache_dir, METADATA_CACHE_FILE_NAME), account_id=account_id,
+                                           region=region)
+            return _default_caches[key]
+
+    @staticmethod
+    def _client_credentials(client):
+        # botocore clients sign their requests with these credentials, the proxies of the client factory pass private
+        # attributes through. Clients that are not botocore clients, e.g. a replay client, have none
+        credentials = getattr(getattr(client, "_request_signer", None), "_credentials", None)
+        return credentials.get_frozen_credentials() if credentials is not None else None
+
+    @staticmethod
+    def _account_id(credentials, region):
+        if credentials is None:
+            sts_client = get_client("sts", region_name=region)
+        else:
+            sts_client = boto3.session.Session(aws_access_key_id=credentials.access_key,
+                                               aws_secret_access_key=credentials.secret_key,
+                                               aws_session_token=credentials.token,
+                                               region_name=region).client("sts")
+        return sts_client.get_caller_identity()["Account"]
+
+    def get(self, resource_type, resource_id):
+        """
+        Returns the cached value or None if not cached or expired
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, updated_at FROM metadata WHERE namespace=? AND resource_type=? AND resource_id=?",
+                (self.namespace, resource_type, resource_id)).fetchone()
+
+        if row is None:
+            return None
+
+        value, updated_at = row
+        if self._clock() - updated_at > self.ttls.get(resource_type, 0):
+            self._logger.debug("Cache entry {}/{} expired".format(resource_type, resource_id))
+            return None
+
+        return json.loads(value)
+
+    def put(self, resource_type, resource_id, value):
+        """
+        Writes through the value of a resource that has just been created, updated or read
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata (namespace, resource_type, resource_id, value, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, resource_type, resource_id, json.dumps(value, default=str), self._clock()))
+
+    def invalidate(self, resource_type, resource_id=None):
+        """
+        Removes a single resource, or all the resources of a type when resource_id is None
+        """
+        with self._lock, self._connection:
+            if resource_id is None:
+                self._connection.execute("DELETE FROM metadata WHERE namespace=? AND resource_type=?",
+                                         (self.namespace, resource_type))
+            else:
+                self._connection.execute(
+                    "DELETE FROM metadata WHERE namespace=? AND resource_type=? AND resource_id=?",
+                    (self.namespace, resource_type, resource_id))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
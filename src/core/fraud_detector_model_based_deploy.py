@@ -17,9 +17,11 @@
 
 import logging
 
-import boto3
+from core.client_factory import get_client
 from core.fraud_detector_deploy_base import FraudDetectorDeployBase
-from core.fraud_detector_utils import FraudDetectorUtils
+from core.fraud_detector_metadata_cache import RESOURCE_TYPE_RULE
+from core.fraud_detector_utils import FraudDetectorUtils, ModelStatusTarget
+from core.polling_strategy import POLLING_OPERATION_ACTIVATION
 
 FRAUD_DETECTOR_RULE_MATCH_METHOD = "FIRST_MATCHED"
 
@@ -32,9 +34,16 @@ class FraudDetectorModelBasedDeploy(FraudDetectorDeployBase):
     An implementation of a model based detector
     """
 
-    def __init__(self, client=None, fraud_detector_utils=None):
+    def __init__(self, client=None, fraud_detector_utils=None, concurrent_activation=True):
+        """
+        :param client: The fraud detector client
+        :param fraud_detector_utils: FraudDetectorUtils
+        :param concurrent_activation: If true, all the models are activated up front and waited on together once the
+                                      rules are created. Else the models are activated one after the other
+        """
         self.fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils()
-        self.client = client or boto3.client('frauddetector')
+        self.client = client or get_client()
+        self.concurrent_activation = concurrent_activation
 
     @property
     def _logger(self):
@@ -69,34 +78,20 @@ class FraudDetectorModelBasedDeploy(FraudDetectorDeployBase):
 
         # Attempt to create the rule before deploying the model
         # So if rule creation fails, then the model doesnt run unnecessarily
-        rules = []
-        for r in detector_rules:
-            for o in r.outcomes:
-                self.client.put_outcome(name=o, description="Outcome for rule {}".format(r.description))
-            rule_info = self.fraud_detector_utils.create_or_update_rule(detector_name, r)
-            rules.append(rule_info)
+        rules = self._create_or_update_rules(detector_name, detector_rules)
 
-        # Deploy  Models
-        for model in model_versions:
-            model_name = model['modelId']
-            model_type = model['modelType']
-            model_version = model['modelVersionNumber']
-            self._logger.info("Deploying model {} with version {}".format(model_name, model_version))
-
-            # Activate model
-            self.client.update_model_version_status(
-                modelId=model_name,
-                modelType=model_type,
-                modelVersionNumber=str(model_version),
-                status=DEPLOY_MODEL_STATUS
-            )
-            # Wait for deployment to complete
-            self.fraud_detector_utils.wait_until_model_status(model_name=model_name, model_version=model_version,
-                                                              model_type=model_type, fail_states="ERROR",
-                                                              success_states=DEPLOY_MODEL_STATUS)
+        # Model versions already active, e.g. used by the previous detector version, need no activation
+        inactive_models = self._get_inactive_models(model_versions)
 
-            # Attach models and rules to detector
-            self._logger.info("Assembling detector - {} with model {}".format(detector_name, model_name))
+        if self.concurrent_activation:
+            # Request all the activations up front and wait on them together
+            for model in inactive_models:
+                self._request_model_activation(model)
+            self._wait_for_model_activations(inactive_models)
+        else:
+            for model in inactive_models:
+                self._request_model_activation(model)
+                self._wait_for_model_activations([model])
 
         # Copy all parameters except modelDescription to create detector version
         model_versions_p = [{k: v for k, v in i.items() if k != "modelDescription"} for i in model_versions]
@@ -104,13 +99,30 @@ class FraudDetectorModelBasedDeploy(FraudDetectorDeployBase):
         for v in model_versions_p:
             v["modelVersionNumber"] = str(v["modelVersionNumber"])
 
-        response = self.client.create_detector_version(
-            detectorId=detector_name,
-            description=detector_description,
-            modelVersions=model_versions_p,
-            rules=rules,
-            ruleExecutionMode=rule_execution_mode
-        )
+        # Nothing to do if the active detector version already has the same models and rules
+        active_version = self.fraud_detector_utils.get_active_detector_version(detector_name)
+        if FraudDetectorUtils.is_same_detector_version(active_version, model_versions_p, rules,
+                                                       rule_execution_mode):
+            self._logger.info("{} detector version {} already active with the same models and rules".format(
+                detector_name, active_version["detectorVersionId"]))
+            return {
+                "detectorVersionId": active_version["detectorVersionId"],
+                "detectorId": detector_name
+            }
+
+        # Attach models and rules to detector
+        self._logger.info("Assembling detector - {} with models {}".format(
+            detector_name, [m["modelId"] for m in model_versions]))
+
+        # Unchanged rule versions come from the rule index, which may be cached
+        with self.fraud_detector_utils.invalidate_cache_on_error([(RESOURCE_TYPE_RULE, detector_name)]):
+            response = self.client.create_detector_version(
+                detectorId=detector_name,
+                description=detector_description,
+                modelVersions=model_versions_p,
+                rules=rules,
+                ruleExecutionMode=rule_execution_mode
+            )
         detector_version = response["detectorVersionId"]
 
         # Activate detector
@@ -131,9 +143,40 @@ class FraudDetectorModelBasedDeploy(FraudDetectorDeployBase):
 
         return result
 
-    @staticmethod
-    def _validate_rules(detector_rules=None):
+    def _create_or_update_rules(self, detector_name, detector_rules):
+        rules = []
         for r in detector_rules:
-            error_messages = r.validate()
-            if error_messages:
-                raise ValueError("The rule {} is not valid due to {}".format(r.rule_id, error_messages))
+            for o in r.outcomes:
+                self.fraud_detector_utils.create_or_update_outcome(o, "Outcome for rule {}".format(r.description))
+            rule_info = self.fraud_detector_utils.create_or_update_rule(detector_name, r)
+            rules.append(rule_info)
+        return rules
+
+    def _get_inactive_models(self, model_versions):
+        inactive_models = []
+        for model in model_versions:
+            model_status = self.client.get_model_version(modelId=model['modelId'], modelType=model['modelType'],
+                                                         modelVersionNumber=str(model['modelVersionNumber']))["status"]
+            if model_status == DEPLOY_MODEL_STATUS:
+                self._logger.info("Model {} version {} is already active".format(model['modelId'],
+                                                                                 model['modelVersionNumber']))
+            else:
+                inactive_models.append(model)
+        return inactive_models
+
+    def _request_model_activation(self, model):
+        self._logger.info("Deploying model {} with version {}".format(model['modelId'], model['modelVersionNumber']))
+        self.client.update_model_version_status(
+            modelId=model['modelId'],
+            modelType=model['modelType'],
+            modelVersionNumber=str(model['modelVersionNumber']),
+            status=DEPLOY_MODEL_STATUS
+        )
+
+    def _wait_for_model_activations(self, models):
+        targets = [ModelStatusTarget(model_name=m['modelId'], model_version=m['modelVersionNumber'],
+                                     model_type=m['modelType'], fail_states="ERROR",
+                                     success_states=DEPLOY_MODEL_STATUS) for m in models]
+        for target, _ in self.fraud_detector_utils.wait_until_model_statuses(targets,
+                                                                             operation=POLLING_OPERATION_ACTIVATION):
+            self._logger.info("Model {} version {} activated".format(target.model_name, target.model_version))
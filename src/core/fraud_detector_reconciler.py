@@ -0,0 +1,332 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import botocore
+from core.client_factory import get_client
+from core.fraud_detector_deploy_base import FraudDetectorDeployBase
+from core.fraud_detector_metadata_cache import RESOURCE_TYPE_RULE
+from core.fraud_detector_utils import FraudDetectorUtils, ModelStatusTarget
+from core.paginator import FraudDetectorPaginator
+from core.polling_strategy import POLLING_OPERATION_ACTIVATION
+from rules.detector_rule_base import rule_content_hash
+
+DEPLOY_MODEL_STATUS = 'ACTIVE'
+
+DEFAULT_MAX_WORKERS = 8
+
+# The desired state of a detector, see FraudDetectorDeployBase.deploy for the details of each field
+DetectorSpec = namedtuple("DetectorSpec", ["detector_name", "detector_description", "event_type_name",
+                                           "detector_rules", "model_versions", "rule_execution_mode"])
+
+
+class PlannedAction:
+    """
+    A single change required to reach the desired state
+    """
+
+    def __init__(self, action_id, description, apply_func, depends_on=None):
+        """
+        :param action_id: Unique id of the action within the plan, e.g. rule:positivescorerule
+        :param description: Human readable description of the change
+        :param apply_func: Function that makes the change, called with the results of the actions applied so far
+        :param depends_on: Ids of the actions that must be applied first
+        """
+        self.action_id = action_id
+        self.description = description
+        self.apply_func = apply_func
+        self.depends_on = list(depends_on or [])
+
+
+class ReconcilePlan:
+    """
+    The minimal list of changes to make a detector match its desired state
+    """
+
+    def __init__(self, spec, actions, current_detector_version_id=None):
+        self.spec = spec
+        self.actions = actions
+        self.current_detector_version_id = current_detector_version_id
+
+    @property
+    def has_changes(self):
+        return len(self.actions) > 0
+
+    def describe(self):
+        if not self.has_changes:
+            return "Detector {} is up to date, active version {}".format(self.spec.detector_name,
+                                                                           self.current_detector_version_id)
+
+        lines = ["Detector {} plan, {} changes:".format(self.spec.detector_name, len(self.actions))]
+        for action in self.actions:
+            depends_on = " (after {})".format(", ".join(action.depends_on)) if action.depends_on else ""
+            lines.append("  + {}{}".format(action.description, depends_on))
+        return "\n".join(lines)
+
+
+class FraudDetectorReconciler(FraudDetectorDeployBase):
+    """
+    Deploys a model based detector by reading its current state once, planning the minimal set of changes and applying
+    the independent changes concurrently
+    """
+
+    def __init__(self, client=None, fraud_detector_utils=None, max_workers=DEFAULT_MAX_WORKERS):
+        self.client = client or get_client()
+        self.fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils(fraud_detector_client=self.client)
+        self.max_workers = max_workers
+        # Set on the first failed change, to stop the changes still in flight, e.g. waiting on model activations
+        self._stop_event = threading.Event()
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def deploy(self, detector_name, detector_description, event_type_name: str, detector_rules,
+               rule_execution_mode="FIRST_MATCHED", model_versions=None, dry_run=False):
+        """
+        Plans and applies the changes to deploy a model based Detector, see FraudDetectorDeployBase.deploy
+        @param dry_run: If true, only logs the plan without making any changes
+        @return: a dict of detector id and detector version id. The detector version id is None when a dry run
+                 requires a new detector version
+        """
+        # Validate args
+        assert model_versions is not None, "Model is mandatory"
+
+        spec = DetectorSpec(detector_name, detector_description, event_type_name, detector_rules, model_versions,
+                            rule_execution_mode)
+        return self.apply(self.plan(spec), dry_run=dry_run)
+
+    def plan(self, spec: DetectorSpec):
+        """
+        Reads the current state of the detector and computes the changes required to reach the spec
+        :param spec: The desired state
+        :return: A ReconcilePlan
+        """
+        self._validate_rules(spec.detector_rules)
+        detector_name = spec.detector_name
+
+        # Read the current state, each read is independent
+        model_keys = [(m["modelId"], m["modelType"], str(m["modelVersionNumber"])) for m in spec.model_versions]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            detector_future = executor.submit(self._get_detector, detector_name)
+            outcomes_future = executor.submit(self._get_outcomes)
+            rule_index_future = executor.submit(self.fraud_detector_utils.get_rule_index, detector_name)
+            active_version_future = executor.submit(self.fraud_detector_utils.get_active_detector_version,
+                                                    detector_name)
+            model_status_futures = {k: executor.submit(self._get_model_status, *k) for k in model_keys}
+
+            detector = detector_future.result()
+            outcomes = outcomes_future.result()
+            rule_index = rule_index_future.result()
+            active_version = active_version_future.result()
+            model_statuses = {k: f.result() for k, f in model_status_futures.items()}
+
+        actions = []
+
+        # Detector
+        if detector is None or detector.get("eventTypeName") != spec.event_type_name \
+                or detector.get("description") != spec.detector_description:
+            actions.append(PlannedAction("detector", "put detector {}".format(detector_name),
+                                         lambda results: self.client.put_detector(
+                                             detectorId=detector_name,
+                                             eventTypeName=spec.event_type_name,
+                                             description=spec.detector_description)))
+
+        # Outcomes
+        for rule in spec.detector_rules:
+            for outcome in rule.outcomes:
+                action_id = "outcome:{}".format(outcome)
+                description = "Outcome for rule {}".format(rule.description)
+                if outcomes.get(outcome) != description and action_id not in [a.action_id for a in actions]:
+                    actions.append(PlannedAction(action_id, "put outcome {}".format(outcome),
+                                                 self._put_outcome_func(outcome, description)))
+
+        # Rules
+        rule_versions = {}
+        for rule in spec.detector_rules:
+            indexed_rule = rule_index.get(rule.rule_id)
+            expression = rule.get_rule_expression()
+            if indexed_rule and rule_content_hash(indexed_rule.get("expression"), indexed_rule.get("outcomes"),
+                                                  indexed_rule.get("description")) == rule.get_content_hash(expression):
+                rule_versions[rule.rule_id] = str(indexed_rule["ruleVersion"])
+                continue
+
+            outcome_dependencies = ["outcome:{}".format(o) for o in rule.outcomes]
+            change = "update rule {} from version {}".format(rule.rule_id, indexed_rule["ruleVersion"]) \
+                if indexed_rule else "create rule {}".format(rule.rule_id)
+            actions.append(PlannedAction("rule:{}".format(rule.rule_id), change,
+                                         self._create_or_update_rule_func(detector_name, rule),
+                                         depends_on=["detector"] + outcome_dependencies))
+
+        # Models, activated together so a single polling loop waits on all of them
+        inactive_model_keys = [k for k in model_keys if model_statuses[k] != DEPLOY_MODEL_STATUS]
+        if inactive_model_keys:
+            models = ", ".join("{} version {}".format(n, v) for n, _, v in inactive_model_keys)
+            actions.append(PlannedAction("models", "activate models {}".format(models),
+                                         self._activate_models_func(inactive_model_keys)))
+
+        # Detector version, reusing the active version if it has the same models and rules
+        planned_rule_ids = {a.action_id for a in actions if a.action_id.startswith("rule:")}
+        desired_model_versions = [{"modelId": n, "modelType": t, "modelVersionNumber": v} for n, t, v in model_keys]
+        desired_rules = [{"ruleId": r.rule_id, "ruleVersion": rule_versions.get(r.rule_id)}
+                         for r in spec.detector_rules]
+        current_detector_version_id = active_version["detectorVersionId"] if active_version else None
+        if planned_rule_ids or not FraudDetectorUtils.is_same_detector_version(
+                active_version, desired_model_versions, desired_rules, spec.rule_execution_mode):
+            all_action_ids = [a.action_id for a in actions]
+            actions.append(PlannedAction("detector_version",
+                                         "create and activate a new version of detector {}".format(detector_name),
+                                         self._create_detector_version_func(spec, rule_versions),
+                                         depends_on=all_action_ids))
+            current_detector_version_id = None
+
+        # Only wait on changes that are actually planned
+        planned_action_ids = {a.action_id for a in actions}
+        for action in actions:
+            action.depends_on = [d for d in action.depends_on if d in planned_action_ids]
+
+        return ReconcilePlan(spec, actions, current_detector_version_id)
+
+    def apply(self, plan: ReconcilePlan, dry_run=False):
+        """
+        Applies the changes of a plan, running each change as soon as the changes it depends on are applied
+        :param plan: The ReconcilePlan
+        :param dry_run: If true, only logs the plan
+        :return: a dict of detector id and detector version id
+        """
+        self._logger.info(plan.describe())
+
+        result = {
+            "detectorVersionId": plan.current_detector_version_id,
+            "detectorId": plan.spec.detector_name
+        }
+        if dry_run or not plan.has_changes:
+            return result
+
+        results = self._run_actions(plan.actions)
+        if "detector_version" in results:
+            result["detectorVersionId"] = results["detector_version"]
+
+        self._logger.info("{} detector reconciled".format(plan.spec.detector_name))
+        return result
+
+    def _run_actions(self, actions):
+        results = {}
+        pending = list(actions)
+        running = {}
+        self._stop_event.clear()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                ready = [a for a in pending if all(d in results for d in a.depends_on)]
+                for action in ready:
+                    self._logger.info("Applying: {}".format(action.description))
+                    running[executor.submit(action.apply_func, results)] = action
+                    pending.remove(action)
+
+                if not running:
+                    raise ValueError("Unable to apply {}, dependencies are not satisfied".format(
+                        [a.action_id for a in pending]))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    action = running.pop(future)
+                    results[action.action_id] = future.result()
+        except BaseException:
+            # Raise the first failure straight away, rather than waiting for the changes still in flight
+            self._stop_event.set()
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+            raise
+
+        executor.shutdown(wait=True)
+        return results
+
+    def _put_outcome_func(self, outcome, description):
+        return lambda results: self.fraud_detector_utils.create_or_update_outcome(outcome, description)
+
+    def _create_or_update_rule_func(self, detector_name, rule):
+        return lambda results: self.fraud_detector_utils.create_or_update_rule(detector_name, rule)["ruleVersion"]
+
+    def _activate_models_func(self, model_keys):
+        def activate(results):
+            for model_name, model_type, model_version in model_keys:
+                self.client.update_model_version_status(
+                    modelId=model_name,
+                    modelType=model_type,
+                    modelVersionNumber=model_version,
+                    status=DEPLOY_MODEL_STATUS
+                )
+            targets = [ModelStatusTarget(model_name=n, model_version=v, model_type=t, fail_states="ERROR",
+                                         success_states=DEPLOY_MODEL_STATUS) for n, t, v in model_keys]
+            for target, _ in self.fraud_detector_utils.wait_until_model_statuses(
+                    targets, operation=POLLING_OPERATION_ACTIVATION, stop_event=self._stop_event):
+                self._logger.info("Model {} version {} activated".format(target.model_name, target.model_version))
+
+        return activate
+
+    def _create_detector_version_func(self, spec, rule_versions):
+        def create_detector_version(results):
+            rules = [{"ruleId": r.rule_id,
+                      "detectorId": spec.detector_name,
+                      "ruleVersion": results.get("rule:{}".format(r.rule_id), rule_versions.get(r.rule_id))}
+                     for r in spec.detector_rules]
+            model_versions = [{"modelId": m["modelId"], "modelType": m["modelType"],
+                               "modelVersionNumber": str(m["modelVersionNumber"])} for m in spec.model_versions]
+
+            # Unchanged rule versions come from the rule index, which may be cached
+            with self.fraud_detector_utils.invalidate_cache_on_error([(RESOURCE_TYPE_RULE, spec.detector_name)]):
+                response = self.client.create_detector_version(
+                    detectorId=spec.detector_name,
+                    description=spec.detector_description,
+                    modelVersions=model_versions,
+                    rules=rules,
+                    ruleExecutionMode=spec.rule_execution_mode
+                )
+            detector_version = response["detectorVersionId"]
+
+            self.client.update_detector_version_status(
+                detectorId=spec.detector_name,
+                detectorVersionId=detector_version,
+                status='ACTIVE'
+            )
+            return detector_version
+
+        return create_detector_version
+
+    def _get_detector(self, detector_name):
+        try:
+            detectors = self.client.get_detectors(detectorId=detector_name)["detectors"]
+        except botocore.errorfactory.ClientError as error:
+            if error.response['Error']['Code'] == 'ResourceNotFoundException':
+                return None
+            raise error
+        return detectors[0] if detectors else None
+
+    def _get_outcomes(self):
+        return {outcome["name"]: outcome.get("description")
+                for outcome in FraudDetectorPaginator(self.client.get_outcomes, "outcomes")}
+
+    def _get_model_status(self, model_name, model_type, model_version):
+        return self.client.get_model_version(modelId=model_name, modelType=model_type,
+                                             modelVersionNumber=model_version)["status"]
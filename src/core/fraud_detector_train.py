@@ -17,9 +17,11 @@
 
 import logging
 
-import boto3
-import botocore
+from core.client_factory import get_client
+from core.fraud_detector_metadata_cache import RESOURCE_TYPE_MODEL, RESOURCE_TYPE_EVENT_TYPE, RESOURCE_TYPE_VARIABLE, \
+    RESOURCE_TYPE_LABEL
 from core.fraud_detector_utils import FraudDetectorUtils
+from core.polling_strategy import POLLING_OPERATION_TRAINING
 from features.feature_variables_base import FeatureVariablesBase
 
 
@@ -27,7 +29,7 @@ class FraudDetectorTrain:
 
     def __init__(self, client=None, fraud_detector_utils=None):
         self.fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils()
-        self.client = client or boto3.client('frauddetector')
+        self.client = client or get_client()
 
     @property
     def _logger(self):
@@ -55,50 +57,40 @@ class FraudDetectorTrain:
 
         # Create / update initializes the model
         self._logger.info("Initialise model - {} ".format(model_name))
-        try:
-            self.client.get_models(
-                modelId=model_name,
-                modelType=model_type
-            )
-            self._logger.info("Model {} already exists ".format(model_name))
-        except botocore.errorfactory.ClientError as error:
-            # If resource not found, it means that the model doesnt exist, so lets create it
-            if error.response['Error']['Code'] == 'ResourceNotFoundException':
-                self._logger.info("Creating model: {}".format(model_name))
-                self.client.create_model(
-                    modelId=model_name,
-                    modelType=model_type,
-                    description=model_description,
-                    eventTypeName=event_type_name,
-                )
-            else:
-                raise error
+        self.fraud_detector_utils.try_create_model(model_name, model_type, model_description, event_type_name)
 
         # Trigger training
         self._logger.info("Triggering training {}".format(model_name))
-        response = self.client.create_model_version(
-            modelId=model_name,
-            modelType=model_type,
-            trainingDataSource='EXTERNAL_EVENTS',
-            trainingDataSchema={
-                # Model Variables
-                'modelVariables': model_features,
-                # Label
-                'labelSchema': {"labelMapper": model_label}
-            },
-            externalEventsDetail={
-                'dataLocation': s3_training_file,
-                'dataAccessRoleArn': role_arn
-            }
+        # The model, variables and labels may come from the cache, so drop them from it if any no longer exist
+        cached_resources = [(RESOURCE_TYPE_MODEL, FraudDetectorUtils.model_cache_key(model_type, model_name)),
+                            (RESOURCE_TYPE_EVENT_TYPE, event_type_name)] \
+            + [(RESOURCE_TYPE_VARIABLE, v) for v in model_features] \
+            + [(RESOURCE_TYPE_LABEL, l) for labels in model_label.values() for l in labels]
+        with self.fraud_detector_utils.invalidate_cache_on_error(cached_resources):
+            response = self.client.create_model_version(
+                modelId=model_name,
+                modelType=model_type,
+                trainingDataSource='EXTERNAL_EVENTS',
+                trainingDataSchema={
+                    # Model Variables
+                    'modelVariables': model_features,
+                    # Label
+                    'labelSchema': {"labelMapper": model_label}
+                },
+                externalEventsDetail={
+                    'dataLocation': s3_training_file,
+                    'dataAccessRoleArn': role_arn
+                }
 
-        )
+            )
         model_version = response["modelVersionNumber"]
         self._logger.info("Training job kicked off for model {} version {}".format(model_name, model_version))
 
         # Wait for training to complete
         if wait:
             self.fraud_detector_utils.wait_until_model_status(model_name, model_version, model_type,
-                                                              fail_states="ERROR", success_states="TRAINING_COMPLETE")
+                                                              fail_states="ERROR", success_states="TRAINING_COMPLETE",
+                                                              operation=POLLING_OPERATION_TRAINING)
 
         response = self.client.get_model_version(modelId=model_name, modelType=model_type,
                                                  modelVersionNumber=model_version)
@@ -16,16 +16,27 @@
 # ***************************************************************************************
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+from core.client_factory import get_client
 from core.fraud_detector_utils import FraudDetectorUtils
+from core.paginator import FraudDetectorPaginator
+from core.polling_strategy import POLLING_OPERATION_DEACTIVATION
+
+DEFAULT_MAX_WORKERS = 8
 
 
 class FraudDetectorUndeploy:
 
-    def __init__(self, client=None, fraud_detector_utils=None):
-        self.client = client or boto3.client('frauddetector')
+    def __init__(self, client=None, fraud_detector_utils=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param client: The fraud detector client
+        :param fraud_detector_utils: FraudDetectorUtils
+        :param max_workers: Maximum number of concurrent delete calls
+        """
+        self.client = client or get_client()
         self.fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils()
+        self.max_workers = max_workers
 
     @property
     def _logger(self):
@@ -43,67 +54,37 @@ class FraudDetectorUndeploy:
         )
 
     def delete_all_rules(self, detector_name):
-        next_token = ""
-        paginate = True
-        while paginate:
-
-            response = self.client.get_rules(
-                detectorId=detector_name,
-                nextToken=next_token
-            )
-
-            # no rule with the given id found.
-            if not response["ruleDetails"]:
-                break
-
-            # Loop through the versions within the current page
-            for rule in response["ruleDetails"]:
-                rule_id = rule["ruleId"]
-                rule_version = rule["ruleVersion"]
-                # delete detector version rules
-                response = self.client.delete_rule(
-                    rule={"detectorId": detector_name,
-                          "ruleId": rule_id,
-                          "ruleVersion": str(rule_version)
-                          }
-                )
-
-            next_token = response.get("nextToken", "")
-            paginate = next_token != ""
+        # List all the rule versions before deleting any, so deleting doesnt affect the pagination
+        rules = list(FraudDetectorPaginator(self.client.get_rules, "ruleDetails", prefetch=True,
+                                            detectorId=detector_name))
+        self._logger.info("Deleting {} rule versions of detector {}".format(len(rules), detector_name))
+
+        self._run_concurrently(lambda rule: self.client.delete_rule(
+            rule={"detectorId": detector_name,
+                  "ruleId": rule["ruleId"],
+                  "ruleVersion": str(rule["ruleVersion"])
+                  }), rules)
+
+        self.fraud_detector_utils.invalidate_rule_index(detector_name)
 
     def delete_all_detector_versions(self, detector_name):
-        # get detector versions:
-        next_token = ""
-        paginate = True
-        while paginate:
-
-            response = self.client.describe_detector(
-                detectorId=detector_name,
-                nextToken=next_token
-            )
-
-            # no versions found.
-            if not response["detectorVersionSummaries"]:
-                break
-
-            # Loop through the versions within the current page
-            for detector_version in response["detectorVersionSummaries"]:
-                version_no = detector_version["detectorVersionId"]
-
-                self.client.update_detector_version_status(
-                    detectorId=detector_name,
-                    detectorVersionId=str(version_no),
-                    status='INACTIVE'
-                )
-
-                # delete detector version
-                response = self.client.delete_detector_version(
-                    detectorId=detector_name,
-                    detectorVersionId=str(version_no)
-                )
-
-            next_token = response.get("nextToken", "")
-            paginate = next_token != ""
+        # List all the versions before deleting any, so deleting doesnt affect the pagination
+        detector_versions = list(FraudDetectorPaginator(self.client.describe_detector, "detectorVersionSummaries",
+                                                       prefetch=True, detectorId=detector_name))
+        self._logger.info("Deleting {} versions of detector {}".format(len(detector_versions), detector_name))
+
+        # An active version cannot be deleted, so deactivate all the active versions first
+        active_versions = [v for v in detector_versions if v.get("status", "ACTIVE") == "ACTIVE"]
+        self._run_concurrently(lambda v: self.client.update_detector_version_status(
+            detectorId=detector_name,
+            detectorVersionId=str(v["detectorVersionId"]),
+            status='INACTIVE'
+        ), active_versions)
+
+        self._run_concurrently(lambda v: self.client.delete_detector_version(
+            detectorId=detector_name,
+            detectorVersionId=str(v["detectorVersionId"])
+        ), detector_versions)
 
     def undeploy_model(self, model_name, model_version, model_type='ONLINE_FRAUD_INSIGHTS'):
         self.client.update_model_version_status(
@@ -114,4 +95,13 @@ class FraudDetectorUndeploy:
         )
         self.fraud_detector_utils.wait_until_model_status(model_name=model_name, model_version=model_version,
                                                           model_type=model_type, fail_states="ERROR",
-                                                          success_states="TRAINING_COMPLETE")
+                                                          success_states="TRAINING_COMPLETE",
+                                                          operation=POLLING_OPERATION_DEACTIVATION)
+
+    def _run_concurrently(self, func, items):
+        """
+        Calls func for each item on a bounded thread pool, and raises the first error once all calls complete
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in executor.map(func, items):
+                pass
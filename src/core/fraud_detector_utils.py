@@ -15,22 +15,63 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
 # ***************************************************************************************
 
+import contextlib
 import json
 import logging
+import threading
 import time
+from collections import namedtuple
 
-import boto3
 import botocore
-from rules.detector_rule_base import DetectorRuleBase
+from core.client_factory import get_client
+from core.fraud_detector_metadata_cache import FraudDetectorMetadataCache, RESOURCE_TYPE_VARIABLE, \
+    RESOURCE_TYPE_LABEL, RESOURCE_TYPE_OUTCOME, RESOURCE_TYPE_RULE, RESOURCE_TYPE_MODEL, RESOURCE_TYPE_ENTITY_TYPE, \
+    RESOURCE_TYPE_EVENT_TYPE
+from core.paginator import FraudDetectorPaginator
+from core.polling_strategy import DEFAULT_POLLING_STRATEGIES, ExponentialBackoffPolling
+from rules.detector_rule_base import DetectorRuleBase, rule_content_hash
 
 FRAUD_DETECTOR_DATA_SOURCE_EVENT = 'EVENT'
 FRAUD_DETECTOR_DATA_SOURCE_MODEL_SCORE = 'MODEL_SCORE'
 
+# Service limits for the batch variable APIs
+BATCH_GET_VARIABLE_MAX_NAMES = 100
+BATCH_CREATE_VARIABLE_MAX_ENTRIES = 25
+
+# The only BatchGetVariable error code that means the variable does not exist, any other code is a failure
+BATCH_VARIABLE_NOT_FOUND_ERROR_CODE = 404
+
+# Errors of a call that mean a resource it uses, e.g. deleted outside of this run, is missing, so its cache entry
+# is stale
+STALE_CACHE_ERROR_CODES = {"ResourceNotFoundException", "ValidationException"}
+
+# Maximum get_model_version calls per second shared by all the models waited on together
+DEFAULT_MODEL_STATUS_MAX_CALLS_PER_SECOND = 2
+
+# A model version to wait on, fail_states and success_states are a single state or a list of states
+ModelStatusTarget = namedtuple("ModelStatusTarget",
+                               ["model_name", "model_version", "model_type", "fail_states", "success_states"])
+
 
 class FraudDetectorUtils:
 
-    def __init__(self, fraud_detector_client=None):
-        self.fraud_detector_client = fraud_detector_client or boto3.client('frauddetector')
+    def __init__(self, fraud_detector_client=None, metadata_cache=None, polling_strategies=None):
+        """
+        :param fraud_detector_client: The fraud detector client
+        :param metadata_cache: A FraudDetectorMetadataCache. Defaults to the cache in the directory set by the
+                               FRAUD_DETECTOR_METADATA_CACHE_DIR environment variable, no caching if not set.
+        :param polling_strategies: A dict of polling operation to PollingStrategy, overrides
+                                   DEFAULT_POLLING_STRATEGIES
+        """
+        self.fraud_detector_client = fraud_detector_client or get_client()
+        self.metadata_cache = metadata_cache if metadata_cache is not None \
+            else FraudDetectorMetadataCache.from_environment(self.fraud_detector_client)
+        self.polling_strategies = dict(DEFAULT_POLLING_STRATEGIES, **(polling_strategies or {}))
+        # Model status transitions observed while polling, to help tune the polling intervals per operation
+        self.status_transitions = []
+        # Latest version of each rule, per detector
+        self._rule_indexes = {}
+        self._rule_index_lock = threading.RLock()
 
     @property
     def _logger(self):
@@ -48,25 +89,24 @@ class FraudDetectorUtils:
         :param data_source:
         :return:
         """
+        data_source = data_source or FRAUD_DETECTOR_DATA_SOURCE_EVENT
+
+        cached_variable = self._cache_get(RESOURCE_TYPE_VARIABLE, variable_name)
+        if cached_variable is not None and self._is_matching_variable(cached_variable, fraud_variable_type, data_type,
+                                                                      default_value, data_source):
+            self._logger.info("Existing variable (cached): {}".format(variable_name))
+            return variable_name
+
         try:
-            data_source = data_source or FRAUD_DETECTOR_DATA_SOURCE_EVENT
             variables_resp = self.fraud_detector_client.get_variables(name=variable_name)
             self._logger.info("Existing variable: {}".format(variable_name))
 
             assert len(variables_resp["variables"]) == 1, "Expecting just one variable"
             variable = variables_resp["variables"][0]
 
-            # Verify that existing variables, potentially used by other models are not accidentally changed.
-            # And raise an error if that is the case
-            if variable["dataType"] != data_type \
-                    or variable["dataSource"] != data_source \
-                    or variable["variableType"] != fraud_variable_type \
-                    or str(variable["defaultValue"]) != str(default_value):
-                error_message_fmt = "The variable {} already exists, but the details {},{},{},{} do not match." \
-                                    " Please change the variable name or delete the existing variable"
-                raise ValueError(
-                    error_message_fmt.format(json.dumps(variable), data_type, data_source, fraud_variable_type,
-                                             default_value))
+            self._verify_existing_variable(variable, fraud_variable_type, data_type, default_value, data_source)
+            self._cache_put(RESOURCE_TYPE_VARIABLE, variable_name, variable)
+            self._logger.debug("Variable {} verified with 1 API call".format(variable_name))
 
         except botocore.errorfactory.ClientError as error:
             # If resource not found, it means that the variable doesnt exist, so lets create it
@@ -80,16 +120,260 @@ class FraudDetectorUtils:
                     defaultValue=default_value,
                     description=description,
                     variableType=fraud_variable_type)
+                self._cache_put(RESOURCE_TYPE_VARIABLE, variable_name,
+                                self._variable_entry(variable_name, fraud_variable_type, data_type, default_value,
+                                                     description, data_source))
+                self._logger.debug("Variable {} created with 2 API calls".format(variable_name))
             else:
                 raise error
 
         return variable_name
 
+    def try_create_variables(self, variable_entries):
+        """
+        Bulk version of try_create_variable. Looks up all the variables using BatchGetVariable and creates the missing
+        ones using BatchCreateVariable, so provisioning N variables takes roughly N/100 + N/25 API calls instead of
+        up to 2N.
+        :param variable_entries: A list of dict in the BatchCreateVariable format, e.g. [{"name": "email",
+                                     "variableType": "EMAIL_ADDRESS",
+                                     "dataType": "STRING",
+                                     "defaultValue": "",
+                                     "description": "Email address",
+                                     "dataSource": "EVENT"}]. dataSource defaults to EVENT
+        :return: a list of variable names in the same order as the entries
+        """
+        entries = [dict(e, dataSource=e.get("dataSource") or FRAUD_DETECTOR_DATA_SOURCE_EVENT) for e in
+                   variable_entries]
+        names = [e["name"] for e in entries]
+        num_get_calls = 0
+        num_create_calls = 0
+
+        # Variables already known from the cache do not need a lookup
+        existing_variables = {}
+        for entry in entries:
+            cached_variable = self._cache_get(RESOURCE_TYPE_VARIABLE, entry["name"])
+            if cached_variable is not None and self._is_matching_variable(cached_variable, entry["variableType"],
+                                                                          entry["dataType"], entry["defaultValue"],
+                                                                          entry["dataSource"]):
+                existing_variables[entry["name"]] = cached_variable
+        lookup_names = [n for n in names if n not in existing_variables]
+
+        # Look up existing variables
+        for chunk in self._chunks(lookup_names, BATCH_GET_VARIABLE_MAX_NAMES):
+            response = self.fraud_detector_client.batch_get_variable(names=chunk)
+            num_get_calls += 1
+            for error in response.get("errors", []):
+                if error.get("code") != BATCH_VARIABLE_NOT_FOUND_ERROR_CODE:
+                    raise ValueError("Failed to retrieve variable {}: {}".format(error["name"], error.get("message")))
+            for variable in response.get("variables", []):
+                existing_variables[variable["name"]] = variable
+                self._cache_put(RESOURCE_TYPE_VARIABLE, variable["name"], variable)
+
+        # Verify that the existing ones match the expected details
+        missing_entries = []
+        for entry in entries:
+            variable = existing_variables.get(entry["name"])
+            if variable is None:
+                missing_entries.append(entry)
+                continue
+            self._logger.info("Existing variable: {}".format(entry["name"]))
+            self._verify_existing_variable(variable, entry["variableType"], entry["dataType"], entry["defaultValue"],
+                                           entry["dataSource"])
+
+        # Create the missing ones
+        for chunk in self._chunks(missing_entries, BATCH_CREATE_VARIABLE_MAX_ENTRIES):
+            self._logger.info("Creating variables: {}".format([e["name"] for e in chunk]))
+            response = self.fraud_detector_client.batch_create_variable(
+                variableEntries=[dict(e, defaultValue=str(e["defaultValue"])) for e in chunk])
+            num_create_calls += 1
+            failed_names = {e.get("name") for e in response.get("errors") or []}
+            for e in chunk:
+                if e["name"] not in failed_names:
+                    self._cache_put(RESOURCE_TYPE_VARIABLE, e["name"], dict(e, defaultValue=str(e["defaultValue"])))
+            if response.get("errors"):
+                raise ValueError("Failed to create variables {}".format(json.dumps(response["errors"])))
+
+        self._logger.info(
+            "Provisioned {} variables ({} created) with {} API calls ({} BatchGetVariable, {} BatchCreateVariable),"
+            " the per variable path takes up to {} API calls".format(len(names), len(missing_entries),
+                                                                    num_get_calls + num_create_calls, num_get_calls,
+                                                                    num_create_calls,
+                                                                    len(names) + len(missing_entries)))
+
+        return names
+
+    @staticmethod
+    def _is_matching_variable(variable, fraud_variable_type, data_type, default_value, data_source):
+        return variable["dataType"] == data_type \
+               and variable["dataSource"] == data_source \
+               and variable["variableType"] == fraud_variable_type \
+               and str(variable["defaultValue"]) == str(default_value)
+
+    @staticmethod
+    def _variable_entry(variable_name, fraud_variable_type, data_type, default_value, description, data_source):
+        return {"name": variable_name,
+                "variableType": fraud_variable_type,
+                "dataType": data_type,
+                "defaultValue": str(default_value),
+                "description": description,
+                "dataSource": data_source}
+
+    def _verify_existing_variable(self, variable, fraud_variable_type, data_type, default_value, data_source):
+        # Verify that existing variables, potentially used by other models are not accidentally changed.
+        # And raise an error if that is the case
+        if not self._is_matching_variable(variable, fraud_variable_type, data_type, default_value, data_source):
+            error_message_fmt = "The variable {} already exists, but the details {},{},{},{} do not match." \
+                                " Please change the variable name or delete the existing variable"
+            raise ValueError(
+                error_message_fmt.format(json.dumps(variable, default=str), data_type, data_source,
+                                         fraud_variable_type, default_value))
+
+    @staticmethod
+    def _chunks(items, size):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
+    def _cache_get(self, resource_type, resource_id):
+        if self.metadata_cache is None:
+            return None
+        return self.metadata_cache.get(resource_type, resource_id)
+
+    def _cache_put(self, resource_type, resource_id, value):
+        if self.metadata_cache is not None:
+            self.metadata_cache.put(resource_type, resource_id, value)
+
+    def _cache_invalidate(self, resource_type, resource_id):
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate(resource_type, resource_id)
+
+    @staticmethod
+    def model_cache_key(model_type, model_name):
+        return "{}/{}".format(model_type, model_name)
+
+    @contextlib.contextmanager
+    def invalidate_cache_on_error(self, resources):
+        """
+        Invalidates the cache entries of the resources used by a call when it fails because one of them is missing or
+        invalid, e.g. deleted outside of this run, so the next attempt reads them from Fraud Detector again rather
+        than failing until the entries expire
+        :param resources: A list of (resource type, resource id) tuples. The resource id of RESOURCE_TYPE_RULE is the
+                          detector name, as the rules are cached per detector
+        """
+        try:
+            yield
+        except botocore.errorfactory.ClientError as error:
+            if error.response['Error']['Code'] in STALE_CACHE_ERROR_CODES:
+                self._logger.info("Invalidating the cached {} after {}".format(resources, error))
+                for resource_type, resource_id in resources:
+                    if resource_type == RESOURCE_TYPE_RULE:
+                        self.invalidate_rule_index(resource_id)
+                    else:
+                        self._cache_invalidate(resource_type, resource_id)
+            raise
+
     def create_or_update_label(self, label, description):
+        if self._cache_get(RESOURCE_TYPE_LABEL, label) == {"name": label, "description": description}:
+            self._logger.info("Label {} unchanged (cached)".format(label))
+            return label
+
         self._logger.info("Creating label {}".format(label))
         self.fraud_detector_client.put_label(name=label, description=description)
+        self._cache_put(RESOURCE_TYPE_LABEL, label, {"name": label, "description": description})
         return label
 
+    def try_create_labels(self, labels):
+        """
+        Creates the labels that do not exist yet. The existing labels are found from the cache, else from a single
+        listing of the labels, so a run with the same labels makes no put_label calls
+        :param labels: A dict of label name to description
+        :return: a list of the label names
+        """
+        missing_labels = [l for l in labels if self._cache_get(RESOURCE_TYPE_LABEL, l) is None]
+        if missing_labels:
+            existing_labels = FraudDetectorPaginator(self.fraud_detector_client.get_labels, "labels")
+            for label in existing_labels:
+                self._cache_put(RESOURCE_TYPE_LABEL, label["name"],
+                                {"name": label["name"], "description": label.get("description")})
+                if label["name"] in missing_labels:
+                    missing_labels.remove(label["name"])
+
+        for label in missing_labels:
+            self._logger.info("Creating label {}".format(label))
+            self.fraud_detector_client.put_label(name=label, description=labels[label])
+            self._cache_put(RESOURCE_TYPE_LABEL, label, {"name": label, "description": labels[label]})
+
+        return list(labels)
+
+    def create_or_update_outcome(self, outcome, description):
+        if self._cache_get(RESOURCE_TYPE_OUTCOME, outcome) == {"name": outcome, "description": description}:
+            self._logger.info("Outcome {} unchanged (cached)".format(outcome))
+            return outcome
+
+        self._logger.info("Creating outcome {}".format(outcome))
+        self.fraud_detector_client.put_outcome(name=outcome, description=description)
+        self._cache_put(RESOURCE_TYPE_OUTCOME, outcome, {"name": outcome, "description": description})
+        return outcome
+
+    def create_or_update_entity_type(self, name, description):
+        entity_type = {"name": name, "description": description}
+        if self._cache_get(RESOURCE_TYPE_ENTITY_TYPE, name) == entity_type:
+            self._logger.info("Entity type {} unchanged (cached)".format(name))
+            return name
+
+        self.fraud_detector_client.put_entity_type(**entity_type)
+        self._cache_put(RESOURCE_TYPE_ENTITY_TYPE, name, entity_type)
+        return name
+
+    def create_or_update_event_type(self, name, description, event_variables, labels, entity_types):
+        event_type = {"name": name,
+                      "description": description,
+                      "eventVariables": list(event_variables),
+                      "labels": list(labels),
+                      "entityTypes": list(entity_types)}
+        if self._cache_get(RESOURCE_TYPE_EVENT_TYPE, name) == event_type:
+            self._logger.info("Event type {} unchanged (cached)".format(name))
+            return name
+
+        resources = [(RESOURCE_TYPE_VARIABLE, v) for v in event_type["eventVariables"]] \
+            + [(RESOURCE_TYPE_LABEL, l) for l in event_type["labels"]] \
+            + [(RESOURCE_TYPE_ENTITY_TYPE, e) for e in event_type["entityTypes"]]
+        with self.invalidate_cache_on_error(resources):
+            self.fraud_detector_client.put_event_type(**event_type)
+        self._cache_put(RESOURCE_TYPE_EVENT_TYPE, name, event_type)
+        return name
+
+    def try_create_model(self, model_name, model_type, model_description, event_type_name):
+        """
+        Creates the model if it doesnt already exist
+        :return: The model name
+        """
+        cache_key = self.model_cache_key(model_type, model_name)
+        if self._cache_get(RESOURCE_TYPE_MODEL, cache_key) is not None:
+            self._logger.info("Model {} already exists (cached)".format(model_name))
+            return model_name
+
+        try:
+            self.fraud_detector_client.get_models(
+                modelId=model_name,
+                modelType=model_type
+            )
+            self._logger.info("Model {} already exists ".format(model_name))
+        except botocore.errorfactory.ClientError as error:
+            # If resource not found, it means that the model doesnt exist, so lets create it
+            if error.response['Error']['Code'] == 'ResourceNotFoundException':
+                self._logger.info("Creating model: {}".format(model_name))
+                self.fraud_detector_client.create_model(
+                    modelId=model_name,
+                    modelType=model_type,
+                    description=model_description,
+                    eventTypeName=event_type_name,
+                )
+            else:
+                raise error
+
+        self._cache_put(RESOURCE_TYPE_MODEL, cache_key, {"modelId": model_name, "modelType": model_type})
+        return model_name
+
     def create_or_update_rule(self, detector_name: str, detector_rule: DetectorRuleBase):
         """
 
@@ -98,21 +382,37 @@ class FraudDetectorUtils:
         :return:
         """
 
-        rule_version = self._get_max_rule_version(detector_name, detector_rule.rule_id)
-
-        if rule_version:
-            rule_version = rule_version
+        indexed_rule = self.get_rule_index(detector_name).get(detector_rule.rule_id)
+        expression = detector_rule.get_rule_expression()
+
+        if indexed_rule and self._is_same_rule_content(indexed_rule, expression, detector_rule):
+            # Nothing changed, so reuse the deployed version rather than creating a new one
+            self._logger.info("Rule id {} version {} unchanged, reusing ..".format(detector_rule.rule_id,
+                                                                                  indexed_rule["ruleVersion"]))
+            return {
+                "ruleId": detector_rule.rule_id,
+                "detectorId": detector_name,
+                "ruleVersion": str(indexed_rule["ruleVersion"])
+            }
+
+        if indexed_rule:
+            rule_version = indexed_rule["ruleVersion"]
             # Rule exists so update..
             self._logger.info("Rule id {} exists, updating ..".format(detector_rule.rule_id))
 
-            resp = self.fraud_detector_client.update_rule_version(rule={"ruleId": detector_rule.rule_id,
-                                                                        "detectorId": detector_name,
-                                                                        "ruleVersion": str(int(rule_version))
-                                                                        },
-                                                                  description=detector_rule.description,
-                                                                  expression=detector_rule.get_rule_expression(),
-                                                                  language='DETECTORPL',
-                                                                  outcomes=detector_rule.outcomes)
+            try:
+                resp = self.fraud_detector_client.update_rule_version(rule={"ruleId": detector_rule.rule_id,
+                                                                            "detectorId": detector_name,
+                                                                            "ruleVersion": str(int(rule_version))
+                                                                            },
+                                                                      description=detector_rule.description,
+                                                                      expression=expression,
+                                                                      language='DETECTORPL',
+                                                                      outcomes=detector_rule.outcomes)
+            except botocore.errorfactory.ClientError:
+                # The indexed rule version may be stale, so make sure the next attempt scans the rules again
+                self.invalidate_rule_index(detector_name)
+                raise
 
         else:
             # Rule doesnt exists
@@ -122,11 +422,16 @@ class FraudDetectorUtils:
                 ruleId=detector_rule.rule_id,
                 detectorId=detector_name,
                 description=detector_rule.description,
-                expression=detector_rule.get_rule_expression(),
+                expression=expression,
                 language='DETECTORPL',
                 outcomes=detector_rule.outcomes)
 
         rule_version = resp["rule"]["ruleVersion"]
+        self._update_rule_index(detector_name, {"ruleId": detector_rule.rule_id,
+                                                "ruleVersion": str(rule_version),
+                                                "description": detector_rule.description,
+                                                "expression": expression,
+                                                "outcomes": list(detector_rule.outcomes)})
 
         result = {
             "ruleId": detector_rule.rule_id,
@@ -136,36 +441,117 @@ class FraudDetectorUtils:
 
         return result
 
-    def _get_max_rule_version(self, detector_name, rule_id):
-        max_version = 0
+    @staticmethod
+    def _is_same_rule_content(indexed_rule, expression, detector_rule):
+        deployed_hash = rule_content_hash(indexed_rule.get("expression"), indexed_rule.get("outcomes"),
+                                          indexed_rule.get("description"))
+        return deployed_hash == detector_rule.get_content_hash(expression)
 
-        next_token = ""
-        paginate = True
+    def get_active_detector_version(self, detector_name):
+        """
+        Returns the details of the active version of a detector, as returned by get_detector_version
+        :param detector_name: The name of the detector
+        :return: The get_detector_version response or None if the detector has no active version
+        """
+        detector_versions = FraudDetectorPaginator(self.fraud_detector_client.describe_detector,
+                                                   "detectorVersionSummaries", detectorId=detector_name)
+        try:
+            for summary in detector_versions:
+                if summary["status"] == "ACTIVE":
+                    return self.fraud_detector_client.get_detector_version(
+                        detectorId=detector_name,
+                        detectorVersionId=str(summary["detectorVersionId"]))
+        except botocore.errorfactory.ClientError as error:
+            if error.response['Error']['Code'] == 'ResourceNotFoundException':
+                return None
+            raise error
 
-        while paginate:
+        return None
 
-            response = self.fraud_detector_client.get_rules(
-                ruleId=rule_id,
-                detectorId=detector_name,
-                nextToken=next_token
-            )
+    @staticmethod
+    def is_same_detector_version(detector_version, model_versions, rules, rule_execution_mode):
+        """
+        Checks if a detector version has the given models and rules
+        :param detector_version: A get_detector_version response, or None
+        :param model_versions: A list of dict with modelId, modelType and modelVersionNumber
+        :param rules: A list of dict with ruleId and ruleVersion
+        :param rule_execution_mode: FIRST_MATCHED or ALL_MATCHED
+        :return: True if the detector version has the same models, rules and rule execution mode
+        """
+        if detector_version is None:
+            return False
 
-            # no rule with the given id found.
-            if not response["ruleDetails"]:
-                return None
+        def model_keys(versions):
+            return sorted((m["modelId"], m["modelType"], str(m["modelVersionNumber"])) for m in versions)
 
-            # Loop through the versions within the current page
-            for rule in response["ruleDetails"]:
-                version_no = float(rule["ruleVersion"])
-                if version_no > max_version:
-                    max_version = version_no
+        def rule_keys(version_rules):
+            # The order matters, e.g. when the first matched rule wins
+            return [(r["ruleId"], str(r["ruleVersion"])) for r in version_rules]
 
-            next_token = response.get("nextToken", "")
-            paginate = next_token != ""
+        return model_keys(detector_version.get("modelVersions", [])) == model_keys(model_versions) \
+               and rule_keys(detector_version.get("rules", [])) == rule_keys(rules) \
+               and detector_version.get("ruleExecutionMode") == rule_execution_mode
 
-        return max_version
+    def get_rule_index(self, detector_name, refresh=False):
+        """
+        Returns the latest version of every rule of a detector, built from a single scan of all the detector's rules
+        and reused by all subsequent rule calls.
+        :param detector_name: The name of the detector
+        :param refresh: If true, scans the rules again instead of using the cached index
+        :return: A dict of rule id to the details of its highest version, e.g. {"positivescorerule" : {
+                    "ruleId": "positivescorerule", "ruleVersion": "3", "description": "..", "expression": "..",
+                    "outcomes": ["positive"]}}
+        """
+        with self._rule_index_lock:
+            if not refresh:
+                if detector_name in self._rule_indexes:
+                    return self._rule_indexes[detector_name]
+
+                cached_index = self._cache_get(RESOURCE_TYPE_RULE, detector_name)
+                if cached_index is not None:
+                    self._rule_indexes[detector_name] = cached_index
+                    return cached_index
+
+            rule_index = {}
+            for rule in self._get_detector_rules(detector_name):
+                indexed_rule = rule_index.get(rule["ruleId"])
+                if indexed_rule is None or int(rule["ruleVersion"]) > int(indexed_rule["ruleVersion"]):
+                    rule_index[rule["ruleId"]] = {"ruleId": rule["ruleId"],
+                                                  "ruleVersion": str(rule["ruleVersion"]),
+                                                  "description": rule.get("description"),
+                                                  "expression": rule.get("expression"),
+                                                  "outcomes": rule.get("outcomes", [])}
+
+            self._logger.info("Indexed {} rules of detector {}".format(len(rule_index), detector_name))
+            self._rule_indexes[detector_name] = rule_index
+            self._cache_put(RESOURCE_TYPE_RULE, detector_name, rule_index)
+            return rule_index
+
+    def invalidate_rule_index(self, detector_name):
+        with self._rule_index_lock:
+            self._rule_indexes.pop(detector_name, None)
+            self._cache_invalidate(RESOURCE_TYPE_RULE, detector_name)
+
+    def _update_rule_index(self, detector_name, indexed_rule):
+        with self._rule_index_lock:
+            rule_index = self._rule_indexes.setdefault(detector_name, {})
+            rule_index[indexed_rule["ruleId"]] = indexed_rule
+            self._cache_put(RESOURCE_TYPE_RULE, detector_name, rule_index)
+
+    def _get_detector_rules(self, detector_name):
+        rules = FraudDetectorPaginator(self.fraud_detector_client.get_rules, "ruleDetails", prefetch=True,
+                                       detectorId=detector_name)
+        try:
+            for rule in rules:
+                yield rule
+        except botocore.errorfactory.ClientError as error:
+            # A detector that doesnt exist yet has no rules
+            if error.response['Error']['Code'] == 'ResourceNotFoundException':
+                return
+            raise error
 
-    def wait_until_model_status(self, model_name, model_version, model_type, fail_states, success_states):
+    def wait_until_model_status(self, model_name, model_version, model_type, fail_states, success_states,
+                                operation=None, polling_strategy=None):
         """
         Polls for a model status until either it reaches the failure or success states
         :param model_name: Model name
@@ -173,30 +559,107 @@ class FraudDetectorUtils:
         :param model_type: Model type
         :param fail_states: a single state or a list of states indicating failure.
         :param success_states: a single state or a list of states indicating success.
-        :return:
+        :param operation: The operation being waited on, e.g. POLLING_OPERATION_ACTIVATION. Used to pick the polling
+                          strategy and to record the status transitions
+        :param polling_strategy: The PollingStrategy to use, overrides the strategy for the operation
+        :return: The final get_model_version response
         """
-        stime = time.time()
-        job_inprogress = True
+        target = ModelStatusTarget(model_name, model_version, model_type, fail_states, success_states)
+        for _, response in self.wait_until_model_statuses([target], operation=operation,
+                                                          polling_strategy=polling_strategy):
+            return response
 
-        # If single state string is passed , convert to list
-        if isinstance(fail_states, str): fail_states = [fail_states]
-        if isinstance(success_states, str): success_states = [success_states]
-
-        end_states = fail_states + success_states
-
-        while job_inprogress:
-            response = self.fraud_detector_client.get_model_version(modelId=model_name, modelType=model_type,
-                                                                    modelVersionNumber=str(model_version))
+    def wait_until_model_statuses(self, targets, operation=None, polling_strategy=None,
+                                  max_calls_per_second=DEFAULT_MODEL_STATUS_MAX_CALLS_PER_SECOND, stop_event=None):
+        """
+        Polls for the status of several models in a single loop, so waiting on N models takes about as long as the
+        slowest one. Each model backs off independently, while all the status checks share a single rate budget.
+        :param targets: A list of ModelStatusTarget
+        :param operation: The operation being waited on, e.g. POLLING_OPERATION_ACTIVATION. Used to pick the polling
+                          strategy and to record the status transitions
+        :param polling_strategy: The PollingStrategy to use, overrides the strategy for the operation
+        :param max_calls_per_second: Maximum number of get_model_version calls per second across all the targets
+        :param stop_event: A threading.Event that ends the wait early when set, e.g. when a concurrent change failed
+        :return: A generator of (target, get_model_version response) tuples, in the order the targets reach a
+                 success state. Raises as soon as any target reaches a fail state.
+        """
+        polling_strategy = polling_strategy or self.polling_strategies.get(operation) or ExponentialBackoffPolling()
+        min_call_interval = 1.0 / max_calls_per_second
+        stime = time.monotonic()
+        last_call_time = None
+
+        pending = []
+        for target in targets:
+            # If single state string is passed , convert to list
+            fail_states = [target.fail_states] if isinstance(target.fail_states, str) else target.fail_states
+            success_states = [target.success_states] if isinstance(target.success_states, str) \
+                else target.success_states
+            pending.append({"target": target, "fail_states": fail_states, "success_states": success_states,
+                            "intervals": polling_strategy.intervals(), "next_check": stime, "last_status": None,
+                            "last_transition_time": stime})
+
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                self._logger.info("Stopped waiting on {} models".format(len(pending)))
+                return
+            # Check the model that is due next, as soon as the rate budget allows
+            waiter = min(pending, key=lambda w: w["next_check"])
+            target = waiter["target"]
+            now = time.monotonic()
+            check_time = waiter["next_check"] if last_call_time is None \
+                else max(waiter["next_check"], last_call_time + min_call_interval)
+            if check_time > now:
+                if stop_event is None:
+                    time.sleep(check_time - now)
+                elif stop_event.wait(check_time - now):
+                    continue
+
+            response = self.fraud_detector_client.get_model_version(modelId=target.model_name,
+                                                                    modelType=target.model_type,
+                                                                    modelVersionNumber=str(target.model_version))
+            now = time.monotonic()
+            last_call_time = now
 
             reponse_status = response['status']
-            if reponse_status not in end_states:
-                self._logger.info(
-                    "Current inprogress, state {}: {:.2f} minutes".format(reponse_status, (time.time() - stime) / 60))
-                time.sleep(60)  # -- sleep for 60 seconds
+            if reponse_status != waiter["last_status"]:
+                self._record_status_transition(operation, target.model_name, target.model_version,
+                                               waiter["last_status"], reponse_status,
+                                               now - waiter["last_transition_time"])
+                waiter["last_status"], waiter["last_transition_time"] = reponse_status, now
+
             # Error
-            elif reponse_status in fail_states:
+            if reponse_status in waiter["fail_states"]:
                 raise Exception("Failed to complete successfully {}".format(response))
             # Complete
-            else:
-                self._logger.info("Model status : " + reponse_status)
-                job_inprogress = False
+            if reponse_status in waiter["success_states"]:
+                self._logger.info("Model {} version {} status : {} after {:.2f} minutes".format(
+                    target.model_name, target.model_version, reponse_status, (now - stime) / 60))
+                pending.remove(waiter)
+                yield target, response
+                continue
+
+            elapsed = now - stime
+            if polling_strategy.deadline is not None and elapsed >= polling_strategy.deadline:
+                raise TimeoutError("Model {} version {} did not reach {} within {} seconds, current state {}".format(
+                    target.model_name, target.model_version, waiter["success_states"], polling_strategy.deadline,
+                    reponse_status))
+
+            interval = next(waiter["intervals"])
+            if polling_strategy.deadline is not None:
+                interval = min(interval, polling_strategy.deadline - elapsed)
+            self._logger.info(
+                "Model {} version {} inprogress, state {}: {:.2f} minutes, next check in {:.0f} seconds".format(
+                    target.model_name, target.model_version, reponse_status, elapsed / 60, interval))
+            waiter["next_check"] = now + interval
+
+    def _record_status_transition(self, operation, model_name, model_version, from_status, to_status, duration):
+        transition = {"operation": operation,
+                      "modelId": model_name,
+                      "modelVersionNumber": str(model_version),
+                      "fromStatus": from_status,
+                      "toStatus": to_status,
+                      "durationSeconds": duration}
+        self.status_transitions.append(transition)
+        if from_status is not None:
+            self._logger.info("Model {} version {} status {} -> {} after {:.1f} seconds".format(
+                model_name, model_version, from_status, to_status, duration))
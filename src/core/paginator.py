@@ -0,0 +1,107 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import queue
+import threading
+
+_END_OF_PAGES = object()
+
+
+class FraudDetectorPaginator:
+    """
+    Lazily iterates over the items of a paginated fraud detector operation, e.g. get_rules or describe_detector.
+    Only the current page, and the next page when prefetching, are held in memory.
+
+    Usage:
+        for rule in FraudDetectorPaginator(client.get_rules, "ruleDetails", detectorId=detector_name):
+            ...
+    """
+
+    def __init__(self, operation, result_key, prefetch=False, **kwargs):
+        """
+        :param operation: The client method to call, e.g. client.get_rules
+        :param result_key: The key of the list of items in the response, e.g. ruleDetails
+        :param prefetch: If true, the next page is fetched in a background thread while the current page is processed
+        :param kwargs: The arguments passed to every call, apart from nextToken
+        """
+        self.operation = operation
+        self.result_key = result_key
+        self.prefetch = prefetch
+        self.kwargs = kwargs
+
+    def __iter__(self):
+        for page in self.pages():
+            # The item list is left out of some responses with no items
+            for item in page.get(self.result_key, []):
+                yield item
+
+    def pages(self):
+        """
+        Yields the responses of the operation, one per page
+        """
+        if self.prefetch:
+            return self._prefetched_pages()
+        return self._fetch_pages()
+
+    def _fetch_pages(self, stop_event=None):
+        next_token = ""
+        paginate = True
+        while paginate and not (stop_event and stop_event.is_set()):
+            response = self.operation(nextToken=next_token, **self.kwargs)
+            yield response
+
+            next_token = response.get("nextToken", "")
+            paginate = next_token != ""
+
+    def _prefetched_pages(self):
+        pages = queue.Queue()
+        # The background thread takes a slot before fetching a page and the caller frees it on taking a page, so the
+        # thread only fetches the page after the one being processed
+        slot = threading.Semaphore(1)
+        stop_event = threading.Event()
+
+        def acquire_slot():
+            while not stop_event.is_set():
+                if slot.acquire(timeout=0.1):
+                    return True
+            return False
+
+        def fetch():
+            try:
+                fetched_pages = self._fetch_pages(stop_event)
+                while acquire_slot():
+                    page = next(fetched_pages, _END_OF_PAGES)
+                    pages.put(page)
+                    if page is _END_OF_PAGES:
+                        return
+            except Exception as error:
+                pages.put(error)
+
+        fetcher = threading.Thread(target=fetch, name="paginator-prefetch", daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                page = pages.get()
+                slot.release()
+                if page is _END_OF_PAGES:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            # Stops the background thread when the caller stops iterating early
+            stop_event.set()
@@ -0,0 +1,96 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import random
+
+# Operations that poll for a model status, each with its own default polling strategy
+POLLING_OPERATION_ACTIVATION = "activation"
+POLLING_OPERATION_DEACTIVATION = "deactivation"
+POLLING_OPERATION_TRAINING = "training"
+
+
+class PollingStrategy:
+    """
+    Base class for the intervals to wait between status checks
+    """
+
+    def __init__(self, deadline=None):
+        """
+        :param deadline: The maximum number of seconds to wait overall, None to wait forever
+        """
+        self.deadline = deadline
+
+    def intervals(self):
+        """
+        Returns an iterator of the number of seconds to sleep before each subsequent status check. The first check is
+        always immediate.
+        :return:
+        """
+        raise NotImplementedError
+
+
+class FixedIntervalPolling(PollingStrategy):
+    """
+    Waits the same number of seconds between status checks
+    """
+
+    def __init__(self, interval=60, deadline=None):
+        super().__init__(deadline)
+        self.interval = interval
+
+    def intervals(self):
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoffPolling(PollingStrategy):
+    """
+    Waits exponentially longer between status checks, up to a maximum interval, with random jitter
+    """
+
+    def __init__(self, initial_interval=5, max_interval=60, multiplier=2.0, jitter=0.2, deadline=None, seed=None):
+        """
+        :param initial_interval: Seconds to wait before the second check
+        :param max_interval: Maximum number of seconds to wait between checks
+        :param multiplier: Factor the interval grows by after every check
+        :param jitter: Fraction of the interval to randomly add or subtract, e.g 0.2 is +/- 20%
+        :param deadline: The maximum number of seconds to wait overall, None to wait forever
+        :param seed: Random seed for the jitter
+        """
+        super().__init__(deadline)
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def intervals(self):
+        interval = self.initial_interval
+        while True:
+            jittered_interval = interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+            yield min(self.max_interval, jittered_interval)
+            interval = min(self.max_interval, interval * self.multiplier)
+
+
+# Activation and deactivation usually take seconds to a few minutes, training takes hours
+DEFAULT_POLLING_STRATEGIES = {
+    POLLING_OPERATION_ACTIVATION: ExponentialBackoffPolling(initial_interval=5, max_interval=60, deadline=2 * 60 * 60),
+    POLLING_OPERATION_DEACTIVATION: ExponentialBackoffPolling(initial_interval=5, max_interval=60,
+                                                              deadline=2 * 60 * 60),
+    POLLING_OPERATION_TRAINING: ExponentialBackoffPolling(initial_interval=60, max_interval=10 * 60,
+                                                          deadline=24 * 60 * 60)
+}
@@ -0,0 +1,227 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import logging
+import threading
+import time
+
+import botocore
+from core.api_metrics import THROTTLING_ERROR_CODES
+
+DEFAULT_RATE = 5.0
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_MAX_RATE = 50.0
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_INCREASE_FACTOR = 0.05
+
+
+class TokenBucket:
+    """
+    A thread safe token bucket, whose rate shrinks multiplicatively on throttling and grows additively on success
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, increase_factor=DEFAULT_INCREASE_FACTOR, clock=None,
+                 sleep=None):
+        """
+        :param rate: The initial number of calls per second, also the burst size
+        :param min_rate: The rate never shrinks below this
+        :param max_rate: The rate never grows above this
+        :param backoff_factor: The rate is multiplied by this on throttling
+        :param increase_factor: The rate grows by this fraction of the initial rate on each success
+        :param clock: Returns the current time in seconds, time.monotonic if not specified
+        :param sleep: Sleeps for the given seconds, time.sleep if not specified
+        """
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.backoff_factor = backoff_factor
+        self.increase = increase_factor * rate
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or time.sleep
+        self._lock = threading.Lock()
+        self._tokens = self.rate
+        self._last_refill = self._clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.rate, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available. Returns the seconds waited
+        """
+        with self._lock:
+            self._refill()
+            # Reserve the token now, so waiting callers are served in order
+            self._tokens -= 1
+            wait_seconds = 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+        if wait_seconds > 0:
+            self._sleep(wait_seconds)
+        return wait_seconds
+
+    def on_throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+            # Drop the burst, so the next calls are spread at the new rate
+            self._tokens = min(self._tokens, 0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token buckets per service operation, shared by all the threads using the clients of a ClientFactory
+    """
+
+    def __init__(self, default_rate=DEFAULT_RATE, operation_rates=None, min_rate=DEFAULT_MIN_RATE,
+                 max_rate=DEFAULT_MAX_RATE, clock=None, sleep=None):
+        """
+        :param default_rate: The initial calls per second of operations not in operation_rates
+        :param operation_rates: A dict of initial calls per second by operation name, e.g. {"create_variable": 2}
+        :param min_rate: The rate of an operation never shrinks below this
+        :param max_rate: The rate of an operation never grows above this
+        """
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._clock = clock
+        self._sleep = sleep
+        self._settings = {"default_rate": default_rate,
+                          "operation_rates": dict(operation_rates or {}),
+                          "min_rate": min_rate,
+                          "max_rate": max_rate}
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def configure(self, **kwargs):
+        """
+        Changes the rates, using the same keyword arguments as the constructor. The adapted rates are reset
+        """
+        unknown_settings = set(kwargs) - set(self._settings)
+        if unknown_settings:
+            raise ValueError("Unknown rate limit settings {}".format(sorted(unknown_settings)))
+
+        with self._lock:
+            self._settings.update({k: v for k, v in kwargs.items() if v is not None})
+            self._buckets = {}
+
+    def bucket(self, service_name, operation_name):
+        key = (service_name, operation_name)
+        with self._lock:
+            if key not in self._buckets:
+                rate = self._settings["operation_rates"].get(operation_name, self._settings["default_rate"])
+                self._buckets[key] = TokenBucket(rate=rate, min_rate=self._settings["min_rate"],
+                                                 max_rate=max(rate, self._settings["max_rate"]),
+                                                 clock=self._clock, sleep=self._sleep)
+            return self._buckets[key]
+
+    def acquire(self, service_name, operation_name):
+        wait_seconds = self.bucket(service_name, operation_name).acquire()
+        if wait_seconds > 0:
+            self._logger.debug("Waited {:.3f}s for {} {}".format(wait_seconds, service_name, operation_name))
+
+    def on_throttle(self, service_name, operation_name):
+        bucket = self.bucket(service_name, operation_name)
+        bucket.on_throttle()
+        self._logger.info("{} {} throttled, reduced rate to {:.2f} calls per second".format(
+            service_name, operation_name, bucket.rate))
+
+    def on_success(self, service_name, operation_name):
+        self.bucket(service_name, operation_name).on_success()
+
+
+class RateLimitedClient:
+    """
+    Proxy for a client that takes a token from an AdaptiveRateLimiter before every API call. For botocore clients a
+    token is taken for every attempt, including retries, through the client event hooks.
+    """
+
+    def __init__(self, client, rate_limiter, service_name):
+        """
+        :param client: The client to rate limit, a boto3 client or any object with the same methods
+        :param rate_limiter: The AdaptiveRateLimiter
+        :param service_name: The service name, e.g. frauddetector
+        """
+        self._client = client
+        self._rate_limiter = rate_limiter
+        self._service_name = service_name
+        self._operation_names = None
+
+        meta = getattr(client, "meta", None)
+        method_to_api_mapping = getattr(meta, "method_to_api_mapping", None)
+        if isinstance(method_to_api_mapping, dict):
+            self._operation_names = set(method_to_api_mapping)
+            self._api_to_method_mapping = {v: k for k, v in method_to_api_mapping.items()}
+            self._register_event_handlers(meta.events)
+
+    @property
+    def client(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        # botocore clients are rate limited through the event hooks
+        if not callable(attribute) or name.startswith("_") or self._operation_names is not None:
+            return attribute
+        return self._rate_limit(name, attribute)
+
+    def _rate_limit(self, operation_name, operation):
+        def rate_limited_operation(*args, **kwargs):
+            self._rate_limiter.acquire(self._service_name, operation_name)
+            try:
+                response = operation(*args, **kwargs)
+            except botocore.exceptions.ClientError as error:
+                if error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+                    self._rate_limiter.on_throttle(self._service_name, operation_name)
+                raise error
+            self._rate_limiter.on_success(self._service_name, operation_name)
+            return response
+
+        return rate_limited_operation
+
+    def _register_event_handlers(self, events):
+        events.register("before-send", self._on_before_send)
+        events.register("after-call", self._on_after_call)
+        # Registered first, as the retry handlers stop the needs-retry event once they decide to retry
+        events.register_first("needs-retry", self._on_needs_retry)
+
+    def _method_name(self, api_name):
+        return self._api_to_method_mapping.get(api_name, api_name)
+
+    def _on_before_send(self, event_name, **kwargs):
+        # e.g. before-send.frauddetector.GetRules, emitted before every attempt
+        self._rate_limiter.acquire(self._service_name, self._method_name(event_name.split(".")[-1]))
+        return None
+
+    def _on_after_call(self, http_response, model, **kwargs):
+        if http_response is not None and http_response.status_code < 300:
+            self._rate_limiter.on_success(self._service_name, self._method_name(model.name))
+
+    def _on_needs_retry(self, response, operation, **kwargs):
+        if response is not None and (response[1] or {}).get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+            self._rate_limiter.on_throttle(self._service_name, self._method_name(operation.name))
+        return None
+
+
+default_rate_limiter = AdaptiveRateLimiter()
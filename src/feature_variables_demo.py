@@ -44,13 +44,14 @@ class FeatureVariablesDemo(FeatureVariablesBase):
     """
 
     def __init__(self, fraud_detector_utils=None):
+        super().__init__()
         self._fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils()
 
     @property
     def fraud_detector_utils(self):
         return self._fraud_detector_utils
 
-    def create_or_retrieve_features(self):
+    def _create_features(self):
         """
         Creates the variables and returns the names
         """
@@ -60,13 +61,13 @@ class FeatureVariablesDemo(FeatureVariablesBase):
         result = list(self._feature_details.keys())
         return result
 
-    def create_or_retrieve_label(self):
+    def _create_label(self):
         """
         Return the label field and mappings as required by fraud detector
         :return:
         """
-        self.fraud_detector_utils.create_or_update_label("1", "Fraud flag")
-        self.fraud_detector_utils.create_or_update_label("0", "Legit flag")
+        # Only the labels that do not exist yet are created
+        self.fraud_detector_utils.try_create_labels({"1": "Fraud flag", "0": "Legit flag"})
 
         label_schema = {FRAUD_DETECTOR_LABEL_KEY_FRAUD: ["1"],
                         FRAUD_DETECTOR_LABEL_KEY_LEGIT: ["0"]}
@@ -0,0 +1,207 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import ipaddress
+import re
+
+import numpy as np
+import pandas as pd
+
+FRAUD_DETECTOR_VARTYPE_EMAIL = "EMAIL_ADDRESS"
+
+FRAUD_DETECTOR_VARTYPE_IP = "IP_ADDRESS"
+
+FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC = "NUMERIC"
+
+FRAUD_DETECTOR_VARTYPE_CUSTOM_CATEGORICAL = "CATEGORICAL"
+
+FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT = "FREE_FORM_TEXT"
+
+EMAIL_PATTERN = re.compile(r'^[a-z0-9._%+\-]+@(\w+\.\w+)+$', re.IGNORECASE)
+
+# IPv4 addresses, with each octet at most 255
+IPV4_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])'
+IPV4_PATTERN = re.compile(r'^(?:{0}\.){{3}}{0}$'.format(IPV4_OCTET))
+
+# Rows sampled from the data to infer the column types from
+DEFAULT_SAMPLE_SIZE = 100000
+
+# Non null values of each string column, drawn from the sample, that the patterns are matched against
+DEFAULT_TYPE_SAMPLE_SIZE = 1000
+
+# Minimum fraction of the non null values that must match a type
+DEFAULT_MATCH_THRESHOLD = 0.9
+DEFAULT_NUMERIC_THRESHOLD = 0.95
+
+# A string column with at most this many distinct values, and at most this ratio of distinct to non null values,
+# is categorical
+DEFAULT_CATEGORICAL_MAX_DISTINCT = 100
+DEFAULT_CATEGORICAL_MAX_DISTINCT_RATIO = 0.05
+
+
+def is_ip_address(value):
+    """
+    Returns True if the value is an IPv4 or IPv6 address. Values with colons are checked with ipaddress rather than
+    a pattern, as a loose IPv6 pattern also matches times such as 10:15:00 and MAC addresses
+    """
+    if IPV4_PATTERN.match(value):
+        return True
+    return ":" in value and _is_ipv6_address(value)
+
+
+def ip_address_matches(values):
+    """
+    Vectorized is_ip_address over a Series of strings. Only the values with colons, usually few, are checked one at
+    a time with ipaddress
+    :return: A boolean Series
+    """
+    matches = values.str.match(IPV4_PATTERN).fillna(False).astype(bool)
+    candidates = ~matches & values.str.contains(":", regex=False).fillna(False).astype(bool)
+    if candidates.any():
+        matches[candidates] = values[candidates].map(_is_ipv6_address).astype(bool)
+    return matches
+
+
+def _is_ipv6_address(value):
+    try:
+        ipaddress.IPv6Address(value)
+        return True
+    except ValueError:
+        return False
+
+
+class ColumnTypeInference:
+    """
+    Infers the Fraud Detector variable type of data columns from the match rates of the values in a sample,
+    rather than from a single value
+    """
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE, type_sample_size=DEFAULT_TYPE_SAMPLE_SIZE,
+                 match_threshold=DEFAULT_MATCH_THRESHOLD, numeric_threshold=DEFAULT_NUMERIC_THRESHOLD,
+                 categorical_max_distinct=DEFAULT_CATEGORICAL_MAX_DISTINCT,
+                 categorical_max_distinct_ratio=DEFAULT_CATEGORICAL_MAX_DISTINCT_RATIO, seed=0):
+        """
+        :param sample_size: Rows sampled from the data
+        :param type_sample_size: Non null values of each string column the patterns are matched against
+        :param match_threshold: Minimum fraction of values matching the email or ip pattern
+        :param numeric_threshold: Minimum fraction of values of a string column that convert to a number
+        :param categorical_max_distinct: Maximum distinct values of a categorical string column
+        :param categorical_max_distinct_ratio: Maximum ratio of distinct to non null values of a categorical column
+        :param seed: Seed for the sampling, so the same data always gets the same types
+        """
+        self.sample_size = sample_size
+        self.type_sample_size = type_sample_size
+        self.match_threshold = match_threshold
+        self.numeric_threshold = numeric_threshold
+        self.categorical_max_distinct = categorical_max_distinct
+        self.categorical_max_distinct_ratio = categorical_max_distinct_ratio
+        self.seed = seed
+
+    def infer(self, df, columns=None):
+        """
+        Infers the variable types of the columns of a dataframe
+        :param df: The data
+        :param columns: The columns to infer, all the columns if not specified
+        :return: a dict of column name to a tuple of variable type and default value
+        """
+        columns = list(df.columns) if columns is None else columns
+        if len(df) > self.sample_size:
+            df = df.sample(n=self.sample_size, random_state=self.seed)
+        # The same rows are used for every column, so they are only drawn once
+        positions = self._sample_positions(len(df))
+        return {c: self.infer_series(c, df[c], positions) for c in columns}
+
+    def _sample_positions(self, num_rows):
+        if num_rows <= self.type_sample_size:
+            return None
+        rnd = np.random.default_rng(self.seed)
+        return np.sort(rnd.choice(num_rows, size=self.type_sample_size, replace=False))
+
+    def _type_sample(self, series, positions):
+        if positions is None:
+            return series.dropna()
+        values = series.iloc[positions].dropna()
+        # Mostly null columns have too few values at the sampled rows, so sample their non null values instead
+        if len(values) < self.type_sample_size // 2:
+            values = series.dropna()
+            if len(values) > self.type_sample_size:
+                values = values.sample(n=self.type_sample_size, random_state=self.seed)
+        return values
+
+    def infer_series(self, field_name, series, positions=None):
+        """
+        Infers the variable type of a column
+        :param field_name: The column name
+        :param series: The column values
+        :param positions: The row positions of the values to match the patterns against, sampled from all the rows
+                          if not specified
+        :return: a tuple of variable type and default value
+        """
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            return self.choose_variable_type(field_name, "category")
+        if pd.api.types.is_float_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            return self.choose_variable_type(field_name, "numeric")
+        if not (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)):
+            return self.choose_variable_type(field_name, "other")
+
+        if positions is None:
+            positions = self._sample_positions(len(series))
+        values = self._type_sample(series, positions)
+
+        # Match the patterns against each distinct value once, weighted by how often it occurs
+        codes, uniques = pd.factorize(values.astype(str))
+        counts = np.bincount(codes, minlength=len(uniques))
+        uniques = pd.Series(uniques, dtype=object)
+        non_null = int(counts.sum())
+
+        def rate(matches):
+            return float(counts[matches.to_numpy(dtype=bool)].sum()) / non_null if non_null else 0.0
+
+        return self.choose_variable_type(
+            field_name, "string",
+            email_rate=rate(uniques.str.match(EMAIL_PATTERN).fillna(False)),
+            ip_rate=rate(ip_address_matches(uniques)),
+            numeric_rate=rate(pd.to_numeric(uniques, errors="coerce").notna()),
+            distinct=len(uniques),
+            non_null=non_null)
+
+    def choose_variable_type(self, field_name, kind, email_rate=0.0, ip_rate=0.0, numeric_rate=0.0, distinct=0,
+                             non_null=0):
+        """
+        Chooses the variable type of a column from its statistics, in the order email, ip, numeric, categorical
+        and free form text
+        :param field_name: The column name
+        :param kind: The kind of column, string, numeric, category or other
+        :param email_rate: The fraction of non null values that are email addresses
+        :param ip_rate: The fraction of non null values that are ip addresses
+        :param numeric_rate: The fraction of non null values that convert to a number
+        :param distinct: The number of distinct values
+        :param non_null: The number of non null values
+        :return: a tuple of variable type and default value
+        """
+        name = field_name.lower()
+        if kind == "string" and ("email" in name or (non_null and email_rate >= self.match_threshold)):
+            return FRAUD_DETECTOR_VARTYPE_EMAIL, ""
+        if kind == "string" and ("ip_addr" in name or (non_null and ip_rate >= self.match_threshold)):
+            return FRAUD_DETECTOR_VARTYPE_IP, ""
+        if kind == "numeric" or (kind == "string" and non_null and numeric_rate >= self.numeric_threshold):
+            return FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC, 0.0
+        if kind == "category" or (kind == "string" and non_null and distinct <= self.categorical_max_distinct
+                                  and distinct <= self.categorical_max_distinct_ratio * non_null):
+            return FRAUD_DETECTOR_VARTYPE_CUSTOM_CATEGORICAL, ""
+        return FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT, ""
@@ -0,0 +1,515 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from features.column_type_inference import ColumnTypeInference, EMAIL_PATTERN, is_ip_address
+from features.label_counter import LabelCounter
+from features.sketches import HyperLogLog, DEFAULT_HLL_PRECISION
+
+DEFAULT_CHUNK_SIZE = 100000
+
+# Values kept per column as an example of its data
+DEFAULT_RESERVOIR_SIZE = 100
+
+# The patterns are matched against at most this many values of each chunk of a column
+DEFAULT_MATCH_SAMPLE_SIZE = 10000
+
+# Most frequent values reported per column. The frequencies are approximated by a Misra-Gries summary of
+# TOP_K_SUMMARY_FACTOR times as many values, so the counts are lower bounds that are exact for very frequent values
+DEFAULT_TOP_K = 10
+TOP_K_SUMMARY_FACTOR = 10
+
+COLUMN_KIND_STRING = "string"
+COLUMN_KIND_NUMERIC = "numeric"
+COLUMN_KIND_CATEGORY = "category"
+COLUMN_KIND_OTHER = "other"
+
+
+def column_kind(dtype):
+    """
+    Returns the kind of the values of a column with the dtype, numeric, string, category or other
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return COLUMN_KIND_CATEGORY
+    if pd.api.types.is_float_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return COLUMN_KIND_NUMERIC
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return COLUMN_KIND_STRING
+    return COLUMN_KIND_OTHER
+
+
+class ColumnProfile:
+    """
+    Bounded memory statistics of a column, updated a chunk of values at a time: the null rate, a distinct count
+    sketch, the most frequent values, the email, ip and numeric match rates, the min and max and a value sample
+    """
+
+    def __init__(self, name, reservoir_size=DEFAULT_RESERVOIR_SIZE, match_sample_size=DEFAULT_MATCH_SAMPLE_SIZE,
+                 hll_precision=DEFAULT_HLL_PRECISION, top_k=DEFAULT_TOP_K, seed=0):
+        self.name = name
+        self.reservoir_size = reservoir_size
+        self.match_sample_size = match_sample_size
+        self.top_k = top_k
+        self.count = 0
+        self.null_count = 0
+        self.kinds = set()
+        # Type match counters, over the values tested
+        self.tested = 0
+        self.email_matches = 0
+        self.ip_matches = 0
+        self.numeric_matches = 0
+        # Of the numbers, or the string values that convert to numbers
+        self.min = None
+        self.max = None
+        self.distinct_sketch = HyperLogLog(hll_precision)
+        # Set instead of the sketch when loaded from a dict
+        self._distinct = None
+        # Misra-Gries summary of value to a lower bound of its count
+        self._frequent = {}
+        self._random = np.random.default_rng(seed)
+        # A bottom k sample, the values with the smallest random keys are a uniform sample of all the values
+        self._reservoir_keys = np.empty(0)
+        self._reservoir_values = np.empty(0, dtype=object)
+
+    @property
+    def kind(self):
+        if COLUMN_KIND_STRING in self.kinds:
+            return COLUMN_KIND_STRING
+        if self.kinds in ({COLUMN_KIND_NUMERIC}, {COLUMN_KIND_CATEGORY}):
+            return next(iter(self.kinds))
+        return COLUMN_KIND_OTHER
+
+    @property
+    def non_null_count(self):
+        return self.count - self.null_count
+
+    @property
+    def null_rate(self):
+        return float(self.null_count) / self.count if self.count else 0.0
+
+    @property
+    def distinct(self):
+        return self._distinct if self.distinct_sketch is None else self.distinct_sketch.estimate()
+
+    @property
+    def most_frequent(self):
+        """
+        Returns a list of up to top_k (value, count) of the most frequent values, most frequent first
+        """
+        items = sorted(self._frequent.items(), key=lambda i: (-i[1], str(i[0])))
+        return items[:self.top_k]
+
+    @property
+    def sample(self):
+        return list(self._reservoir_values[np.argsort(self._reservoir_keys)])
+
+    def rate(self, matches):
+        return float(matches) / self.tested if self.tested else 0.0
+
+    def update(self, series):
+        """
+        Adds a chunk of the column values to the statistics
+        """
+        values = series.dropna()
+        self.update_values(values, len(series) - len(values), column_kind(values.dtype))
+
+    def update_values(self, values, null_count, kind):
+        """
+        Adds a chunk of the non null column values to the statistics
+        :param values: The non null values
+        :param null_count: The number of null values in the chunk
+        :param kind: The kind of the values, see column_kind
+        """
+        self.count += len(values) + null_count
+        self.null_count += null_count
+        if len(values) == 0:
+            return
+
+        self.kinds.add(kind)
+        if kind == COLUMN_KIND_NUMERIC:
+            uniques, counts = self._value_counts(values.to_numpy())
+            self.distinct_sketch.add(uniques)
+            # Numbers match the numeric type by definition
+            self.tested += len(values)
+            self.numeric_matches += len(values)
+            self._update_min_max(uniques)
+        elif kind in (COLUMN_KIND_STRING, COLUMN_KIND_CATEGORY):
+            uniques, counts = self._update_string_statistics(values.astype(str))
+        else:
+            uniques, counts = self._value_counts(values.astype(str).to_numpy(dtype=object))
+            self.distinct_sketch.add(uniques)
+        self._merge_frequent(uniques, counts)
+
+        self._merge_reservoir(self._random.random(len(values)), values.to_numpy(dtype=object))
+
+    def update_from_statistics(self, count, null_count, kind, min_value=None, max_value=None):
+        """
+        Adds the statistics of values that are not read, e.g. from the metadata of a Parquet file. The distinct count
+        and the most frequent values are then unknown
+        :param count: The number of values, including nulls
+        :param null_count: The number of null values
+        :param kind: The kind of the values, see column_kind
+        :param min_value: The minimum of numeric values, if known
+        :param max_value: The maximum of numeric values, if known
+        """
+        self.count += count
+        self.null_count += null_count
+        self.distinct_sketch = None
+        if count == null_count:
+            return
+
+        self.kinds.add(kind)
+        if kind == COLUMN_KIND_NUMERIC:
+            self.tested += count - null_count
+            self.numeric_matches += count - null_count
+            self._update_min_max([v for v in (min_value, max_value) if v is not None])
+
+    def merge(self, other):
+        """
+        Merges the statistics of another chunk of the column into this one
+        """
+        self.count += other.count
+        self.null_count += other.null_count
+        self.kinds |= other.kinds
+        self.tested += other.tested
+        self.email_matches += other.email_matches
+        self.ip_matches += other.ip_matches
+        self.numeric_matches += other.numeric_matches
+        self._update_min_max([v for v in (other.min, other.max) if v is not None])
+        self.distinct_sketch.merge(other.distinct_sketch)
+        self._merge_frequent(list(other._frequent.keys()), list(other._frequent.values()))
+        self._merge_reservoir(other._reservoir_keys, other._reservoir_values)
+
+    @staticmethod
+    def _value_counts(values):
+        codes, uniques = pd.factorize(values)
+        return np.asarray(uniques), np.bincount(codes, minlength=len(uniques))
+
+    def _update_string_statistics(self, values):
+        all_uniques, all_counts = self._value_counts(values.to_numpy(dtype=object))
+        # Each distinct value only needs hashing once
+        self.distinct_sketch.add(all_uniques)
+
+        uniques, counts = all_uniques, all_counts
+        if self.match_sample_size is not None and len(uniques) > self.match_sample_size:
+            positions = self._random.choice(len(values), size=self.match_sample_size, replace=False)
+            uniques, counts = self._value_counts(values.iloc[positions].to_numpy(dtype=object))
+
+        # Match the patterns against each distinct value once, weighted by how often it occurs
+        numbers = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").to_numpy(dtype=float)
+        is_number = ~np.isnan(numbers)
+        self.tested += int(counts.sum())
+        self.email_matches += int(counts[self._matches(EMAIL_PATTERN.match, uniques)].sum())
+        self.ip_matches += int(counts[self._matches(is_ip_address, uniques)].sum())
+        self.numeric_matches += int(counts[is_number].sum())
+        self._update_min_max(numbers[is_number])
+        return all_uniques, all_counts
+
+    @staticmethod
+    def _matches(match, values):
+        return np.fromiter((bool(match(v)) for v in values), dtype=bool, count=len(values))
+
+    def _update_min_max(self, numbers):
+        if len(numbers) == 0:
+            return
+        low, high = float(np.min(numbers)), float(np.max(numbers))
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def _merge_frequent(self, values, counts):
+        capacity = self.top_k * TOP_K_SUMMARY_FACTOR
+        values, counts = self._reduce_frequent(np.asarray(values, dtype=object), np.asarray(counts), capacity)
+        frequent = self._frequent
+        for value, count in zip(values.tolist(), counts.tolist()):
+            frequent[value] = frequent.get(value, 0) + count
+        values, counts = self._reduce_frequent(np.array(list(frequent.keys()), dtype=object),
+                                               np.array(list(frequent.values())), capacity)
+        self._frequent = dict(zip(values.tolist(), counts.tolist()))
+
+    @staticmethod
+    def _reduce_frequent(values, counts, capacity):
+        """
+        Keeps at most capacity values, subtracting the count of the next most frequent value from all the counts
+        """
+        if len(counts) <= capacity:
+            return values, counts
+        threshold = np.partition(counts, len(counts) - capacity - 1)[len(counts) - capacity - 1]
+        counts = counts - threshold
+        keep = counts > 0
+        return values[keep], counts[keep]
+
+    def _merge_reservoir(self, keys, values):
+        keys = np.concatenate([self._reservoir_keys, keys])
+        values = np.concatenate([self._reservoir_values, values])
+        if len(keys) > self.reservoir_size:
+            keep = np.argpartition(keys, self.reservoir_size)[:self.reservoir_size]
+            keys, values = keys[keep], values[keep]
+        self._reservoir_keys, self._reservoir_values = keys, values
+
+    def variable_type(self, type_inference):
+        """
+        Returns the variable type and default value chosen by a ColumnTypeInference from the statistics
+        """
+        return type_inference.choose_variable_type(self.name, self.kind,
+                                                   email_rate=self.rate(self.email_matches),
+                                                   ip_rate=self.rate(self.ip_matches),
+                                                   numeric_rate=self.rate(self.numeric_matches),
+                                                   distinct=self.distinct,
+                                                   non_null=self.non_null_count)
+
+    def to_dict(self):
+        return {"name": self.name,
+                "kind": self.kind,
+                "kinds": sorted(self.kinds),
+                "count": self.count,
+                "nullCount": self.null_count,
+                "nullRate": self.null_rate,
+                "distinct": self.distinct,
+                "tested": self.tested,
+                "emailMatches": self.email_matches,
+                "ipMatches": self.ip_matches,
+                "numericMatches": self.numeric_matches,
+                "emailRate": self.rate(self.email_matches),
+                "ipRate": self.rate(self.ip_matches),
+                "numericRate": self.rate(self.numeric_matches),
+                "min": self.min,
+                "max": self.max,
+                "topK": [{"value": _json_value(v), "count": c} for v, c in self.most_frequent],
+                "sample": [str(v) for v in self.sample]}
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Loads the statistics written by to_dict, e.g. by a previous pipeline stage. The distinct count and the most
+        frequent values are as written, so the loaded profile is for reading rather than updating
+        """
+        profile = cls(d["name"], reservoir_size=len(d["sample"]), top_k=len(d["topK"]))
+        profile.kinds = set(d["kinds"])
+        profile.count = d["count"]
+        profile.null_count = d["nullCount"]
+        profile.tested = d["tested"]
+        profile.email_matches = d["emailMatches"]
+        profile.ip_matches = d["ipMatches"]
+        profile.numeric_matches = d["numericMatches"]
+        profile.min = d["min"]
+        profile.max = d["max"]
+        profile.distinct_sketch = None
+        profile._distinct = d["distinct"]
+        profile._frequent = {f["value"]: f["count"] for f in d["topK"]}
+        profile._reservoir_keys = np.arange(len(d["sample"]), dtype=float)
+        profile._reservoir_values = np.array(d["sample"], dtype=object)
+        return profile
+
+
+def _json_value(value):
+    if isinstance(value, (bool, np.bool_)):
+        return str(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return value.item() if hasattr(value, "item") else value
+    return str(value)
+
+
+class SchemaProfile:
+    """
+    The column statistics and label value counts of a data file
+    """
+
+    def __init__(self, columns, label_counts, num_rows):
+        """
+        :param columns: A dict of column name to ColumnProfile, in the file column order
+        :param label_counts: A Counter of the label values, as strings
+        :param num_rows: The number of rows profiled
+        """
+        self.columns = columns
+        self.label_counts = label_counts
+        self.num_rows = num_rows
+
+    def variable_types(self, type_inference=None, columns=None):
+        """
+        Returns a dict of column name to a tuple of variable type and default value
+        """
+        type_inference = type_inference or ColumnTypeInference()
+        columns = list(self.columns) if columns is None else columns
+        return {c: self.columns[c].variable_type(type_inference) for c in columns}
+
+    def to_dict(self, type_inference=None):
+        """
+        Returns the profile as a dict, with the variable type and default value chosen for each column
+        """
+        variable_types = self.variable_types(type_inference)
+        columns = []
+        for name, column in self.columns.items():
+            variable_type, default = variable_types[name]
+            columns.append(dict(column.to_dict(), variableType=variable_type, defaultValue=default))
+        return {"numRows": self.num_rows,
+                "labelCounts": dict(self.label_counts),
+                "columns": columns}
+
+    @classmethod
+    def from_dict(cls, d):
+        columns = {c["name"]: ColumnProfile.from_dict(c) for c in d["columns"]}
+        return cls(columns, Counter(d["labelCounts"]), d["numRows"])
+
+    def write_json(self, path, type_inference=None):
+        """
+        Writes the profile to a JSON file, so later pipeline stages can reuse it rather than profile the data again
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(type_inference), f, indent=2)
+
+    @classmethod
+    def read_json(cls, path):
+        """
+        Reads a profile written by write_json
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class CsvSchemaProfiler:
+    """
+    Profiles a CSV file of any size a chunk at a time, keeping bounded memory statistics per column.
+    Each chunk is profiled into new column statistics that are merged in file order, so the profile is the same
+    whether the columns are profiled in this process or split across a process pool
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, reservoir_size=DEFAULT_RESERVOIR_SIZE,
+                 match_sample_size=DEFAULT_MATCH_SAMPLE_SIZE, hll_precision=DEFAULT_HLL_PRECISION,
+                 top_k=DEFAULT_TOP_K, label_column="EVENT_LABEL", seed=0, max_workers=None):
+        """
+        :param chunk_size: Rows read at a time
+        :param reservoir_size: Values kept per column as an example of its data
+        :param match_sample_size: Values of each chunk of a column the patterns are matched against, None for all
+        :param hll_precision: Precision of the distinct count sketches
+        :param top_k: Most frequent values reported per column
+        :param label_column: The column to count the label values of
+        :param seed: Seed for the sampling
+        :param max_workers: If more than 1, the columns of a file are split across a pool of this many processes,
+                            for wide data with many string columns. Each process reads only its own columns
+        """
+        self.chunk_size = chunk_size
+        self.reservoir_size = reservoir_size
+        self.match_sample_size = match_sample_size
+        self.hll_precision = hll_precision
+        self.top_k = top_k
+        self.label_column = label_column
+        self.seed = seed
+        self.max_workers = max_workers
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def profile(self, file, **read_csv_kwargs):
+        """
+        Profiles a CSV file
+        :param file: A path or file like object, accepted by pandas.read_csv. Only a path can be split across a
+                     process pool, as each process reads the file itself
+        :param read_csv_kwargs: Extra arguments for pandas.read_csv
+        :return: SchemaProfile
+        """
+        if self.max_workers is not None and self.max_workers > 1:
+            if isinstance(file, (str, os.PathLike)):
+                return self._profile_in_pool(file, read_csv_kwargs)
+            self._logger.info("Profiling in process, as only a file path can be read by a process pool")
+        return self.profile_chunks(pd.read_csv(file, chunksize=self.chunk_size, **read_csv_kwargs))
+
+    def profile_chunks(self, chunks):
+        """
+        Profiles an iterable of dataframes, e.g. the chunks of a file, in this process
+        :return: SchemaProfile
+        """
+        columns, label_counter, num_rows = self._profile_chunks(chunks)
+        self._logger.info("Profiled {} rows and {} columns".format(num_rows, len(columns)))
+        return SchemaProfile({name: profile for _, name, profile in columns}, label_counter.counts, num_rows)
+
+    def _profile_chunks(self, chunks, positions=None):
+        """
+        Profiles the columns of the chunks
+        :param positions: The positions of the chunk columns in the file, if only some of the columns are read
+        :return: A tuple of a list of (position, name, ColumnProfile) in column order, a LabelCounter and the number of
+                 rows
+        """
+        columns = []
+        label_counter = LabelCounter(self.label_column)
+        num_rows = 0
+        for chunk_index, chunk in enumerate(chunks):
+            num_rows += len(chunk)
+            chunk_positions = positions if positions is not None else range(len(chunk.columns))
+            for i, (position, name) in enumerate(zip(chunk_positions, chunk.columns)):
+                profile = self._new_column_profile(name, [self.seed, position, chunk_index])
+                profile.update(chunk.iloc[:, i])
+                # The first chunk's statistics are used as they are, later ones are merged in file order
+                if chunk_index == 0:
+                    columns.append((position, name, profile))
+                else:
+                    columns[i][2].merge(profile)
+
+            if self.label_column in chunk.columns:
+                label_counter.update(chunk)
+            self._logger.debug("Profiled {} rows".format(num_rows))
+        return columns, label_counter, num_rows
+
+    def _new_column_profile(self, name, seed):
+        return ColumnProfile(name, reservoir_size=self.reservoir_size, match_sample_size=self.match_sample_size,
+                             hll_precision=self.hll_precision, top_k=self.top_k, seed=seed)
+
+    def _profile_in_pool(self, file, read_csv_kwargs):
+        num_columns = len(pd.read_csv(file, nrows=0, **read_csv_kwargs).columns)
+        # Interleaved, so the string and numeric columns of wide files tend to be spread evenly across the workers
+        batches = [list(range(num_columns))[i::self.max_workers] for i in range(min(self.max_workers, num_columns))]
+        settings = {"chunk_size": self.chunk_size, "reservoir_size": self.reservoir_size,
+                    "match_sample_size": self.match_sample_size, "hll_precision": self.hll_precision,
+                    "top_k": self.top_k, "label_column": self.label_column, "seed": self.seed}
+
+        columns = []
+        label_counts = Counter()
+        num_rows = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_profile_csv_columns, file, positions, settings, read_csv_kwargs)
+                       for positions in batches]
+            for future in futures:
+                batch_columns, batch_label_counts, num_rows = future.result()
+                columns.extend(batch_columns)
+                label_counts.update(batch_label_counts)
+
+        self._logger.info("Profiled {} rows and {} columns in {} processes".format(num_rows, len(columns),
+                                                                                  len(batches)))
+        return SchemaProfile({name: profile for _, name, profile in sorted(columns, key=lambda c: c[0])},
+                             label_counts, num_rows)
+
+
+def _profile_csv_columns(file, positions, settings, read_csv_kwargs):
+    """
+    Profiles some of the columns of a CSV file in a worker process
+    :param file: The CSV file path
+    :param positions: The positions of the columns to profile
+    :param settings: The CsvSchemaProfiler arguments
+    :param read_csv_kwargs: Extra arguments for pandas.read_csv
+    :return: A tuple of a list of (position, name, ColumnProfile), the label counts and the number of rows
+    """
+    profiler = CsvSchemaProfiler(**settings)
+    chunks = pd.read_csv(file, usecols=positions, chunksize=profiler.chunk_size, **read_csv_kwargs)
+    columns, label_counter, num_rows = profiler._profile_chunks(chunks, positions)
+    return columns, label_counter.counts, num_rows
@@ -17,20 +17,51 @@
 
 class FeatureVariablesBase:
     """
-    Abstract base class for feature variables
+    Abstract base class for feature variables. The variables and labels are computed and provisioned once per
+    instance, so the event and the model creation can share them, until invalidate is called
     """
 
+    def __init__(self):
+        self._features = None
+        self._label_schema = None
+
     def create_or_retrieve_features(self):
         """
 
         :return: a list of variable names to use for Fraud Detector. e.g. ["name", "address"]
         """
-        raise NotImplementedError
+        if self._features is None:
+            self._features = self._create_features()
+        return list(self._features)
 
     def create_or_retrieve_label(self):
         """
 
         :return: Label variable name and a map of fraud vs legit flag. e.g {"LEGIT" :[0], "FRAUD" :[1] }
 
+        """
+        if self._label_schema is None:
+            self._label_schema = self._create_label()
+        return {k: list(v) for k, v in self._label_schema.items()}
+
+    def invalidate(self):
+        """
+        Forgets the provisioned variables and labels, e.g. after they are deleted, so the next call provisions them
+        again
+        """
+        self._features = None
+        self._label_schema = None
+
+    def _create_features(self):
+        """
+        Creates the variables in Fraud Detector
+        :return: a list of variable names
+        """
+        raise NotImplementedError
+
+    def _create_label(self):
+        """
+        Creates the labels in Fraud Detector
+        :return: a map of fraud vs legit flag. e.g {"LEGIT" :[0], "FRAUD" :[1] }
         """
         raise NotImplementedError
@@ -15,24 +15,19 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
 # ***************************************************************************************
 
-import re
-
 from core.fraud_detector_utils import FraudDetectorUtils
+from features.column_type_inference import ColumnTypeInference, FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC, \
+    FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT
+from features.csv_schema_profiler import CsvSchemaProfiler, SchemaProfile, DEFAULT_CHUNK_SIZE
+from features.feature_variables_base import FeatureVariablesBase
+from features.label_counter import LabelCounter
+from features.parquet_schema_profiler import ParquetSchemaProfiler
+from features.ranged_sample_reader import RangedSampleReader
 
 FRAUD_DETECTOR_DATATYPE_STRING = 'STRING'
 
 FRAUD_DETECTOR_DATATYPE_NUMERIC = "FLOAT"
 
-FRAUD_DETECTOR_VARTYPE_EMAIL = "EMAIL_ADDRESS"
-
-FRAUD_DETECTOR_VARTYPE_IP = "IP_ADDRESS"
-
-FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC = "NUMERIC"
-
-FRAUD_DETECTOR_VARTYPE_CUSTOM_CATEGORICAL = "CATEGORICAL"
-
-FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT = "FREE_FORM_TEXT"
-
 FRAUD_DETECTOR_LABEL_KEY_LEGIT = "LEGIT"
 
 FRAUD_DETECTOR_LABEL_KEY_FRAUD = "FRAUD"
@@ -40,12 +35,13 @@ FRAUD_DETECTOR_LABEL_KEY_FRAUD = "FRAUD"
 FRAUD_DETECTOR_LABEL_MAPPER = "labelMapper"
 
 
-class FeatureVariablesDynamic:
+class FeatureVariablesDynamic(FeatureVariablesBase):
     """
     Dynamically generated features from data
     """
 
-    def __init__(self, df, true_labels, field_descriptions_dict=None, fraud_detector_utils=None):
+    def __init__(self, df=None, true_labels=None, field_descriptions_dict=None, fraud_detector_utils=None,
+                 type_inference=None, schema_profile=None):
         """
 Dynamically detects the variable types
         :type true_labels: List
@@ -58,44 +54,103 @@ Dynamically detects the variable types
 
             }
         :param fraud_detector_utils:
+        :param type_inference: ColumnTypeInference, to change the sample size and type thresholds
+        :param schema_profile: A csv_schema_profiler.SchemaProfile to use instead of a dataframe, see from_csv
         """
+        if df is None and schema_profile is None:
+            raise ValueError("Either a dataframe or a schema profile is required")
+        super().__init__()
 
         self.true_labels = true_labels
         self.field_descriptions_dict = field_descriptions_dict or {}
         self._fraud_detector_utils = fraud_detector_utils or FraudDetectorUtils()
+        self._type_inference = type_inference or ColumnTypeInference()
         self.df = df
+        self.schema_profile = schema_profile
         self.var_type_dtype_map = {
             FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT: FRAUD_DETECTOR_DATATYPE_STRING,
             FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC: FRAUD_DETECTOR_DATATYPE_NUMERIC
         }
 
-    def create_or_retrieve_features(self):
+    @classmethod
+    def from_csv(cls, file, true_labels, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None, **kwargs):
+        """
+        Profiles a CSV file a chunk at a time, so the variables of a large training file can be created without
+        loading it into memory
+        :param file: A path or file like object of the CSV data
+        :param true_labels: The fraud labels
+        :param chunk_size: Rows read at a time
+        :param max_workers: If more than 1, the columns are profiled in a pool of this many processes
+        :param kwargs: Other arguments of FeatureVariablesDynamic
+        """
+        schema_profile = CsvSchemaProfiler(chunk_size=chunk_size, max_workers=max_workers).profile(file)
+        return cls(true_labels=true_labels, schema_profile=schema_profile, **kwargs)
+
+    @classmethod
+    def from_parquet(cls, file, true_labels, profiler=None, **kwargs):
+        """
+        Profiles a Parquet file, taking the types from its schema where possible and reading only the string columns
+        from a sample of the row groups. Requires pyarrow
+        :param file: A path or file like object of the Parquet data
+        :param true_labels: The fraud labels
+        :param profiler: ParquetSchemaProfiler, to change the sample size
+        :param kwargs: Other arguments of FeatureVariablesDynamic
+        """
+        schema_profile = (profiler or ParquetSchemaProfiler()).profile(file)
+        return cls(true_labels=true_labels, schema_profile=schema_profile, **kwargs)
+
+    @classmethod
+    def from_uri(cls, uri, true_labels, sample_reader=None, **kwargs):
+        """
+        Profiles a sample of the training data in place, reading the head and a few random byte ranges of the object(s)
+        rather than downloading them
+        :param uri: An s3:// or file:// uri of the training data, or of a prefix of training data files
+        :param true_labels: The fraud labels
+        :param sample_reader: RangedSampleReader, to change how much of the data is read
+        :param kwargs: Other arguments of FeatureVariablesDynamic
+        """
+        schema_profile = (sample_reader or RangedSampleReader()).profile(uri)
+        return cls(true_labels=true_labels, schema_profile=schema_profile, **kwargs)
+
+    @classmethod
+    def from_schema_profile_json(cls, path, true_labels, **kwargs):
+        """
+        Uses a schema profile written by write_schema_profile, e.g. by an earlier pipeline stage, instead of
+        profiling the data again
+        :param path: The profile JSON file
+        :param true_labels: The fraud labels
+        :param kwargs: Other arguments of FeatureVariablesDynamic
+        """
+        return cls(true_labels=true_labels, schema_profile=SchemaProfile.read_json(path), **kwargs)
+
+    def write_schema_profile(self, path):
+        """
+        Writes the column statistics, with the variable types chosen from them, to a JSON file
+        """
+        if self.schema_profile is None:
+            self.schema_profile = CsvSchemaProfiler().profile_chunks([self.df])
+        self.schema_profile.write_json(path, self._type_inference)
+
+    def _create_features(self):
         """
         Creates & retrieves the variable names
         :return: a list of variable names to use for Fraud Detector. e.g. ["name", "address"]
         """
 
-        prioritised_type_check_funcs = [
-            self._is_email,
-            self._is_ip,
-            self._is_custom_numeric,
-            self._is_custom_categorical
-        ]
-
-        feature_field_names = list(set(self.df.columns) - {"EVENT_LABEL", "EVENT_TIMESTAMP"})
+        if self.schema_profile is not None:
+            feature_field_names = [c for c in self.schema_profile.columns
+                                   if c not in {"EVENT_LABEL", "EVENT_TIMESTAMP"}]
+            # Types from the statistics of all the values
+            inferred_types = self.schema_profile.variable_types(self._type_inference, feature_field_names)
+        else:
+            feature_field_names = list(set(self.df.columns) - {"EVENT_LABEL", "EVENT_TIMESTAMP"})
+            # Auto detect the types from a sample of the values
+            inferred_types = self._type_inference.infer(self.df, feature_field_names)
+
+        variable_entries = []
         for field_name in feature_field_names:
-            # Least priority default
             default_settings = self.field_descriptions_dict.get(field_name, {})
-            variable_type = FRAUD_DETECTOR_VARTYPE_CUSTOM_TEXT
-            df_col_dtype = self.df.dtypes[field_name]
-            default = ""
-
-            # Auto detector next preference
-            for check in prioritised_type_check_funcs:
-                type_tuple = check(field_name, self.df[field_name].iloc[0], df_col_dtype)
-                if type_tuple:
-                    variable_type, default = type_tuple
-                    break
+            variable_type, default = inferred_types[field_name]
 
             # Override if values pass in setting dict
             default = default_settings.get("default", default)
@@ -103,75 +158,47 @@ Dynamically detects the variable types
             data_type = self.var_type_dtype_map.get(variable_type, FRAUD_DETECTOR_DATATYPE_STRING)
             desc = default_settings.get("desc", field_name)
 
-            self._fraud_detector_utils.try_create_variable(field_name, variable_type, data_type, default, desc)
+            variable_entries.append({"name": field_name,
+                                     "variableType": variable_type,
+                                     "dataType": data_type,
+                                     "defaultValue": default,
+                                     "description": desc})
+
+        # Check and create all the variables in bulk, rather than a round trip per column
+        if variable_entries:
+            self._fraud_detector_utils.try_create_variables(variable_entries)
 
         return feature_field_names
 
-    def create_or_retrieve_label(self):
+    @property
+    def label_counter(self):
+        """
+        The LabelCounter of the data, counted while profiling when created from a file
+        """
+        label_counter = LabelCounter("EVENT_LABEL")
+        if self.schema_profile is not None:
+            label_counter.counts.update(self.schema_profile.label_counts)
+        else:
+            label_counter.update(self.df)
+        return label_counter
+
+    def _create_label(self):
         """
 
         :return: Label variable name and a map of fraud vs legit flag. e.g {"LEGIT" :[0], "FRAUD" :[1] }
 
         """
-        labels = self.df["EVENT_LABEL"].astype(str).unique()
-        true_labels = [str(l) for l in self.true_labels]
-        false_labels = list(set(labels) - set(true_labels))
+        label_counter = self.label_counter
+        label_counter.log_class_balance(self.true_labels)
 
-        for l in true_labels:
-            self._fraud_detector_utils.create_or_update_label(str(l), "Fraud flag")
+        true_labels = [str(l) for l in self.true_labels]
+        false_labels = [l for l in label_counter.labels if l not in true_labels]
 
-        for l in false_labels:
-            self._fraud_detector_utils.create_or_update_label(str(l), "Legit flag")
+        # Only the labels that do not exist yet are created
+        labels = dict([(l, "Fraud flag") for l in true_labels] + [(l, "Legit flag") for l in false_labels])
+        self._fraud_detector_utils.try_create_labels(labels)
 
         label_schema = {FRAUD_DETECTOR_LABEL_KEY_FRAUD: true_labels,
                         FRAUD_DETECTOR_LABEL_KEY_LEGIT: false_labels}
 
         return label_schema
-
-    def _is_email(self, field_name, field_value, dtype=None):
-
-        if str(dtype) not in ['str', 'object']:
-            return None
-
-        result = (FRAUD_DETECTOR_VARTYPE_EMAIL, "")
-
-        if "email" in field_name.lower():
-            return result
-
-        regex_email = r'^([a-z0-9._A-Z])+@(\w+\.\w+)+$'
-
-        if re.search(regex_email, field_value.lower()):
-            return result
-
-        return None
-
-    def _is_ip(self, field_name, field_value, dtype=None):
-        if str(dtype) not in ['str', 'object']:
-            return None
-
-        result = (FRAUD_DETECTOR_VARTYPE_IP, "")
-
-        if "ip_addr" in field_name.lower():
-            return result
-
-        regex_ip = r'^([0-9]{1,3}.){3}([0-9]{1,3}.)$'
-
-        if re.search(regex_ip, field_value.lower()):
-            return result
-
-        return None
-
-    def _is_custom_numeric(self, field_name, field_value, dtype=None):
-        result = (FRAUD_DETECTOR_VARTYPE_CUSTOM_NUMERIC, 0.0)
-
-        if str(dtype) in ["float64", "int64"]:
-            return result
-
-        return None
-
-    def _is_custom_categorical(self, field_name, field_value, dtype=None):
-        result = (FRAUD_DETECTOR_VARTYPE_CUSTOM_CATEGORICAL, "")
-        if str(dtype) in ["category"]:
-            return result
-
-        return None
@@ -0,0 +1,91 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import logging
+from collections import Counter
+
+import pandas as pd
+
+DEFAULT_LABEL_COLUMN = "EVENT_LABEL"
+
+# Rows read at a time when only the label column is read. Ten times csv_schema_profiler.DEFAULT_CHUNK_SIZE, which
+# reads every column, as a chunk of a single column takes about as much memory as a chunk of ten
+DEFAULT_LABEL_CHUNK_SIZE = 1000000
+
+
+class LabelCounter:
+    """
+    Counts the label values of data a chunk at a time, so the labels of a file of any size can be found without
+    loading it into memory
+    """
+
+    def __init__(self, label_column=DEFAULT_LABEL_COLUMN):
+        """
+        :param label_column: The label column name
+        """
+        self.label_column = label_column
+        self.counts = Counter()
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    @classmethod
+    def from_csv(cls, file, label_column=DEFAULT_LABEL_COLUMN, chunk_size=DEFAULT_LABEL_CHUNK_SIZE):
+        """
+        Counts the labels of a CSV file, reading only the label column a chunk at a time
+        :param file: A path or file like object, accepted by pandas.read_csv
+        :param label_column: The label column name
+        :param chunk_size: Rows read at a time
+        """
+        counter = cls(label_column)
+        for chunk in pd.read_csv(file, usecols=[label_column], chunksize=chunk_size):
+            counter.update(chunk)
+        return counter
+
+    def update(self, chunk):
+        """
+        Adds the labels of a chunk of data
+        :param chunk: A dataframe with the label column, or a series of the label values
+        """
+        labels = chunk[self.label_column] if isinstance(chunk, pd.DataFrame) else chunk
+        labels = labels.dropna()
+        # Integer labels are read as floats when some rows have no label, so 1 would otherwise count as 1.0
+        if pd.api.types.is_float_dtype(labels.dtype) and (labels == labels.round()).all():
+            labels = labels.astype("int64")
+        # Counted as strings, as Fraud Detector labels are strings
+        self.counts.update(labels.astype(str).value_counts().to_dict())
+        return self
+
+    @property
+    def labels(self):
+        """
+        The labels, most frequent first
+        """
+        return [label for label, _ in sorted(self.counts.items(), key=lambda i: (-i[1], i[0]))]
+
+    def class_balance(self, true_labels):
+        """
+        Returns the fraction of the labelled rows that have one of the true, i.e. fraud, labels
+        """
+        total = sum(self.counts.values())
+        fraud = sum(self.counts[str(l)] for l in true_labels)
+        return float(fraud) / total if total else 0.0
+
+    def log_class_balance(self, true_labels):
+        self._logger.info("Label counts {}, fraud rate {:.4%}".format(dict(self.counts),
+                                                                      self.class_balance(true_labels)))
@@ -0,0 +1,150 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import logging
+import random
+
+from features.csv_schema_profiler import ColumnProfile, SchemaProfile, COLUMN_KIND_NUMERIC, COLUMN_KIND_STRING, \
+    COLUMN_KIND_CATEGORY, COLUMN_KIND_OTHER
+from features.label_counter import LabelCounter, DEFAULT_LABEL_COLUMN, DEFAULT_LABEL_CHUNK_SIZE
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# String columns are profiled from the values of row groups with at least this many rows in total
+DEFAULT_SAMPLE_ROWS = 100000
+
+
+class ParquetSchemaProfiler:
+    """
+    Profiles a Parquet file from its schema and metadata where possible. Only the string columns, whose types are
+    ambiguous, are read, and only from a sample of the row groups. The label column is read on its own to count
+    the labels
+    """
+
+    def __init__(self, sample_rows=DEFAULT_SAMPLE_ROWS, label_column=DEFAULT_LABEL_COLUMN, seed=0,
+                 column_profile_settings=None):
+        """
+        :param sample_rows: The minimum number of rows, from randomly chosen row groups, string columns are read from
+        :param label_column: The column to count the label values of
+        :param seed: Seed for choosing the row groups
+        :param column_profile_settings: A dict of ColumnProfile arguments, e.g. {"top_k": 20}
+        """
+        self.sample_rows = sample_rows
+        self.label_column = label_column
+        self.seed = seed
+        self.column_profile_settings = column_profile_settings or {}
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def profile(self, path):
+        """
+        Profiles a Parquet file
+        :param path: A path or file like object, accepted by pyarrow.parquet.ParquetFile
+        :return: csv_schema_profiler.SchemaProfile
+        """
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to read Parquet files, install it with pip install pyarrow")
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        metadata = parquet_file.metadata
+        schema = parquet_file.schema_arrow
+
+        # Statistics are kept per leaf column, so nested fields have none
+        leaf_columns = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+
+        columns = {}
+        columns_to_read = []
+        for index, field in enumerate(schema):
+            kind = self.arrow_column_kind(field.type)
+            columns[field.name] = ColumnProfile(field.name, seed=[self.seed, index], **self.column_profile_settings)
+            if field.name not in leaf_columns:
+                columns[field.name].update_from_statistics(metadata.num_rows, 0, kind)
+                continue
+
+            statistics = self._column_statistics(metadata, leaf_columns[field.name])
+            if kind == COLUMN_KIND_STRING or statistics is None:
+                # Ambiguous, so the values are needed to tell emails, ip addresses, numbers and text apart
+                columns_to_read.append(field.name)
+            else:
+                count, null_count, min_value, max_value = statistics
+                columns[field.name].update_from_statistics(count, null_count, kind, min_value, max_value)
+
+        if columns_to_read:
+            row_groups = self._sample_row_groups(metadata)
+            self._logger.info("Reading {} of {} columns from {} of {} row groups".format(
+                len(columns_to_read), len(columns), len(row_groups), metadata.num_row_groups))
+            sample = parquet_file.read_row_groups(row_groups, columns=columns_to_read).to_pandas()
+            for name in columns_to_read:
+                columns[name].update(sample[name])
+
+        label_counter = LabelCounter(self.label_column)
+        if self.label_column in schema.names:
+            for batch in parquet_file.iter_batches(batch_size=DEFAULT_LABEL_CHUNK_SIZE, columns=[self.label_column]):
+                label_counter.update(batch.to_pandas())
+
+        self._logger.info("Profiled {} rows and {} columns".format(metadata.num_rows, len(columns)))
+        return SchemaProfile(columns, label_counter.counts, metadata.num_rows)
+
+    @staticmethod
+    def arrow_column_kind(arrow_type):
+        """
+        Returns the kind of the values of a column with the Arrow type, see csv_schema_profiler.column_kind
+        """
+        types = pyarrow.types
+        if types.is_integer(arrow_type) or types.is_floating(arrow_type) or types.is_decimal(arrow_type):
+            return COLUMN_KIND_NUMERIC
+        if types.is_dictionary(arrow_type):
+            return COLUMN_KIND_CATEGORY
+        if types.is_string(arrow_type) or types.is_large_string(arrow_type):
+            return COLUMN_KIND_STRING
+        return COLUMN_KIND_OTHER
+
+    @staticmethod
+    def _column_statistics(metadata, index):
+        """
+        Returns a tuple of the count, null count, min and max of a column from the row group statistics, or None if
+        any row group has no statistics for it
+        """
+        count, null_count, min_value, max_value = 0, 0, None, None
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            statistics = row_group.column(index).statistics
+            if statistics is None or not statistics.has_null_count:
+                return None
+            count += row_group.num_rows
+            null_count += statistics.null_count
+            if statistics.has_min_max and isinstance(statistics.min, (int, float)):
+                min_value = statistics.min if min_value is None else min(min_value, statistics.min)
+                max_value = statistics.max if max_value is None else max(max_value, statistics.max)
+        return count, null_count, min_value, max_value
+
+    def _sample_row_groups(self, metadata):
+        row_groups = list(range(metadata.num_row_groups))
+        random.Random(self.seed).shuffle(row_groups)
+        sample, num_rows = [], 0
+        for i in row_groups:
+            if num_rows >= self.sample_rows:
+                break
+            sample.append(i)
+            num_rows += metadata.row_group(i).num_rows
+        return sorted(sample)
@@ -0,0 +1,209 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import io
+import logging
+import os
+import random
+from urllib.parse import urlparse, unquote
+
+import pandas as pd
+from core.client_factory import get_client
+from features.csv_schema_profiler import CsvSchemaProfiler
+
+DEFAULT_HEAD_BYTES = 8 * 1024 * 1024
+
+DEFAULT_NUM_RANGES = 4
+
+DEFAULT_RANGE_BYTES = 1024 * 1024
+
+DEFAULT_MAX_OBJECTS = 5
+
+RECORD_SEPARATOR = b"\n"
+
+
+class S3ObjectStore:
+    """
+    Lists and reads byte ranges of S3 objects
+    """
+
+    def __init__(self, client=None):
+        self.client = client or get_client("s3")
+
+    def list_objects(self, uri):
+        """
+        Returns a list of (key, size) of the object, or of the objects under the prefix when the uri ends with /
+        """
+        bucket, key = self._parse(uri)
+        if key and not key.endswith("/"):
+            size = self.client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+            return [(uri, size)]
+
+        objects = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=key):
+            for o in page.get("Contents", []):
+                if o["Size"] > 0:
+                    objects.append(("s3://{}/{}".format(bucket, o["Key"]), o["Size"]))
+        return objects
+
+    def read_range(self, uri, start, end):
+        """
+        Reads the bytes from start up to, but excluding, end
+        """
+        bucket, key = self._parse(uri)
+        response = self.client.get_object(Bucket=bucket, Key=key, Range="bytes={}-{}".format(start, end - 1))
+        return response["Body"].read()
+
+    @staticmethod
+    def _parse(uri):
+        parsed = urlparse(uri)
+        return parsed.netloc, parsed.path.lstrip("/")
+
+
+class LocalObjectStore:
+    """
+    Lists and reads byte ranges of local files, with the same interface as S3ObjectStore
+    """
+
+    def list_objects(self, uri):
+        path = self._parse(uri)
+        if not os.path.isdir(path):
+            return [(path, os.path.getsize(path))]
+
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if not f.startswith(".")]
+        return [(f, os.path.getsize(f)) for f in files if os.path.isfile(f) and os.path.getsize(f) > 0]
+
+    def read_range(self, uri, start, end):
+        with open(self._parse(uri), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    @staticmethod
+    def _parse(uri):
+        parsed = urlparse(uri)
+        return unquote(parsed.path) if parsed.scheme == "file" else uri
+
+
+class RangedSampleReader:
+    """
+    Samples CSV objects without downloading them, reading the head and a few random byte ranges of each object.
+    The ranges are realigned to whole records, so the sample can be profiled like a small file
+    """
+
+    def __init__(self, head_bytes=DEFAULT_HEAD_BYTES, num_ranges=DEFAULT_NUM_RANGES, range_bytes=DEFAULT_RANGE_BYTES,
+                 max_objects=DEFAULT_MAX_OBJECTS, seed=0, s3_object_store=None):
+        """
+        :param head_bytes: Bytes read from the start of each object
+        :param num_ranges: Random ranges read from the rest of each object
+        :param range_bytes: Bytes read per random range
+        :param max_objects: Objects sampled when the uri is a prefix with more objects
+        :param seed: Seed for choosing the objects and ranges
+        :param s3_object_store: S3ObjectStore, to read s3:// uris with a different client
+        """
+        self.head_bytes = head_bytes
+        self.num_ranges = num_ranges
+        self.range_bytes = range_bytes
+        self.max_objects = max_objects
+        self.seed = seed
+        self._s3_object_store = s3_object_store
+
+    @property
+    def _logger(self):
+        return logging.getLogger(__name__)
+
+    def _object_store(self, uri):
+        scheme = urlparse(uri).scheme
+        if scheme == "s3":
+            self._s3_object_store = self._s3_object_store or S3ObjectStore()
+            return self._s3_object_store
+        if scheme in ("file", ""):
+            return LocalObjectStore()
+        raise ValueError("Unsupported uri {}, expecting s3:// or file://".format(uri))
+
+    def read_chunks(self, uri, **read_csv_kwargs):
+        """
+        Yields the sample of the object(s) at the uri as dataframes, one per byte range
+        :param uri: An s3:// or file:// uri of a CSV object, or of a prefix / directory of CSV objects
+        :param read_csv_kwargs: Extra arguments for pandas.read_csv
+        """
+        store = self._object_store(uri)
+        rand = random.Random(self.seed)
+
+        objects = store.list_objects(uri)
+        if not objects:
+            raise ValueError("No objects found at {}".format(uri))
+        if len(objects) > self.max_objects:
+            objects = sorted(rand.sample(objects, self.max_objects))
+
+        header = None
+        for object_uri, size in objects:
+            for start, end in self._choose_ranges(size, rand):
+                data = store.read_range(object_uri, start, end)
+                self._logger.debug("Read bytes {}-{} of {}".format(start, end, object_uri))
+                data = self._realign(data, is_start=start == 0, is_end=end == size)
+
+                # The first line of each object is its header
+                if start == 0:
+                    object_header, _, data = data.partition(RECORD_SEPARATOR)
+                    if not object_header.strip():
+                        raise ValueError("No header found in the first {} bytes of {}".format(end, object_uri))
+                    header = header or object_header
+                if not data.strip():
+                    continue
+
+                yield pd.read_csv(io.BytesIO(header + RECORD_SEPARATOR + data), on_bad_lines="skip",
+                                  **read_csv_kwargs)
+
+    def profile(self, uri, profiler=None):
+        """
+        Profiles the sample of the object(s) at the uri
+        :param uri: An s3:// or file:// uri, see read_chunks
+        :param profiler: CsvSchemaProfiler
+        :return: csv_schema_profiler.SchemaProfile
+        """
+        profiler = profiler or CsvSchemaProfiler()
+        return profiler.profile_chunks(self.read_chunks(uri))
+
+    def _choose_ranges(self, size, rand):
+        """
+        Returns a sorted list of (start, end) byte ranges, the head and non overlapping random ranges after it
+        """
+        if size <= self.head_bytes + self.num_ranges * self.range_bytes:
+            return [(0, size)]
+
+        ranges = [(0, self.head_bytes)]
+        # Split the rest of the object into equal slots and read a random range in each, so they do not overlap
+        slot_size = (size - self.head_bytes) // self.num_ranges
+        for i in range(self.num_ranges):
+            slot_start = self.head_bytes + i * slot_size
+            start = slot_start + rand.randint(0, max(slot_size - self.range_bytes, 0))
+            ranges.append((start, min(start + self.range_bytes, size)))
+        return ranges
+
+    @staticmethod
+    def _realign(data, is_start, is_end):
+        """
+        Drops the partial records at either end of a range
+        """
+        if not is_start:
+            # The range may start in the middle of a record, so skip to the next one
+            index = data.find(RECORD_SEPARATOR)
+            data = data[index + 1:] if index >= 0 else b""
+        if not is_end:
+            index = data.rfind(RECORD_SEPARATOR)
+            data = data[:index + 1] if index >= 0 else b""
+        return data
@@ -0,0 +1,83 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HLL_PRECISION = 12
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog distinct count sketch, with a fixed memory of 2^precision registers whatever the number of values.
+    The relative error of the estimate is about 1.04 / sqrt(2^precision), i.e. 1.6% for the default precision
+    """
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        """
+        :param precision: The number of hash bits used to pick a register, between 4 and 18
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("The precision must be between 4 and 18, found {}".format(precision))
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        """
+        Adds the values of an array or series to the sketch
+        """
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        if values.dtype.kind not in "biuf":
+            values = values.astype(object)
+        self.add_hashes(pd.util.hash_array(values))
+
+    def add_hashes(self, hashes):
+        """
+        Adds 64 bit hashes to the sketch
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        remaining_bits = 64 - self.precision
+        index = (hashes >> np.uint64(remaining_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << remaining_bits) - 1)
+        # The rank is the position of the leftmost 1 bit in the remaining bits, frexp returns the bit length
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        rank = (remaining_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """
+        Merges another sketch of the same precision into this one
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of precision {} and {}".format(self.precision, other.precision))
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """
+        Returns the estimated number of distinct values added
+        """
+        num_registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / num_registers)
+        raw_estimate = alpha * num_registers ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        empty_registers = int(np.count_nonzero(self.registers == 0))
+        if raw_estimate <= 2.5 * num_registers and empty_registers > 0:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(num_registers * np.log(num_registers / empty_registers)))
+        return int(round(raw_estimate))
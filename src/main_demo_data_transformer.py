@@ -18,10 +18,8 @@
 import argparse
 import logging
 import os
-import random
 import string
 import sys
-from datetime import datetime
 
 import numpy as np
 import pandas as pd
@@ -30,6 +28,15 @@ FRAUD_DETECTOR_MANDATORY_TIMESTAMP = "EVENT_TIMESTAMP"
 
 FRAUD_DETECTOR_MANDATORY_LABEL = "EVENT_LABEL"
 
+EMAIL_NAME_LENGTH = 10
+
+EMAIL_DOMAIN_LENGTH = 5
+
+LOWERCASE_LETTERS = np.frombuffer(string.ascii_lowercase.encode("ascii"), dtype=np.uint8)
+
+# The decimal string of each octet, to format ip addresses with a lookup rather than per row
+OCTET_STRINGS = np.array([str(i) for i in range(256)])
+
 
 class DemoDataTransformer:
     """
@@ -37,8 +44,11 @@ class DemoDataTransformer:
 
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, seed=None):
+        """
+        :param seed: Seed for the random data, so the same seed generates the same data
+        """
+        self._random = np.random.default_rng(seed)
 
     def generate_random_data(self, size: int = 30000) -> pd.DataFrame:
         """
@@ -94,13 +104,14 @@ Writes the dataframe to local file system in csv format
         df.to_csv(file_path, header=True, index=False)
         return df
 
-    def run_pipeline(self, **kwargs):
+    def run_pipeline(self, size=30000, **kwargs):
         """
         Run the entire data cleansing pipeline
+        :param size: The number of rows to generate
         :return:
         """
         # Step1: Read data
-        df_train = self.generate_random_data()
+        df_train = self.generate_random_data(size)
 
         # Step2: Apply transformations
         # TODO: run any transformation
@@ -113,33 +124,49 @@ Writes the dataframe to local file system in csv format
         return logging.getLogger(__name__)
 
     def generate_random_ip(self, df, column_name):
-        start = 1
-        end = 255
-        a = np.random.randint(start, end, df.shape[0])
-        b = np.random.randint(start, end, df.shape[0])
-        c = np.random.randint(start, end, df.shape[0])
-        d = np.random.randint(start, end, df.shape[0])
-        df[column_name] = [f"{t[0]}.{t[1]}.{t[2]}.{t[3]}" for t in zip(a, b, c, d)]
-
+        octets = self._random.integers(1, 255, size=(4, df.shape[0]))
+        ips = OCTET_STRINGS[octets[0]]
+        for o in octets[1:]:
+            ips = np.char.add(np.char.add(ips, "."), OCTET_STRINGS[o])
+        df[column_name] = ips
         return df
 
     def generate_random_date(self, df, column_name):
-        ys = np.random.randint(2010, 2020, df.shape[0])
-        ms = np.random.randint(1, 12, df.shape[0])
-        ds = np.random.randint(1, 28, df.shape[0])
-        hs = np.random.randint(0, 24, df.shape[0])
-        df[column_name] = [datetime(y, m, d, h) for (y, m, d, h) in zip(ys, ms, ds, hs)]
+        size = df.shape[0]
+        ys = self._random.integers(2010, 2020, size)
+        ms = self._random.integers(1, 12, size)
+        ds = self._random.integers(1, 28, size)
+        hs = self._random.integers(0, 24, size)
+        months = ((ys - 1970) * 12 + ms - 1).astype("datetime64[M]")
+        hours = (months.astype("datetime64[D]") + (ds - 1)).astype("datetime64[h]") + hs
+        df[column_name] = hours.astype("datetime64[ns]")
         return df
 
     def generate_random_email(self, df, column_name):
-        names = ["".join(random.sample(string.ascii_lowercase, 10)) for i in range(df.shape[0])]
-        domains = ["".join(random.sample(string.ascii_lowercase, 5)) for i in range(df.shape[0])]
-
-        df[column_name] = [f"{n}@{d}.com" for (n, d) in zip(names, domains)]
+        size = df.shape[0]
+        # Fixed length emails, assembled as rows of bytes and viewed as strings
+        emails = np.empty((size, EMAIL_NAME_LENGTH + EMAIL_DOMAIN_LENGTH + 5), dtype=np.uint8)
+        emails[:, :EMAIL_NAME_LENGTH] = self._distinct_letters(size, EMAIL_NAME_LENGTH)
+        emails[:, EMAIL_NAME_LENGTH] = ord("@")
+        emails[:, EMAIL_NAME_LENGTH + 1:-4] = self._distinct_letters(size, EMAIL_DOMAIN_LENGTH)
+        emails[:, -4:] = np.frombuffer(b".com", dtype=np.uint8)
+        df[column_name] = emails.view("S{}".format(emails.shape[1])).ravel().astype(str)
         return df
 
+    def _distinct_letters(self, size, length):
+        """
+        Returns size rows of length distinct lowercase letters, by shuffling the first length positions of the
+        alphabet of every row at once
+        """
+        letters = np.tile(LOWERCASE_LETTERS, (size, 1))
+        rows = np.arange(size)
+        for i in range(length):
+            j = self._random.integers(i, len(LOWERCASE_LETTERS), size)
+            letters[rows, i], letters[rows, j] = letters[rows, j], letters[rows, i]
+        return letters[:, :length]
+
     def generate_binary_label(self, df, column_name):
-        flag = np.random.randint(0, 2, df.shape[0])
+        flag = self._random.integers(0, 2, df.shape[0])
         df[column_name] = flag
         return df
 
@@ -148,6 +175,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--s3desturi", help="The s3 prefix to write to. e.g. s3://mybucket/prefix", required=True)
 
+    parser.add_argument("--rows", help="The number of rows to generate", default=30000, type=int)
+    parser.add_argument("--seed", help="Seed for the random data", default=None, type=int)
+
     parser.add_argument("--log-level", help="Log level", default="INFO", choices={"INFO", "WARN", "DEBUG", "ERROR"})
     args = parser.parse_args()
     print(args.__dict__)
@@ -157,4 +187,4 @@ if __name__ == '__main__':
                         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # Run
-    DemoDataTransformer().run_pipeline(s3_destination_uri=args.s3desturi)
+    DemoDataTransformer(seed=args.seed).run_pipeline(size=args.rows, s3_destination_uri=args.s3desturi)
@@ -19,16 +19,20 @@ import argparse
 import logging
 import sys
 
-from core.fraud_detector_model_based_deploy import FraudDetectorModelBasedDeploy, FRAUD_DETECTOR_RULE_MATCH_METHOD
+from core.api_metrics import write_api_metrics_reports
+from core.fraud_detector_model_based_deploy import FRAUD_DETECTOR_RULE_MATCH_METHOD
+from core.fraud_detector_reconciler import FraudDetectorReconciler
 from main_demo_fraud_detector_train import EVENT_TYPE_NAME
 from rules.detector_rule_model_score_positive import DetectorRuleModelScorePositive
 
 MODEL_TYPE_ONLINE_FRAUD_INSIGHTS = 'ONLINE_FRAUD_INSIGHTS'
 
 
-def deploy(model_name, model_version, detector_name, detector_description, model_description, event_name):
+def deploy(model_name, model_version, detector_name, detector_description, model_description, event_name,
+           dry_run=False):
     """
-    Deploys a model with a single scoring rule based on model score
+    Deploys a model with a single scoring rule based on model score, only applying the changes required
+    :param dry_run: If true, only prints the changes required without applying them
     :param event_name: Event name
     :param model_description: Model description
     :param detector_description: Detector description
@@ -40,14 +44,15 @@ def deploy(model_name, model_version, detector_name, detector_description, model
     detector_rules = [
         DetectorRuleModelScorePositive(rule_id="positivescorerule", model_name=model_name, threshold=950)
     ]
-    deployer = FraudDetectorModelBasedDeploy()
+    deployer = FraudDetectorReconciler()
 
     deployer.deploy(detector_name=detector_name, detector_description=detector_description, event_type_name=event_name,
                     detector_rules=detector_rules, rule_execution_mode=FRAUD_DETECTOR_RULE_MATCH_METHOD,
                     model_versions=[{"modelId": model_name,
                                      "modelDescription": model_description,
                                      "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
-                                     "modelVersionNumber": model_version}])
+                                     "modelVersionNumber": model_version}],
+                    dry_run=dry_run)
 
 
 if __name__ == '__main__':
@@ -58,6 +63,13 @@ if __name__ == '__main__':
     parser.add_argument("--modelDesc", help="Model version description", required=False, default="Demo sample")
     parser.add_argument("--detector", help="The name of the detector", required=True)
     parser.add_argument("--detectorDesc", help="Detector description", required=False, default="Demo sample")
+    parser.add_argument("--dry-run", help="Only show the changes required, without applying them",
+                        action="store_true", default=False)
+
+    parser.add_argument("--metrics-report", help="The JSON file to write the API call metrics to", required=False,
+                        default="api_metrics_deploy.json")
+    parser.add_argument("--metrics-prometheus", help="The Prometheus textfile to write the API call metrics to",
+                        required=False, default=None)
 
     parser.add_argument("--log-level", help="Log level", default="INFO", choices={"INFO", "WARN", "DEBUG", "ERROR"})
     args = parser.parse_args()
@@ -68,5 +80,9 @@ if __name__ == '__main__':
                         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # Run
-    deploy(model_name=args.model, model_version=args.modelVersion, detector_name=args.detector,
-           detector_description=args.detectorDesc, model_description=args.modelDesc, event_name=args.event)
+    try:
+        deploy(model_name=args.model, model_version=args.modelVersion, detector_name=args.detector,
+               detector_description=args.detectorDesc, model_description=args.modelDesc, event_name=args.event,
+               dry_run=args.dry_run)
+    finally:
+        write_api_metrics_reports(args.metrics_report, args.metrics_prometheus, labels={"stage": "deploy"})
@@ -19,9 +19,9 @@ import argparse
 import logging
 import sys
 
-import pandas as pd
 from features.feature_variables_dynamic import FeatureVariablesDynamic
 
+from core.api_metrics import write_api_metrics_reports
 from core.fraud_detector_event import FraudDetectorEvent
 from core.fraud_detector_train import FraudDetectorTrain
 
@@ -29,18 +29,39 @@ MODEL_TYPE_ONLINE_FRAUD_INSIGHTS = 'ONLINE_FRAUD_INSIGHTS'
 
 EVENT_TYPE_NAME = "demoevent"
 
+PARQUET_FILE_EXTENSIONS = (".parquet", ".pq")
 
-def train(model_name, s3uri, sample_data, wait, role):
+
+def train(model_name, s3uri, sample_data, wait, role, profile_workers=None, schema_profile=None,
+          schema_profile_output=None):
     """
     Runs a demo training job using simple mandatory features
-    :param sample_data:
+    :param sample_data: The local training data to create the variables from, else a sample of the s3uri data is used
     :param model_name:
     :param s3uri:
     :param wait:
     :param role:
+    :param profile_workers: The number of processes to profile the sample data columns in
+    :param schema_profile: A schema profile JSON file to create the variables from, instead of profiling the data
+    :param schema_profile_output: The JSON file to write the schema profile to
     :return:
     """
-    model_variables = FeatureVariablesDynamic(df=pd.read_csv(sample_data), true_labels=[1])
+    if schema_profile:
+        # Reuse the profile of an earlier run
+        model_variables = FeatureVariablesDynamic.from_schema_profile_json(schema_profile, true_labels=[1])
+    elif sample_data and sample_data.endswith(PARQUET_FILE_EXTENSIONS):
+        # Types from the Parquet schema, only the string columns are read
+        model_variables = FeatureVariablesDynamic.from_parquet(sample_data, true_labels=[1])
+    elif sample_data:
+        # Profile the data a chunk at a time, so it can be the full training file
+        model_variables = FeatureVariablesDynamic.from_csv(sample_data, true_labels=[1],
+                                                           max_workers=profile_workers)
+    else:
+        # Profile ranges of the training data in S3
+        model_variables = FeatureVariablesDynamic.from_uri(s3uri, true_labels=[1])
+    if schema_profile_output:
+        model_variables.write_schema_profile(schema_profile_output)
+
     model_event = FraudDetectorEvent()
     trainer = FraudDetectorTrain()
 
@@ -61,8 +82,10 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--s3uri", help="The s3 training data file url", required=True)
     parser.add_argument("--sampledata",
-                        help="A subset of training data used to dynamically create variables in fraud detector",
-                        required=True)
+                        help="""The training data, or a subset of it, used to dynamically create variables in
+                        fraud detector. CSV, or Parquet with a .parquet extension.
+                        When not specified, ranges of the s3uri data are read instead""",
+                        required=False, default=None)
     parser.add_argument("--model", help="The name of the model", required=False, default="demo_model")
 
     parser.add_argument("--role", help="The role arn to be used by Fraud detector to access s3 data", required=True)
@@ -72,6 +95,21 @@ if __name__ == '__main__':
                         required=False,
                         default=0, type=int, choices={0, 1})
 
+    parser.add_argument("--profile-workers",
+                        help="The number of processes to profile the --sampledata columns in, for data with many columns",
+                        required=False, default=None, type=int)
+
+    parser.add_argument("--schema-profile",
+                        help="A schema profile JSON file, written by an earlier run, to create the variables from",
+                        required=False, default=None)
+    parser.add_argument("--schema-profile-output", help="The JSON file to write the data schema profile to",
+                        required=False, default="schema_profile.json")
+
+    parser.add_argument("--metrics-report", help="The JSON file to write the API call metrics to", required=False,
+                        default="api_metrics_train.json")
+    parser.add_argument("--metrics-prometheus", help="The Prometheus textfile to write the API call metrics to",
+                        required=False, default=None)
+
     parser.add_argument("--log-level", help="Log level", default="INFO", choices={"INFO", "WARN", "DEBUG", "ERROR"})
     args = parser.parse_args()
     print(args.__dict__)
@@ -81,4 +119,9 @@ if __name__ == '__main__':
                         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # Run
-    train(role=args.role, model_name=args.model, wait=args.wait, s3uri=args.s3uri, sample_data=args.sampledata)
+    try:
+        train(role=args.role, model_name=args.model, wait=args.wait, s3uri=args.s3uri, sample_data=args.sampledata,
+              profile_workers=args.profile_workers, schema_profile=args.schema_profile,
+              schema_profile_output=args.schema_profile_output)
+    finally:
+        write_api_metrics_reports(args.metrics_report, args.metrics_prometheus, labels={"stage": "train"})
@@ -19,6 +19,7 @@ import argparse
 import logging
 import sys
 
+from core.api_metrics import write_api_metrics_reports
 from core.fraud_detector_undeploy import FraudDetectorUndeploy
 
 
@@ -51,6 +52,11 @@ if __name__ == '__main__':
     parser.add_argument("--modelVersion", help="Version of the model", required=False, default=None)
     parser.add_argument("--detector", help="The name of the detector", required=False, default=None)
 
+    parser.add_argument("--metrics-report", help="The JSON file to write the API call metrics to", required=False,
+                        default="api_metrics_undeploy.json")
+    parser.add_argument("--metrics-prometheus", help="The Prometheus textfile to write the API call metrics to",
+                        required=False, default=None)
+
     parser.add_argument("--log-level", help="Log level", default="INFO", choices={"INFO", "WARN", "DEBUG", "ERROR"})
     args = parser.parse_args()
     print(args.__dict__)
@@ -60,4 +66,7 @@ if __name__ == '__main__':
                         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # Run
-    undeploy(model_name=args.model, model_version=args.modelVersion, detector_name=args.detector)
+    try:
+        undeploy(model_name=args.model, model_version=args.modelVersion, detector_name=args.detector)
+    finally:
+        write_api_metrics_reports(args.metrics_report, args.metrics_prometheus, labels={"stage": "undeploy"})
@@ -14,6 +14,21 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
 # ***************************************************************************************
+import hashlib
+import json
+
+
+def rule_content_hash(expression, outcomes, description):
+    """
+    Returns a hash of the rule content, to detect whether a deployed rule has changed
+    :param expression: The rule expression
+    :param outcomes: A list of outcomes
+    :param description: The rule description
+    :return: A hex digest
+    """
+    content = json.dumps({"expression": expression, "outcomes": list(outcomes or []), "description": description},
+                         sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
 class DetectorRuleBase:
@@ -46,3 +61,14 @@ class DetectorRuleBase:
         :return:
         """
         raise NotImplementedError
+
+    def get_content_hash(self, expression=None):
+        """
+        Returns a hash of the expression, outcomes and description, used to detect whether the rule has changed.
+        Compared with rule_content_hash of the deployed rule, so overrides must hash the same content
+        :param expression: The rule expression if already built, as building it can make API calls
+        :return:
+        """
+        if expression is None:
+            expression = self.get_rule_expression()
+        return rule_content_hash(expression, self.outcomes, self.description)
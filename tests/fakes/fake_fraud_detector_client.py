@@ -0,0 +1,545 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+
+import botocore
+
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_TRAINING_SECONDS = 0.0
+DEFAULT_ACTIVATION_SECONDS = 0.0
+DEFAULT_DEACTIVATION_SECONDS = 0.0
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_RETRY_BASE_DELAY = 0.05
+
+MODEL_STATUS_TRAINING_IN_PROGRESS = "TRAINING_IN_PROGRESS"
+MODEL_STATUS_TRAINING_COMPLETE = "TRAINING_COMPLETE"
+MODEL_STATUS_ACTIVATE_IN_PROGRESS = "ACTIVATE_IN_PROGRESS"
+MODEL_STATUS_ACTIVE = "ACTIVE"
+MODEL_STATUS_INACTIVATE_IN_PROGRESS = "INACTIVATE_IN_PROGRESS"
+
+DETECTOR_VERSION_STATUS_TRANSITIONS = {("DRAFT", "ACTIVE"), ("ACTIVE", "INACTIVE"), ("INACTIVE", "ACTIVE")}
+
+
+class FakeFraudDetectorClient:
+    """
+    A stateful in memory stand in for the boto3 frauddetector client, so the train, deploy and undeploy flows can run
+    locally with realistic latency, throttling and errors.
+
+    Models variables, labels, outcomes, entity and event types, rules with versions, models and model versions whose
+    status changes over time, detectors and detector versions. Like a boto3 client, throttled calls are retried up to
+    max_attempts times, and the retries are reported in ResponseMetadata.RetryAttempts.
+
+    Usage:
+        client = FakeFraudDetectorClient(latency=0.05, throttle_rate=0.1, activation_seconds=2)
+        FraudDetectorTrain(client=client, fraud_detector_utils=FraudDetectorUtils(fraud_detector_client=client))
+    """
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, tps_quotas=None, training_seconds=DEFAULT_TRAINING_SECONDS,
+                 activation_seconds=DEFAULT_ACTIVATION_SECONDS, deactivation_seconds=DEFAULT_DEACTIVATION_SECONDS,
+                 page_size=DEFAULT_PAGE_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 retry_base_delay=DEFAULT_RETRY_BASE_DELAY, region_name="us-east-1", seed=None, clock=None,
+                 sleep=None):
+        """
+        :param latency: Seconds each attempt takes, or a dict of seconds by operation name with a "default" key
+        :param throttle_rate: The probability that an attempt is throttled, or a dict by operation name
+        :param tps_quotas: A dict of the attempts per second allowed by operation name, attempts over the quota are
+                           throttled
+        :param training_seconds: Seconds a model version takes to train
+        :param activation_seconds: Seconds a model version takes to activate
+        :param deactivation_seconds: Seconds a model version takes to deactivate
+        :param page_size: Maximum number of items per page of the paginated operations
+        :param max_attempts: Maximum number of attempts per call, including the initial attempt, like a boto3 client
+        :param retry_base_delay: The base of the exponential backoff between attempts, in seconds
+        :param region_name: The region reported in meta.region_name
+        :param seed: Seed for the throttling random numbers
+        :param clock: Returns the current time in seconds, time.monotonic if not specified
+        :param sleep: Sleeps for the given seconds, time.sleep if not specified
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.tps_quotas = tps_quotas or {}
+        self.training_seconds = training_seconds
+        self.activation_seconds = activation_seconds
+        self.deactivation_seconds = deactivation_seconds
+        self.page_size = page_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.meta = SimpleNamespace(region_name=region_name)
+        self._random = random.Random(seed)
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or time.sleep
+
+        self._lock = threading.RLock()
+        self._injected_errors = defaultdict(deque)
+        self._recent_attempts = defaultdict(deque)
+        self.call_counts = Counter()
+        self.attempt_counts = Counter()
+        self.throttle_counts = Counter()
+
+        self.variables = {}
+        self.labels = {}
+        self.outcomes = {}
+        self.entity_types = {}
+        self.event_types = {}
+        self.models = {}
+        self.model_versions = {}
+        self.detectors = {}
+        self.detector_versions = {}
+        self.rules = {}
+
+    def inject_error(self, operation_name, error_code="InternalServerException", count=1):
+        """
+        Fails the next count calls of the operation with the error code, without retrying them
+        """
+        with self._lock:
+            self._injected_errors[operation_name].extend([error_code] * count)
+
+    # Variables
+
+    def create_variable(self, **kwargs):
+        return self._invoke("create_variable", self._create_variable, kwargs)
+
+    def get_variables(self, **kwargs):
+        return self._invoke("get_variables", self._get_variables, kwargs)
+
+    def batch_get_variable(self, **kwargs):
+        return self._invoke("batch_get_variable", self._batch_get_variable, kwargs)
+
+    def batch_create_variable(self, **kwargs):
+        return self._invoke("batch_create_variable", self._batch_create_variable, kwargs)
+
+    # Labels, outcomes, entity types and event types
+
+    def put_label(self, **kwargs):
+        return self._invoke("put_label", self._put_label, kwargs)
+
+    def get_labels(self, **kwargs):
+        return self._invoke("get_labels", self._get_labels, kwargs)
+
+    def put_outcome(self, **kwargs):
+        return self._invoke("put_outcome", self._put_outcome, kwargs)
+
+    def get_outcomes(self, **kwargs):
+        return self._invoke("get_outcomes", self._get_outcomes, kwargs)
+
+    def put_entity_type(self, **kwargs):
+        return self._invoke("put_entity_type", self._put_entity_type, kwargs)
+
+    def put_event_type(self, **kwargs):
+        return self._invoke("put_event_type", self._put_event_type, kwargs)
+
+    # Models
+
+    def create_model(self, **kwargs):
+        return self._invoke("create_model", self._create_model, kwargs)
+
+    def get_models(self, **kwargs):
+        return self._invoke("get_models", self._get_models, kwargs)
+
+    def create_model_version(self, **kwargs):
+        return self._invoke("create_model_version", self._create_model_version, kwargs)
+
+    def get_model_version(self, **kwargs):
+        return self._invoke("get_model_version", self._get_model_version, kwargs)
+
+    def update_model_version_status(self, **kwargs):
+        return self._invoke("update_model_version_status", self._update_model_version_status, kwargs)
+
+    # Detectors and rules
+
+    def put_detector(self, **kwargs):
+        return self._invoke("put_detector", self._put_detector, kwargs)
+
+    def get_detectors(self, **kwargs):
+        return self._invoke("get_detectors", self._get_detectors, kwargs)
+
+    def describe_detector(self, **kwargs):
+        return self._invoke("describe_detector", self._describe_detector, kwargs)
+
+    def delete_detector(self, **kwargs):
+        return self._invoke("delete_detector", self._delete_detector, kwargs)
+
+    def create_detector_version(self, **kwargs):
+        return self._invoke("create_detector_version", self._create_detector_version, kwargs)
+
+    def get_detector_version(self, **kwargs):
+        return self._invoke("get_detector_version", self._get_detector_version, kwargs)
+
+    def update_detector_version_status(self, **kwargs):
+        return self._invoke("update_detector_version_status", self._update_detector_version_status, kwargs)
+
+    def delete_detector_version(self, **kwargs):
+        return self._invoke("delete_detector_version", self._delete_detector_version, kwargs)
+
+    def create_rule(self, **kwargs):
+        return self._invoke("create_rule", self._create_rule, kwargs)
+
+    def update_rule_version(self, **kwargs):
+        return self._invoke("update_rule_version", self._update_rule_version, kwargs)
+
+    def get_rules(self, **kwargs):
+        return self._invoke("get_rules", self._get_rules, kwargs)
+
+    def delete_rule(self, **kwargs):
+        return self._invoke("delete_rule", self._delete_rule, kwargs)
+
+    # Request handling
+
+    def _invoke(self, operation_name, handler, kwargs):
+        with self._lock:
+            self.call_counts[operation_name] += 1
+            injected_error = self._injected_errors[operation_name].popleft() \
+                if self._injected_errors[operation_name] else None
+        if injected_error is not None:
+            raise _client_error(operation_name, injected_error, "Injected error")
+
+        attempt = 0
+        while True:
+            self._sleep(self._latency(operation_name))
+            with self._lock:
+                self.attempt_counts[operation_name] += 1
+                throttled = self._is_throttled(operation_name)
+                if throttled:
+                    self.throttle_counts[operation_name] += 1
+                else:
+                    response = handler(**kwargs)
+                    response["ResponseMetadata"] = {"HTTPStatusCode": 200, "RetryAttempts": attempt}
+                    return response
+
+            attempt += 1
+            if attempt >= self.max_attempts:
+                error = _client_error(operation_name, "ThrottlingException", "Rate exceeded")
+                error.response["ResponseMetadata"]["RetryAttempts"] = attempt - 1
+                raise error
+            self._sleep(self._random.random() * self.retry_base_delay * (2 ** attempt))
+
+    def _latency(self, operation_name):
+        if isinstance(self.latency, dict):
+            return self.latency.get(operation_name, self.latency.get("default", 0.0))
+        return self.latency
+
+    def _is_throttled(self, operation_name):
+        quota = self.tps_quotas.get(operation_name)
+        if quota is not None:
+            now = self._clock()
+            recent_attempts = self._recent_attempts[operation_name]
+            while recent_attempts and recent_attempts[0] <= now - 1:
+                recent_attempts.popleft()
+            if len(recent_attempts) >= quota:
+                return True
+            recent_attempts.append(now)
+
+        throttle_rate = self.throttle_rate.get(operation_name, 0.0) if isinstance(self.throttle_rate, dict) \
+            else self.throttle_rate
+        return throttle_rate > 0 and self._random.random() < throttle_rate
+
+    def _page(self, items, result_key, nextToken=None, maxResults=None, **kwargs):
+        start = int(nextToken) if nextToken else 0
+        end = start + (maxResults or self.page_size)
+        response = {result_key: items[start:end]}
+        if end < len(items):
+            response["nextToken"] = str(end)
+        return response
+
+    # Variables
+
+    def _create_variable(self, name, dataType, dataSource, defaultValue, description=None, variableType=None,
+                         tags=None):
+        if name in self.variables:
+            raise _client_error("CreateVariable", "ValidationException", "Variable {} already exists".format(name))
+        self.variables[name] = {"name": name, "dataType": dataType, "dataSource": dataSource,
+                                "defaultValue": defaultValue, "description": description,
+                                "variableType": variableType}
+        return {}
+
+    def _get_variables(self, name=None, nextToken=None, maxResults=None):
+        if name is not None:
+            if name not in self.variables:
+                raise _client_error("GetVariables", "ResourceNotFoundException",
+                                    "Variable {} not found".format(name))
+            return {"variables": [dict(self.variables[name])]}
+        return self._page([dict(v) for v in self.variables.values()], "variables", nextToken, maxResults)
+
+    def _batch_get_variable(self, names):
+        return {"variables": [dict(self.variables[n]) for n in names if n in self.variables],
+                "errors": [{"name": n, "code": 404, "message": "Variable not found"} for n in names
+                           if n not in self.variables]}
+
+    def _batch_create_variable(self, variableEntries, tags=None):
+        errors = []
+        for entry in variableEntries:
+            if entry["name"] in self.variables:
+                errors.append({"name": entry["name"], "code": 400, "message": "Variable already exists"})
+            else:
+                self.variables[entry["name"]] = {"name": entry["name"], "dataType": entry["dataType"],
+                                                 "dataSource": entry["dataSource"],
+                                                 "defaultValue": entry["defaultValue"],
+                                                 "description": entry.get("description"),
+                                                 "variableType": entry.get("variableType")}
+        return {"errors": errors}
+
+    # Labels, outcomes, entity types and event types
+
+    def _put_label(self, name, description=None, tags=None):
+        self.labels[name] = {"name": name, "description": description}
+        return {}
+
+    def _get_labels(self, name=None, nextToken=None, maxResults=None):
+        return self._get_named("GetLabels", self.labels, "labels", name, nextToken, maxResults)
+
+    def _put_outcome(self, name, description=None, tags=None):
+        self.outcomes[name] = {"name": name, "description": description}
+        return {}
+
+    def _get_outcomes(self, name=None, nextToken=None, maxResults=None):
+        return self._get_named("GetOutcomes", self.outcomes, "outcomes", name, nextToken, maxResults)
+
+    def _put_entity_type(self, name, description=None, tags=None):
+        self.entity_types[name] = {"name": name, "description": description}
+        return {}
+
+    def _put_event_type(self, name, eventVariables, entityTypes, description=None, labels=None, tags=None,
+                        **kwargs):
+        self._require_all("PutEventType", self.variables, eventVariables, "Variable")
+        self._require_all("PutEventType", self.labels, labels or [], "Label")
+        self._require_all("PutEventType", self.entity_types, entityTypes, "Entity type")
+        self.event_types[name] = {"name": name, "description": description, "eventVariables": list(eventVariables),
+                                  "labels": list(labels or []), "entityTypes": list(entityTypes)}
+        return {}
+
+    def _get_named(self, operation_name, resources, result_key, name, nextToken, maxResults):
+        if name is not None:
+            if name not in resources:
+                raise _client_error(operation_name, "ResourceNotFoundException", "{} not found".format(name))
+            return {result_key: [dict(resources[name])]}
+        return self._page([dict(r) for r in resources.values()], result_key, nextToken, maxResults)
+
+    # Models
+
+    def _create_model(self, modelId, modelType, eventTypeName, description=None, tags=None):
+        self._require_all("CreateModel", self.event_types, [eventTypeName], "Event type")
+        if (modelId, modelType) in self.models:
+            raise _client_error("CreateModel", "ValidationException", "Model {} already exists".format(modelId))
+        self.models[(modelId, modelType)] = {"modelId": modelId, "modelType": modelType,
+                                             "eventTypeName": eventTypeName, "description": description}
+        return {}
+
+    def _get_models(self, modelId=None, modelType=None, nextToken=None, maxResults=None):
+        models = [dict(m) for (model_id, model_type), m in self.models.items()
+                  if modelId in (None, model_id) and modelType in (None, model_type)]
+        if modelId is not None and not models:
+            raise _client_error("GetModels", "ResourceNotFoundException", "Model {} not found".format(modelId))
+        return self._page(models, "models", nextToken, maxResults)
+
+    def _create_model_version(self, modelId, modelType, trainingDataSource, trainingDataSchema,
+                              externalEventsDetail=None, ingestedEventsDetail=None, tags=None):
+        self._require_all("CreateModelVersion", self.models, [(modelId, modelType)], "Model")
+        major_versions = [int(float(v)) for (model_id, model_type, v) in self.model_versions
+                          if (model_id, model_type) == (modelId, modelType)]
+        model_version = "{}.0".format(max(major_versions, default=0) + 1)
+        self.model_versions[(modelId, modelType, model_version)] = {
+            "modelId": modelId, "modelType": modelType, "modelVersionNumber": model_version,
+            "trainingDataSource": trainingDataSource, "trainingDataSchema": trainingDataSchema,
+            "externalEventsDetail": externalEventsDetail,
+            "status": MODEL_STATUS_TRAINING_IN_PROGRESS,
+            "_nextStatus": MODEL_STATUS_TRAINING_COMPLETE,
+            "_nextStatusTime": self._clock() + self.training_seconds}
+        return {"modelId": modelId, "modelType": modelType, "modelVersionNumber": model_version,
+                "status": MODEL_STATUS_TRAINING_IN_PROGRESS}
+
+    def _model_version(self, operation_name, modelId, modelType, modelVersionNumber):
+        key = (modelId, modelType, str(modelVersionNumber))
+        self._require_all(operation_name, self.model_versions, [key], "Model version")
+        model_version = self.model_versions[key]
+        # Complete any status transition that is due
+        if model_version.get("_nextStatus") and self._clock() >= model_version["_nextStatusTime"]:
+            model_version["status"] = model_version.pop("_nextStatus")
+            model_version.pop("_nextStatusTime")
+        return model_version
+
+    def _get_model_version(self, modelId, modelType, modelVersionNumber):
+        model_version = self._model_version("GetModelVersion", modelId, modelType, modelVersionNumber)
+        return {k: v for k, v in model_version.items() if not k.startswith("_")}
+
+    def _update_model_version_status(self, modelId, modelType, modelVersionNumber, status):
+        model_version = self._model_version("UpdateModelVersionStatus", modelId, modelType, modelVersionNumber)
+        if status == MODEL_STATUS_ACTIVE and model_version["status"] == MODEL_STATUS_TRAINING_COMPLETE:
+            model_version["status"] = MODEL_STATUS_ACTIVATE_IN_PROGRESS
+            model_version["_nextStatus"] = MODEL_STATUS_ACTIVE
+            model_version["_nextStatusTime"] = self._clock() + self.activation_seconds
+        elif status == "INACTIVE" and model_version["status"] == MODEL_STATUS_ACTIVE:
+            model_version["status"] = MODEL_STATUS_INACTIVATE_IN_PROGRESS
+            model_version["_nextStatus"] = MODEL_STATUS_TRAINING_COMPLETE
+            model_version["_nextStatusTime"] = self._clock() + self.deactivation_seconds
+        else:
+            raise _client_error("UpdateModelVersionStatus", "ValidationException",
+                                "Cannot change the status from {} to {}".format(model_version["status"], status))
+        return {}
+
+    # Detectors
+
+    def _put_detector(self, detectorId, eventTypeName, description=None, tags=None):
+        self._require_all("PutDetector", self.event_types, [eventTypeName], "Event type")
+        self.detectors[detectorId] = {"detectorId": detectorId, "eventTypeName": eventTypeName,
+                                      "description": description}
+        return {}
+
+    def _get_detectors(self, detectorId=None, nextToken=None, maxResults=None):
+        if detectorId is not None:
+            self._require_all("GetDetectors", self.detectors, [detectorId], "Detector")
+            return {"detectors": [dict(self.detectors[detectorId])]}
+        return self._page([dict(d) for d in self.detectors.values()], "detectors", nextToken, maxResults)
+
+    def _describe_detector(self, detectorId, nextToken=None, maxResults=None):
+        self._require_all("DescribeDetector", self.detectors, [detectorId], "Detector")
+        summaries = [{"detectorVersionId": v["detectorVersionId"], "status": v["status"],
+                      "description": v["description"]}
+                     for (detector_id, _), v in sorted(self.detector_versions.items(), key=lambda i: int(i[0][1]))
+                     if detector_id == detectorId]
+        response = self._page(summaries, "detectorVersionSummaries", nextToken, maxResults)
+        response["detectorId"] = detectorId
+        return response
+
+    def _delete_detector(self, detectorId):
+        self._require_all("DeleteDetector", self.detectors, [detectorId], "Detector")
+        if any(d == detectorId for d, _ in self.detector_versions) or any(d == detectorId for d, _ in self.rules):
+            raise _client_error("DeleteDetector", "ConflictException",
+                                "Detector {} still has versions or rules".format(detectorId))
+        del self.detectors[detectorId]
+        return {}
+
+    def _create_detector_version(self, detectorId, rules, description=None, externalModelEndpoints=None,
+                                 modelVersions=None, ruleExecutionMode="FIRST_MATCHED", tags=None):
+        self._require_all("CreateDetectorVersion", self.detectors, [detectorId], "Detector")
+        for rule in rules:
+            self._rule_version("CreateDetectorVersion", rule)
+        for model in modelVersions or []:
+            model_version = self._model_version("CreateDetectorVersion", model["modelId"], model["modelType"],
+                                                model["modelVersionNumber"])
+            if model_version["status"] != MODEL_STATUS_ACTIVE:
+                raise _client_error("CreateDetectorVersion", "ValidationException",
+                                    "Model {} version {} is not active".format(model["modelId"],
+                                                                               model["modelVersionNumber"]))
+
+        version_ids = [int(v) for d, v in self.detector_versions if d == detectorId]
+        detector_version_id = str(max(version_ids, default=0) + 1)
+        self.detector_versions[(detectorId, detector_version_id)] = {
+            "detectorId": detectorId, "detectorVersionId": detector_version_id, "description": description,
+            "modelVersions": [dict(m) for m in modelVersions or []], "rules": [dict(r) for r in rules],
+            "ruleExecutionMode": ruleExecutionMode, "status": "DRAFT"}
+        return {"detectorId": detectorId, "detectorVersionId": detector_version_id, "status": "DRAFT"}
+
+    def _detector_version(self, operation_name, detectorId, detectorVersionId):
+        key = (detectorId, str(detectorVersionId))
+        self._require_all(operation_name, self.detector_versions, [key], "Detector version")
+        return self.detector_versions[key]
+
+    def _get_detector_version(self, detectorId, detectorVersionId):
+        return dict(self._detector_version("GetDetectorVersion", detectorId, detectorVersionId))
+
+    def _update_detector_version_status(self, detectorId, detectorVersionId, status):
+        detector_version = self._detector_version("UpdateDetectorVersionStatus", detectorId, detectorVersionId)
+        if (detector_version["status"], status) not in DETECTOR_VERSION_STATUS_TRANSITIONS:
+            raise _client_error("UpdateDetectorVersionStatus", "ValidationException",
+                                "Cannot change the status from {} to {}".format(detector_version["status"], status))
+        if status == "ACTIVE":
+            # Only one version of a detector is active at a time
+            for (detector_id, _), v in self.detector_versions.items():
+                if detector_id == detectorId and v["status"] == "ACTIVE":
+                    v["status"] = "INACTIVE"
+        detector_version["status"] = status
+        return {}
+
+    def _delete_detector_version(self, detectorId, detectorVersionId):
+        detector_version = self._detector_version("DeleteDetectorVersion", detectorId, detectorVersionId)
+        if detector_version["status"] == "ACTIVE":
+            raise _client_error("DeleteDetectorVersion", "ConflictException",
+                                "Cannot delete the active detector version")
+        del self.detector_versions[(detectorId, str(detectorVersionId))]
+        return {}
+
+    # Rules
+
+    def _create_rule(self, ruleId, detectorId, expression, language, outcomes, description=None, tags=None):
+        self._require_all("CreateRule", self.detectors, [detectorId], "Detector")
+        self._require_all("CreateRule", self.outcomes, outcomes, "Outcome")
+        if (detectorId, ruleId) in self.rules:
+            raise _client_error("CreateRule", "ValidationException", "Rule {} already exists".format(ruleId))
+        self.rules[(detectorId, ruleId)] = {}
+        return {"rule": self._add_rule_version(detectorId, ruleId, expression, language, outcomes, description)}
+
+    def _update_rule_version(self, rule, expression, language, outcomes, description=None, tags=None):
+        self._rule_version("UpdateRuleVersion", rule)
+        self._require_all("UpdateRuleVersion", self.outcomes, outcomes, "Outcome")
+        return {"rule": self._add_rule_version(rule["detectorId"], rule["ruleId"], expression, language, outcomes,
+                                               description)}
+
+    def _add_rule_version(self, detector_id, rule_id, expression, language, outcomes, description):
+        versions = self.rules[(detector_id, rule_id)]
+        rule_version = str(max([int(v) for v in versions], default=0) + 1)
+        versions[rule_version] = {"detectorId": detector_id, "ruleId": rule_id, "ruleVersion": rule_version,
+                                  "expression": expression, "language": language, "outcomes": list(outcomes),
+                                  "description": description}
+        return {"detectorId": detector_id, "ruleId": rule_id, "ruleVersion": rule_version}
+
+    def _rule_version(self, operation_name, rule):
+        versions = self.rules.get((rule["detectorId"], rule["ruleId"]), {})
+        if str(rule["ruleVersion"]) not in versions:
+            raise _client_error(operation_name, "ResourceNotFoundException",
+                                "Rule {} version {} not found".format(rule["ruleId"], rule["ruleVersion"]))
+        return versions[str(rule["ruleVersion"])]
+
+    def _get_rules(self, detectorId, ruleId=None, ruleVersion=None, nextToken=None, maxResults=None):
+        self._require_all("GetRules", self.detectors, [detectorId], "Detector")
+        rule_details = [dict(v) for (detector_id, rule_id), versions in self.rules.items()
+                        for v in versions.values()
+                        if detector_id == detectorId and ruleId in (None, rule_id)
+                        and ruleVersion in (None, v["ruleVersion"])]
+        return self._page(rule_details, "ruleDetails", nextToken, maxResults)
+
+    def _delete_rule(self, rule):
+        self._rule_version("DeleteRule", rule)
+        for v in self.detector_versions.values():
+            if v["detectorId"] == rule["detectorId"] and \
+                    {"ruleId": rule["ruleId"], "ruleVersion": str(rule["ruleVersion"])} in \
+                    [{"ruleId": r["ruleId"], "ruleVersion": str(r["ruleVersion"])} for r in v["rules"]]:
+                raise _client_error("DeleteRule", "ConflictException",
+                                    "Rule {} is used by detector version {}".format(rule["ruleId"],
+                                                                                    v["detectorVersionId"]))
+        versions = self.rules[(rule["detectorId"], rule["ruleId"])]
+        del versions[str(rule["ruleVersion"])]
+        if not versions:
+            del self.rules[(rule["detectorId"], rule["ruleId"])]
+        return {}
+
+    @staticmethod
+    def _require_all(operation_name, resources, keys, resource_name):
+        for key in keys:
+            if key not in resources:
+                raise _client_error(operation_name, "ResourceNotFoundException",
+                                    "{} {} not found".format(resource_name, key))
+
+
+def _client_error(operation_name, error_code, message):
+    return botocore.exceptions.ClientError({"Error": {"Code": error_code, "Message": message},
+                                            "ResponseMetadata": {"HTTPStatusCode": 400, "RetryAttempts": 0}},
+                                           operation_name)
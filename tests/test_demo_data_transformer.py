@@ -37,3 +37,41 @@ class TestDataTransformer(TestCase):
         # Assert
         self.assertEqual(actual_df.shape[0], expected_num_records,
                          "Incorrect of expected records in the transformed datafame")
+
+    def test_generate_random_data_same_seed(self):
+        # Arrange
+        size = 100
+
+        # Act
+        actual_df = DemoDataTransformer(seed=42).generate_random_data(size)
+        expected_df = DemoDataTransformer(seed=42).generate_random_data(size)
+
+        # Assert
+        pd.testing.assert_frame_equal(actual_df, expected_df)
+
+    def test_generate_random_data(self):
+        """
+        Test the generated columns are in the expected format and ranges
+        :return:
+        """
+        # Arrange
+        sut = DemoDataTransformer(seed=7)
+        size = 1000
+
+        # Act
+        actual_df = sut.generate_random_data(size)
+
+        # Assert
+        self.assertEqual(["EVENT_LABEL", "EVENT_TIMESTAMP", "email", "ip"], list(actual_df.columns))
+        self.assertEqual(size, actual_df.shape[0])
+        self.assertTrue(actual_df["EVENT_LABEL"].isin([0, 1]).all())
+        self.assertTrue(actual_df["EVENT_TIMESTAMP"].between(pd.Timestamp(2010, 1, 1), pd.Timestamp(2019, 12, 31)).all())
+        for email in actual_df["email"]:
+            name, domain = email[:-len(".com")].split("@")
+            self.assertEqual(10, len(set(name)), "Expected 10 distinct letters in {}".format(email))
+            self.assertEqual(5, len(set(domain)), "Expected 5 distinct letters in {}".format(email))
+            self.assertTrue(email.endswith(".com"))
+        for ip in actual_df["ip"]:
+            octets = [int(o) for o in ip.split(".")]
+            self.assertEqual(4, len(octets))
+            self.assertTrue(all(1 <= o <= 254 for o in octets), "Invalid ip {}".format(ip))
@@ -38,3 +38,20 @@ class TestFeatureVariablesSimple(TestCase):
 
         # Assert
         self.assertEqual(len(actual_variables), expected_num_variables)
+
+    def test_create_or_retrieve_features_once(self):
+        """
+        Test the variables are only created on the first call
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector_utils = MagicMock()
+        sut = FeatureVariablesDemo(fraud_detector_utils=mock_fraud_detector_utils)
+
+        # Act
+        sut.create_or_retrieve_features()
+        actual_variables = sut.create_or_retrieve_features()
+
+        # Assert
+        self.assertEqual(["email", "ip"], actual_variables)
+        self.assertEqual(2, mock_fraud_detector_utils.try_create_variable.call_count)
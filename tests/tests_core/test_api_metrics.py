@@ -0,0 +1,126 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from core.api_metrics import ApiMetrics, InstrumentedClient
+
+
+class TestApiMetrics(TestCase):
+
+    def test_report_histogram(self):
+        # Arrange
+        sut = ApiMetrics(latency_buckets=(0.1, 1.0))
+
+        # Act
+        sut.record_call("frauddetector", "get_rules", 0.05)
+        sut.record_call("frauddetector", "get_rules", 0.5, retries=2)
+        sut.record_call("frauddetector", "get_rules", 5.0, error_code="ValidationException")
+        actual = sut.report()
+
+        # Assert
+        operation = actual["operations"][0]
+        self.assertEqual(3, operation["calls"])
+        self.assertEqual(1, operation["errors"])
+        self.assertEqual(2, operation["retries"])
+        self.assertEqual(5.0, operation["latencyMaxSeconds"])
+        self.assertEqual([{"le": 0.1, "count": 1}, {"le": 1.0, "count": 2}, {"le": "+Inf", "count": 3}],
+                         operation["latencyHistogram"])
+        self.assertEqual(3, actual["totals"]["calls"])
+
+    def test_instrumented_client(self):
+        """
+        Test the calls of a client without botocore event hooks are recorded, and errors are raised as is
+        :return:
+        """
+        # Arrange
+        metrics = ApiMetrics()
+        mock_client = MagicMock(spec=["get_rules", "delete_rule"])
+        mock_client.get_rules.return_value = {"ruleDetails": [], "ResponseMetadata": {"RetryAttempts": 1}}
+        mock_client.delete_rule.side_effect = ClientError({"Error": {"Code": "ThrottlingException"}}, "DeleteRule")
+        sut = InstrumentedClient(mock_client, metrics, "frauddetector")
+
+        # Act
+        actual = sut.get_rules(detectorId="demo")
+        with self.assertRaises(ClientError):
+            sut.delete_rule(rule={})
+
+        # Assert
+        self.assertEqual({"ruleDetails": [], "ResponseMetadata": {"RetryAttempts": 1}}, actual)
+        operations = {o["operation"]: o for o in metrics.report()["operations"]}
+        self.assertEqual(1, operations["get_rules"]["calls"])
+        self.assertEqual(1, operations["get_rules"]["retries"])
+        self.assertEqual(1, operations["delete_rule"]["errors"])
+        self.assertEqual(1, operations["delete_rule"]["throttles"])
+
+    def test_instrumented_botocore_client_throttles(self):
+        """
+        Test the calls of a botocore client are recorded, including the throttled attempts it retried
+        :return:
+        """
+        # Arrange
+        metrics = ApiMetrics()
+        client = boto3.session.Session(aws_access_key_id="key", aws_secret_access_key="secret",
+                                       region_name="us-east-1").client("frauddetector")
+        sut = InstrumentedClient(client, metrics, "frauddetector")
+
+        # Act
+        with Stubber(client) as stubber:
+            stubber.add_response("get_rules", {"ruleDetails": []})
+            sut.get_rules(detectorId="demo")
+        client.meta.events.emit("needs-retry.frauddetector.GetRules",
+                                response=(AWSResponse(None, 400, {}, None),
+                                          {"Error": {"Code": "ThrottlingException"}}),
+                                operation=client.meta.service_model.operation_model("GetRules"),
+                                attempts=1, caught_exception=None, request_dict={"context": {}})
+
+        # Assert
+        operation = metrics.report()["operations"][0]
+        self.assertEqual("get_rules", operation["operation"])
+        self.assertEqual(1, operation["calls"])
+        self.assertEqual(1, operation["throttles"])
+
+    def test_write_reports(self):
+        # Arrange
+        sut = ApiMetrics()
+        sut.record_call("frauddetector", "get_rules", 0.2)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "report.json")
+            prometheus_path = os.path.join(tmp_dir, "report.prom")
+
+            # Act
+            sut.write_json_report(json_path)
+            sut.write_prometheus_textfile(prometheus_path, labels={"stage": "deploy"})
+
+            # Assert
+            with open(json_path) as f:
+                self.assertEqual(1, json.load(f)["totals"]["calls"])
+            with open(prometheus_path) as f:
+                prometheus_text = f.read()
+            self.assertIn('frauddetector_api_calls_total{operation="get_rules",service="frauddetector",stage="deploy"} 1',
+                          prometheus_text)
+            self.assertIn('frauddetector_api_latency_seconds_bucket{operation="get_rules",service="frauddetector",'
+                          'stage="deploy",le="+Inf"} 1', prometheus_text)
@@ -0,0 +1,112 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+from core.api_recorder import ApiRecorder, RecordingClient, ReplayClient
+from tests.fakes.fake_fraud_detector_client import FakeFraudDetectorClient
+from tests.tests_core.test_fraud_detector_utils import FakeTime
+
+
+class TestApiRecorder(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.recording_file = os.path.join(self.tmp_dir.name, "recording.jsonl.gz")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _record(self, client, calls):
+        fake_time = FakeTime()
+        recorder = ApiRecorder(self.recording_file, clock=fake_time.monotonic)
+        sut = RecordingClient(client, recorder)
+        for operation_name, kwargs in calls:
+            try:
+                getattr(sut, operation_name)(**kwargs)
+            except ClientError:
+                pass
+        recorder.close()
+
+    def test_replay_responses_and_errors(self):
+        """
+        Test the recorded responses and errors are replayed for the same requests
+        :return:
+        """
+        # Arrange
+        client = FakeFraudDetectorClient(region_name="eu-west-1")
+        self._record(client, [("put_outcome", {"name": "positive"}),
+                              ("get_outcomes", {"nextToken": ""}),
+                              ("get_variables", {"name": "email"})])
+        sut = ReplayClient(self.recording_file, sleep=lambda seconds: None)
+
+        # Act
+        actual = sut.get_outcomes(nextToken="")
+        with self.assertRaises(ClientError) as context:
+            sut.get_variables(name="email")
+
+        # Assert
+        self.assertEqual([{"name": "positive", "description": None}], actual["outcomes"])
+        self.assertEqual("ResourceNotFoundException", context.exception.response["Error"]["Code"])
+        self.assertEqual("eu-west-1", sut.meta.region_name)
+
+    def test_replay_identical_requests_in_order(self):
+        """
+        Test repeated identical requests, e.g. polling a status, are served in the recorded order
+        :return:
+        """
+        # Arrange
+        mock_client = MagicMock(spec=["get_model_version"])
+        mock_client.get_model_version.side_effect = [{"status": "ACTIVATE_IN_PROGRESS"}, {"status": "ACTIVE"}]
+        request = {"modelId": "model", "modelType": "ONLINE_FRAUD_INSIGHTS", "modelVersionNumber": "1.0"}
+        self._record(mock_client, [("get_model_version", request), ("get_model_version", request)])
+        sut = ReplayClient(self.recording_file, sleep=lambda seconds: None)
+
+        # Act
+        actual = [sut.get_model_version(**request)["status"] for _ in range(3)]
+
+        # Assert
+        self.assertEqual(["ACTIVATE_IN_PROGRESS", "ACTIVE", "ACTIVE"], actual)
+
+    def test_replay_scaled_latency(self):
+        # Arrange
+        fake_time = FakeTime()
+        client = FakeFraudDetectorClient(latency=2.0, clock=fake_time.monotonic, sleep=fake_time.sleep)
+        recorder = ApiRecorder(self.recording_file, clock=fake_time.monotonic)
+        RecordingClient(client, recorder).put_label(name="fraud")
+        recorder.close()
+        sleeps = []
+        sut = ReplayClient(self.recording_file, latency_scale=0.5, sleep=sleeps.append)
+
+        # Act
+        sut.put_label(name="fraud")
+
+        # Assert
+        self.assertEqual([1.0], sleeps)
+
+    def test_replay_unrecorded_request(self):
+        # Arrange
+        self._record(FakeFraudDetectorClient(), [("put_label", {"name": "fraud"})])
+        sut = ReplayClient(self.recording_file, sleep=lambda seconds: None)
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            sut.put_label(name="legit")
@@ -0,0 +1,155 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import boto3
+from core.client_factory import ClientFactory
+from core.rate_limiter import AdaptiveRateLimiter, RateLimitedClient
+
+
+class TestClientFactory(TestCase):
+
+    def setUp(self):
+        self.session = boto3.session.Session(aws_access_key_id="key", aws_secret_access_key="secret",
+                                             region_name="us-east-1")
+
+    def test_get_client_reused(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+
+        # Act
+        client_1 = sut.get_client("frauddetector")
+        client_2 = sut.get_client("frauddetector")
+        client_other_region = sut.get_client("frauddetector", region_name="eu-west-1")
+
+        # Assert
+        self.assertIs(client_1, client_2)
+        self.assertIsNot(client_1, client_other_region)
+
+    def test_get_client_config(self):
+        # Arrange
+        sut = ClientFactory(max_pool_connections=20, retry_mode="adaptive", max_attempts=5, connect_timeout=3,
+                            read_timeout=30, session=self.session)
+
+        # Act
+        actual = sut.get_client("frauddetector").meta.config
+
+        # Assert
+        self.assertEqual(20, actual.max_pool_connections)
+        self.assertEqual("adaptive", actual.retries["mode"])
+        self.assertEqual(5, actual.retries["total_max_attempts"])
+        self.assertEqual(3, actual.connect_timeout)
+        self.assertEqual(30, actual.read_timeout)
+
+    def test_configure_rebuilds_clients(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+        client_1 = sut.get_client("frauddetector")
+
+        # Act
+        sut.configure(max_pool_connections=5)
+        client_2 = sut.get_client("frauddetector")
+
+        # Assert
+        self.assertIsNot(client_1, client_2)
+        self.assertEqual(5, client_2.meta.config.max_pool_connections)
+        self.assertEqual("adaptive", client_2.meta.config.retries["mode"])
+
+    def test_lazy_client(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+
+        # Act
+        lazy_client = sut.lazy_client("frauddetector")
+        built_before_use = len(sut._clients)
+        region = lazy_client.meta.region_name
+
+        # Assert
+        self.assertEqual(0, built_before_use)
+        self.assertEqual("us-east-1", region)
+        self.assertIs(sut.get_client("frauddetector"), lazy_client.client)
+
+    def test_lazy_client_follows_configure(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+        lazy_client = sut.lazy_client("frauddetector")
+        client_before = lazy_client.client
+
+        # Act
+        sut.configure(max_pool_connections=5)
+        client_after = lazy_client.client
+
+        # Assert
+        self.assertIsNot(client_before, client_after)
+        self.assertEqual(5, lazy_client.meta.config.max_pool_connections)
+
+    def test_register_client(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+        registered_client = MagicMock()
+
+        # Act
+        sut.register_client(registered_client, "frauddetector")
+        client_registered = sut.get_client("frauddetector", region_name="eu-west-1")
+        sut.unregister_client("frauddetector")
+        client_unregistered = sut.get_client("frauddetector")
+
+        # Assert
+        self.assertIs(registered_client, client_registered)
+        self.assertIsNot(registered_client, client_unregistered)
+
+    def test_register_client_per_region(self):
+        # Arrange
+        sut = ClientFactory(session=self.session)
+        region_client = MagicMock()
+        other_regions_client = MagicMock()
+
+        # Act
+        sut.register_client(region_client, "frauddetector", region_name="eu-west-1")
+        sut.register_client(other_regions_client, "frauddetector")
+        actual_region = sut.get_client("frauddetector", region_name="eu-west-1")
+        actual_default_region = sut.get_client("frauddetector")
+
+        # Assert
+        self.assertIs(region_client, actual_region)
+        self.assertIs(other_regions_client, actual_default_region)
+
+    def test_clear_builds_new_session(self):
+        # Arrange
+        sut = ClientFactory()
+        session_1 = sut.session
+
+        # Act
+        sut.clear()
+        session_2 = sut.session
+
+        # Assert
+        self.assertIsNot(session_1, session_2)
+
+    def test_rate_limiter_only_for_fraud_detector(self):
+        # Arrange
+        sut = ClientFactory(session=self.session, rate_limiter=AdaptiveRateLimiter())
+
+        # Act
+        fraud_detector_client = sut.get_client("frauddetector")
+        s3_client = sut.get_client("s3")
+
+        # Assert
+        self.assertIsInstance(fraud_detector_client, RateLimitedClient)
+        self.assertNotIsInstance(s3_client, RateLimitedClient)
@@ -0,0 +1,195 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from unittest import TestCase
+
+import pandas as pd
+from botocore.exceptions import ClientError
+from core.fraud_detector_event import FraudDetectorEvent
+from core.fraud_detector_model_based_deploy import FraudDetectorModelBasedDeploy
+from core.fraud_detector_reconciler import FraudDetectorReconciler
+from core.fraud_detector_train import FraudDetectorTrain
+from core.fraud_detector_undeploy import FraudDetectorUndeploy
+from core.fraud_detector_utils import FraudDetectorUtils
+from core.paginator import FraudDetectorPaginator
+from features.feature_variables_dynamic import FeatureVariablesDynamic
+from rules.detector_rule_model_score_positive import DetectorRuleModelScorePositive
+from tests.fakes.fake_fraud_detector_client import FakeFraudDetectorClient
+from tests.tests_core.test_fraud_detector_utils import FakeTime
+
+
+class TestFakeFraudDetectorClient(TestCase):
+
+    def setUp(self):
+        self.fake_time = FakeTime()
+
+    def _create_detector(self, client):
+        client.put_entity_type(name="customer")
+        client.put_event_type(name="demo", eventVariables=[], entityTypes=["customer"])
+        client.put_detector(detectorId="demo", eventTypeName="demo")
+        client.put_outcome(name="positive")
+
+    def test_paginated_rules(self):
+        # Arrange
+        sut = FakeFraudDetectorClient(page_size=2)
+        self._create_detector(sut)
+        for i in range(5):
+            sut.create_rule(ruleId="rule{}".format(i), detectorId="demo", expression="$a > 1", language="DETECTORPL",
+                            outcomes=["positive"])
+
+        # Act
+        actual = [r["ruleId"] for r in FraudDetectorPaginator(sut.get_rules, "ruleDetails", detectorId="demo")]
+
+        # Assert
+        self.assertEqual(["rule0", "rule1", "rule2", "rule3", "rule4"], actual)
+        self.assertEqual(3, sut.call_counts["get_rules"])
+
+    def test_model_version_status_transitions(self):
+        """
+        Test a model version trains and activates after the configured durations
+        :return:
+        """
+        # Arrange
+        sut = FakeFraudDetectorClient(training_seconds=60, activation_seconds=10, clock=self.fake_time.monotonic,
+                                      sleep=self.fake_time.sleep)
+        self._create_detector(sut)
+        sut.create_model(modelId="model", modelType="ONLINE_FRAUD_INSIGHTS", eventTypeName="demo")
+        model_version = sut.create_model_version(modelId="model", modelType="ONLINE_FRAUD_INSIGHTS",
+                                                 trainingDataSource="EXTERNAL_EVENTS",
+                                                 trainingDataSchema={})["modelVersionNumber"]
+        model = {"modelId": "model", "modelType": "ONLINE_FRAUD_INSIGHTS", "modelVersionNumber": model_version}
+
+        # Act
+        statuses = [sut.get_model_version(**model)["status"]]
+        self.fake_time.now += 60
+        statuses.append(sut.get_model_version(**model)["status"])
+        sut.update_model_version_status(status="ACTIVE", **model)
+        statuses.append(sut.get_model_version(**model)["status"])
+        self.fake_time.now += 10
+        statuses.append(sut.get_model_version(**model)["status"])
+
+        # Assert
+        self.assertEqual("1.0", model_version)
+        self.assertEqual(["TRAINING_IN_PROGRESS", "TRAINING_COMPLETE", "ACTIVATE_IN_PROGRESS", "ACTIVE"], statuses)
+
+    def test_throttling_retried(self):
+        """
+        Test throttled attempts are retried, and the call fails once the attempts are exhausted
+        :return:
+        """
+        # Arrange
+        sut = FakeFraudDetectorClient(throttle_rate=1.0, max_attempts=3, clock=self.fake_time.monotonic,
+                                      sleep=self.fake_time.sleep)
+
+        # Act
+        with self.assertRaises(ClientError) as context:
+            sut.put_label(name="fraud")
+
+        # Assert
+        self.assertEqual("ThrottlingException", context.exception.response["Error"]["Code"])
+        self.assertEqual(1, sut.call_counts["put_label"])
+        self.assertEqual(3, sut.throttle_counts["put_label"])
+
+    def test_tps_quota(self):
+        # Arrange
+        sut = FakeFraudDetectorClient(tps_quotas={"put_label": 2}, clock=self.fake_time.monotonic,
+                                      sleep=self.fake_time.sleep)
+
+        # Act
+        responses = [sut.put_label(name="label{}".format(i)) for i in range(3)]
+
+        # Assert
+        retries = [r["ResponseMetadata"]["RetryAttempts"] for r in responses]
+        self.assertEqual([0, 0], retries[:2])
+        self.assertGreater(retries[2], 0)
+        self.assertEqual(retries[2], sut.throttle_counts["put_label"])
+        self.assertGreaterEqual(self.fake_time.now, 1)
+
+    def test_injected_error(self):
+        # Arrange
+        sut = FakeFraudDetectorClient()
+        sut.inject_error("put_outcome", "InternalServerException")
+
+        # Act
+        with self.assertRaises(ClientError):
+            sut.put_outcome(name="positive")
+        sut.put_outcome(name="positive")
+
+        # Assert
+        self.assertEqual({"positive"}, set(sut.outcomes))
+
+    def test_event_and_train_provision_once(self):
+        """
+        Test the event and the model creation share the variables and labels, rather than each provisioning them
+        :return:
+        """
+        # Arrange
+        sut = FakeFraudDetectorClient()
+        utils = FraudDetectorUtils(fraud_detector_client=sut, metadata_cache=None)
+        df = pd.DataFrame({"EVENT_LABEL": [0, 1], "email": ["a@example.com", "b@example.com"], "amount": [10.5, 20.0]})
+        model_variables = FeatureVariablesDynamic(df=df, true_labels=[1], fraud_detector_utils=utils)
+
+        # Act
+        FraudDetectorEvent(client=sut, fraud_detector_utils=utils).create_event(
+            event_type_name="demo", model_variables=model_variables, entity="customer", description="demo")
+        FraudDetectorTrain(client=sut, fraud_detector_utils=utils).run(
+            model_name="model", model_variables=model_variables, model_description="demo",
+            model_type="ONLINE_FRAUD_INSIGHTS", s3_training_file="s3://bucket/train.csv",
+            role_arn="arn:aws:iam::111111111111:role/demo", event_type_name="demo")
+
+        # Assert
+        self.assertEqual(1, sut.call_counts["batch_get_variable"])
+        self.assertEqual(1, sut.call_counts["batch_create_variable"])
+        self.assertEqual(1, sut.call_counts["get_labels"])
+        self.assertEqual(2, sut.call_counts["put_label"])
+
+    def test_train_deploy_undeploy(self):
+        """
+        Test the core classes run unchanged against the fake, from training to undeploying
+        :return:
+        """
+        # Arrange
+        sut = FakeFraudDetectorClient(page_size=2)
+        utils = FraudDetectorUtils(fraud_detector_client=sut, metadata_cache=None)
+        df = pd.DataFrame({"EVENT_LABEL": [0, 1], "EVENT_TIMESTAMP": ["2019-05-26 00:00:00", "2019-05-27 00:00:00"],
+                           "email": ["a@example.com", "b@example.com"], "amount": [10.5, 20.0]})
+        model_variables = FeatureVariablesDynamic(df=df, true_labels=[1], fraud_detector_utils=utils)
+        FraudDetectorEvent(client=sut, fraud_detector_utils=utils).create_event(
+            event_type_name="demo", model_variables=model_variables, entity="customer", description="demo")
+        model = FraudDetectorTrain(client=sut, fraud_detector_utils=utils).run(
+            model_name="model", model_variables=model_variables, model_description="demo",
+            model_type="ONLINE_FRAUD_INSIGHTS", s3_training_file="s3://bucket/train.csv",
+            role_arn="arn:aws:iam::111111111111:role/demo", event_type_name="demo", wait=True)
+        model_versions = [{"modelId": "model", "modelType": "ONLINE_FRAUD_INSIGHTS",
+                           "modelVersionNumber": model["modelVersionNumber"]}]
+        rules = [DetectorRuleModelScorePositive(rule_id="positivescorerule", model_name="model", threshold=950,
+                                                fraud_detector_utils=utils)]
+
+        # Act
+        deployed = FraudDetectorModelBasedDeploy(client=sut, fraud_detector_utils=utils).deploy(
+            "demo", "demo", "demo", rules, model_versions=model_versions)
+        redeployed = FraudDetectorReconciler(client=sut, fraud_detector_utils=utils).deploy(
+            "demo", "demo", "demo", rules, model_versions=model_versions)
+        undeployer = FraudDetectorUndeploy(client=sut, fraud_detector_utils=utils)
+        undeployer.delete_detector("demo")
+        undeployer.undeploy_model("model", model["modelVersionNumber"])
+
+        # Assert
+        self.assertEqual(deployed["detectorVersionId"], redeployed["detectorVersionId"])
+        self.assertEqual({}, sut.detectors)
+        self.assertEqual({}, sut.rules)
+        self.assertEqual("TRAINING_COMPLETE", sut.get_model_version(**model_versions[0])["status"])
@@ -0,0 +1,123 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import boto3
+from core.fraud_detector_metadata_cache import FraudDetectorMetadataCache, RESOURCE_TYPE_VARIABLE, \
+    RESOURCE_TYPE_MODEL, METADATA_CACHE_DIR_ENV
+
+
+class TestFraudDetectorMetadataCache(TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+
+    def _clock(self):
+        return self.now
+
+    def test_get_put(self):
+        # Arrange
+        sut = FraudDetectorMetadataCache(account_id="111", region="us-east-1", clock=self._clock)
+        expected = {"name": "email", "dataType": "STRING"}
+
+        # Act
+        sut.put(RESOURCE_TYPE_VARIABLE, "email", expected)
+        actual = sut.get(RESOURCE_TYPE_VARIABLE, "email")
+
+        # Assert
+        self.assertEqual(expected, actual)
+        self.assertIsNone(sut.get(RESOURCE_TYPE_VARIABLE, "ip"))
+
+    def test_get_expired(self):
+        # Arrange
+        sut = FraudDetectorMetadataCache(ttls={RESOURCE_TYPE_MODEL: 60}, clock=self._clock)
+        sut.put(RESOURCE_TYPE_MODEL, "demo", {"modelId": "demo"})
+
+        # Act
+        self.now += 61
+        actual = sut.get(RESOURCE_TYPE_MODEL, "demo")
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_invalidate(self):
+        # Arrange
+        sut = FraudDetectorMetadataCache(clock=self._clock)
+        sut.put(RESOURCE_TYPE_VARIABLE, "email", {"name": "email"})
+        sut.put(RESOURCE_TYPE_VARIABLE, "ip", {"name": "ip"})
+
+        # Act
+        sut.invalidate(RESOURCE_TYPE_VARIABLE, "email")
+
+        # Assert
+        self.assertIsNone(sut.get(RESOURCE_TYPE_VARIABLE, "email"))
+        self.assertEqual({"name": "ip"}, sut.get(RESOURCE_TYPE_VARIABLE, "ip"))
+
+    def test_persisted_per_account_region(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "cache.sqlite")
+            writer = FraudDetectorMetadataCache(db_path, account_id="111", region="us-east-1", clock=self._clock)
+            writer.put(RESOURCE_TYPE_VARIABLE, "email", {"name": "email"})
+            writer.close()
+
+            # Act
+            same_account = FraudDetectorMetadataCache(db_path, account_id="111", region="us-east-1",
+                                                      clock=self._clock)
+            other_region = FraudDetectorMetadataCache(db_path, account_id="111", region="eu-west-1",
+                                                      clock=self._clock)
+
+            # Assert
+            self.assertEqual({"name": "email"}, same_account.get(RESOURCE_TYPE_VARIABLE, "email"))
+            self.assertIsNone(other_region.get(RESOURCE_TYPE_VARIABLE, "email"))
+            same_account.close()
+            other_region.close()
+
+    @patch("core.fraud_detector_metadata_cache.boto3")
+    def test_from_environment_per_credentials(self, mock_boto3):
+        """
+        Clients in the same region with different credentials get the cache of their own account, looked up with
+        their own credentials
+        :return:
+        """
+        # Arrange
+        accounts = {"key1": "111", "key2": "222"}
+
+        def session(aws_access_key_id, **kwargs):
+            mock_session = MagicMock()
+            mock_session.client.return_value.get_caller_identity.return_value = {"Account": accounts[aws_access_key_id]}
+            return mock_session
+
+        mock_boto3.session.Session.side_effect = session
+        clients = [boto3.session.Session(aws_access_key_id=k, aws_secret_access_key="secret",
+                                         region_name="us-east-1").client("frauddetector") for k in ["key1", "key2"]]
+
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(os.environ, {METADATA_CACHE_DIR_ENV: tmp_dir}):
+            # Act
+            actual = [FraudDetectorMetadataCache.from_environment(c) for c in clients + clients]
+
+            # Assert
+            self.assertEqual(["111/us-east-1", "222/us-east-1"], [c.namespace for c in actual[:2]])
+            self.assertIs(actual[0], actual[2])
+            self.assertIs(actual[1], actual[3])
+            self.assertEqual(2, mock_boto3.session.Session.call_count)
+            for c in actual[:2]:
+                c.close()
@@ -16,7 +16,7 @@
 # ***************************************************************************************
 
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
 from core.fraud_detector_model_based_deploy import FraudDetectorModelBasedDeploy, MODEL_TYPE_ONLINE_FRAUD_INSIGHTS
 
@@ -69,6 +69,7 @@ class TestFraudDetectorModelBasedDeploy(TestCase):
 
         # Mock utils
         mock_utils = MagicMock()
+        mock_utils.get_active_detector_version.return_value = None
 
         # Mock rule
         mock_detector_rule = MagicMock()
@@ -89,3 +90,143 @@ class TestFraudDetectorModelBasedDeploy(TestCase):
 
         # Assert
         self.assertEqual(expected, actual)
+
+    def test_deploy_reuse_active_detector_version(self):
+        """
+        Test case to check that an active detector version with the same models and rules is reused
+        :return:
+        """
+        # Arrange
+        detector_name = "demo_detector"
+        model_versions = [{"modelId": "demo_model",
+                           "modelDescription": "This is a sample model",
+                           "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+                           "modelVersionNumber": 1.0}]
+        rule_info = {"ruleId": "demo_rule", "detectorId": detector_name, "ruleVersion": "3"}
+
+        mock_client = MagicMock()
+        mock_client.get_model_version.return_value = {"status": "ACTIVE"}
+
+        mock_utils = MagicMock()
+        mock_utils.create_or_update_rule.return_value = rule_info
+        mock_utils.get_active_detector_version.return_value = {
+            "detectorId": detector_name,
+            "detectorVersionId": "4",
+            "modelVersions": [{"modelId": "demo_model", "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+                               "modelVersionNumber": "1.0"}],
+            "rules": [rule_info],
+            "ruleExecutionMode": "FIRST_MATCHED",
+            "status": "ACTIVE"
+        }
+
+        mock_detector_rule = MagicMock()
+        mock_detector_rule.validate.return_value = None
+
+        sut = FraudDetectorModelBasedDeploy(client=mock_client, fraud_detector_utils=mock_utils)
+
+        # Act
+        actual = sut.deploy(detector_name=detector_name, detector_description="This is demo", event_type_name=None,
+                            detector_rules=[mock_detector_rule], model_versions=model_versions)
+
+        # Assert
+        self.assertEqual({"detectorVersionId": "4", "detectorId": detector_name}, actual)
+        mock_client.update_model_version_status.assert_not_called()
+        mock_client.create_detector_version.assert_not_called()
+        mock_client.update_detector_version_status.assert_not_called()
+
+    def test_deploy_concurrent_activation(self):
+        """
+        Test case to check that all models are activated up front and waited on together
+        :return:
+        """
+        # Arrange
+        detector_name = "demo_detector"
+        model_versions = [{"modelId": "model_{}".format(i),
+                           "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+                           "modelVersionNumber": "1.0"} for i in range(3)]
+
+        mock_client = MagicMock()
+        mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+        mock_client.create_detector_version.return_value = {"detectorVersionId": "1"}
+
+        mock_utils = MagicMock()
+        mock_utils.get_active_detector_version.return_value = None
+
+        mock_detector_rule = MagicMock()
+        mock_detector_rule.validate.return_value = None
+
+        sut = FraudDetectorModelBasedDeploy(client=mock_client, fraud_detector_utils=mock_utils,
+                                            concurrent_activation=True)
+
+        # Act
+        sut.deploy(detector_name=detector_name, detector_description="This is demo", event_type_name=None,
+                   detector_rules=[mock_detector_rule], model_versions=model_versions)
+
+        # Assert
+        mock_client.update_model_version_status.assert_has_calls(
+            [call(modelId=m["modelId"], modelType=m["modelType"], modelVersionNumber="1.0", status="ACTIVE")
+             for m in model_versions])
+        mock_utils.wait_until_model_statuses.assert_called_once()
+        targets = mock_utils.wait_until_model_statuses.call_args[0][0]
+        self.assertEqual(["model_0", "model_1", "model_2"], [t.model_name for t in targets])
+        mock_utils.create_or_update_rule.assert_called_once()
+        mock_client.create_detector_version.assert_called_once()
+
+    def test_deploy_rule_failure_before_activation(self):
+        """
+        Test case to check that no model is activated when a rule can not be created
+        :return:
+        """
+        # Arrange
+        model_versions = [{"modelId": "model_0", "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+                           "modelVersionNumber": "1.0"}]
+
+        mock_client = MagicMock()
+        mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+
+        mock_utils = MagicMock()
+        mock_utils.create_or_update_rule.side_effect = ValueError("Rule failed")
+
+        mock_detector_rule = MagicMock()
+        mock_detector_rule.validate.return_value = None
+
+        sut = FraudDetectorModelBasedDeploy(client=mock_client, fraud_detector_utils=mock_utils,
+                                            concurrent_activation=True)
+
+        # Act
+        with self.assertRaises(ValueError):
+            sut.deploy(detector_name="demo_detector", detector_description="This is demo", event_type_name=None,
+                       detector_rules=[mock_detector_rule], model_versions=model_versions)
+
+        # Assert
+        mock_client.update_model_version_status.assert_not_called()
+        mock_utils.wait_until_model_statuses.assert_not_called()
+
+    def test_deploy_sequential_activation(self):
+        """
+        Test case to check that models are activated one after the other when concurrency is disabled
+        :return:
+        """
+        # Arrange
+        model_versions = [{"modelId": "model_{}".format(i),
+                           "modelType": MODEL_TYPE_ONLINE_FRAUD_INSIGHTS,
+                           "modelVersionNumber": "1.0"} for i in range(2)]
+
+        mock_client = MagicMock()
+        mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+
+        mock_utils = MagicMock()
+        mock_utils.get_active_detector_version.return_value = None
+
+        mock_detector_rule = MagicMock()
+        mock_detector_rule.validate.return_value = None
+
+        sut = FraudDetectorModelBasedDeploy(client=mock_client, fraud_detector_utils=mock_utils,
+                                            concurrent_activation=False)
+
+        # Act
+        sut.deploy(detector_name="demo_detector", detector_description="This is demo", event_type_name=None,
+                   detector_rules=[mock_detector_rule], model_versions=model_versions)
+
+        # Assert
+        self.assertEqual(2, mock_utils.wait_until_model_statuses.call_count)
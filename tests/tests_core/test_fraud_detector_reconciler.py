@@ -0,0 +1,214 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import functools
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import botocore
+from core.fraud_detector_reconciler import FraudDetectorReconciler, DetectorSpec
+from rules.detector_rule_base import DetectorRuleBase
+
+
+class TestFraudDetectorReconciler(TestCase):
+
+    def setUp(self):
+        self.detector_name = "demo_detector"
+        self.model_versions = [{"modelId": "demo_model",
+                                "modelDescription": "This is a sample model",
+                                "modelType": "ONLINE_FRAUD_INSIGHTS",
+                                "modelVersionNumber": 1.0}]
+
+        self.mock_rule = MagicMock()
+        self.mock_rule.validate.return_value = None
+        self.mock_rule.rule_id = "positivescorerule"
+        self.mock_rule.outcomes = ["positive"]
+        self.mock_rule.description = "Positive score"
+        self.mock_rule.get_rule_expression.return_value = "$demo_model_insightscore >= 950"
+        self.mock_rule.get_content_hash.side_effect = functools.partial(DetectorRuleBase.get_content_hash,
+                                                                        self.mock_rule)
+
+        # Deployed state that matches the spec
+        self.mock_client = MagicMock()
+        self.mock_client.get_detectors.return_value = {
+            "detectors": [{"detectorId": self.detector_name, "eventTypeName": "demoevent",
+                           "description": "This is demo"}]}
+        self.mock_client.get_outcomes.return_value = {
+            "outcomes": [{"name": "positive", "description": "Outcome for rule Positive score"}]}
+        self.mock_client.get_model_version.return_value = {"status": "ACTIVE"}
+        self.mock_client.create_detector_version.return_value = {"detectorVersionId": "5"}
+
+        self.mock_utils = MagicMock()
+        self.mock_utils.get_rule_index.return_value = {
+            "positivescorerule": {"ruleId": "positivescorerule", "ruleVersion": "3",
+                                  "expression": "$demo_model_insightscore >= 950", "outcomes": ["positive"],
+                                  "description": "Positive score"}}
+        self.mock_utils.get_active_detector_version.return_value = {
+            "detectorVersionId": "4",
+            "modelVersions": [{"modelId": "demo_model", "modelType": "ONLINE_FRAUD_INSIGHTS",
+                               "modelVersionNumber": "1.0"}],
+            "rules": [{"ruleId": "positivescorerule", "detectorId": self.detector_name, "ruleVersion": "3"}],
+            "ruleExecutionMode": "FIRST_MATCHED"}
+
+        self.spec = DetectorSpec(self.detector_name, "This is demo", "demoevent", [self.mock_rule],
+                                 self.model_versions, "FIRST_MATCHED")
+
+    def test_plan_up_to_date(self):
+        # Arrange
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+
+        # Act
+        plan = sut.plan(self.spec)
+        actual = sut.apply(plan)
+
+        # Assert
+        self.assertFalse(plan.has_changes)
+        self.assertEqual({"detectorVersionId": "4", "detectorId": self.detector_name}, actual)
+        self.mock_client.put_detector.assert_not_called()
+        self.mock_client.update_model_version_status.assert_not_called()
+        self.mock_client.create_detector_version.assert_not_called()
+        self.mock_utils.create_or_update_rule.assert_not_called()
+
+    def test_plan_apply_changed_rule(self):
+        # Arrange
+        self.mock_rule.get_rule_expression.return_value = "$demo_model_insightscore >= 900"
+        self.mock_utils.create_or_update_rule.return_value = {"ruleId": "positivescorerule",
+                                                              "detectorId": self.detector_name, "ruleVersion": "4"}
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+
+        # Act
+        plan = sut.plan(self.spec)
+        actual = sut.apply(plan)
+
+        # Assert
+        self.assertEqual(["rule:positivescorerule", "detector_version"], [a.action_id for a in plan.actions])
+        self.assertEqual({"detectorVersionId": "5", "detectorId": self.detector_name}, actual)
+        self.assertEqual([{"ruleId": "positivescorerule", "detectorId": self.detector_name, "ruleVersion": "4"}],
+                         self.mock_client.create_detector_version.call_args[1]["rules"])
+        self.mock_client.update_detector_version_status.assert_called_with(detectorId=self.detector_name,
+                                                                           detectorVersionId="5", status="ACTIVE")
+        self.mock_client.update_model_version_status.assert_not_called()
+
+    def test_deploy_new_detector_dry_run(self):
+        # Arrange
+        self.mock_client.get_detectors.side_effect = botocore.errorfactory.ClientError(
+            error_response={"Error": {"Code": "ResourceNotFoundException"}}, operation_name="GetDetectors")
+        self.mock_client.get_outcomes.return_value = {"outcomes": []}
+        self.mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+        self.mock_utils.get_rule_index.return_value = {}
+        self.mock_utils.get_active_detector_version.return_value = None
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+
+        # Act
+        plan = sut.plan(self.spec)
+        actual = sut.deploy(self.detector_name, "This is demo", "demoevent", [self.mock_rule],
+                            model_versions=self.model_versions, dry_run=True)
+
+        # Assert
+        self.assertEqual(["detector", "outcome:positive", "rule:positivescorerule", "models",
+                          "detector_version"], [a.action_id for a in plan.actions])
+        self.assertEqual({"detectorVersionId": None, "detectorId": self.detector_name}, actual)
+        self.mock_client.put_detector.assert_not_called()
+        self.mock_utils.create_or_update_outcome.assert_not_called()
+        self.mock_utils.create_or_update_rule.assert_not_called()
+        self.mock_client.update_model_version_status.assert_not_called()
+        self.mock_client.create_detector_version.assert_not_called()
+
+    def test_apply_new_detector_order(self):
+        # Arrange
+        calls = []
+        self.mock_client.get_detectors.return_value = {"detectors": []}
+        self.mock_client.get_outcomes.return_value = {"outcomes": []}
+        self.mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+        self.mock_client.put_detector.side_effect = lambda **kwargs: calls.append("detector")
+        self.mock_client.create_detector_version.side_effect = lambda **kwargs: calls.append(
+            "detector_version") or {"detectorVersionId": "1"}
+        self.mock_utils.get_rule_index.return_value = {}
+        self.mock_utils.get_active_detector_version.return_value = None
+        self.mock_utils.create_or_update_outcome.side_effect = lambda *args: calls.append("outcome")
+        self.mock_utils.create_or_update_rule.side_effect = lambda *args: calls.append("rule") or {
+            "ruleVersion": "1"}
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+
+        # Act
+        actual = sut.deploy(self.detector_name, "This is demo", "demoevent", [self.mock_rule],
+                            model_versions=self.model_versions)
+
+        # Assert
+        self.assertEqual({"detectorVersionId": "1", "detectorId": self.detector_name}, actual)
+        self.assertLess(calls.index("detector"), calls.index("rule"))
+        self.assertLess(calls.index("outcome"), calls.index("rule"))
+        self.assertEqual("detector_version", calls[-1])
+        self.mock_utils.wait_until_model_statuses.assert_called_once()
+
+    def test_apply_activates_models_together(self):
+        # Arrange
+        model_versions = [{"modelId": "model_{}".format(i), "modelType": "ONLINE_FRAUD_INSIGHTS",
+                           "modelVersionNumber": "1.0"} for i in range(3)]
+        self.mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+        spec = self.spec._replace(model_versions=model_versions)
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+
+        # Act
+        plan = sut.plan(spec)
+        sut.apply(plan)
+
+        # Assert
+        self.assertEqual(["models", "detector_version"], [a.action_id for a in plan.actions])
+        self.assertEqual(3, self.mock_client.update_model_version_status.call_count)
+        self.mock_utils.wait_until_model_statuses.assert_called_once()
+        targets = self.mock_utils.wait_until_model_statuses.call_args[0][0]
+        self.assertEqual(["model_0", "model_1", "model_2"], [t.model_name for t in targets])
+
+    def test_apply_fails_fast(self):
+        """
+        Test the first failed change is raised straight away, and stops the wait on the model activations in flight
+        :return:
+        """
+        # Arrange
+        waiting = threading.Event()
+        stopped = threading.Event()
+
+        def wait_until_model_statuses(targets, operation=None, stop_event=None):
+            waiting.set()
+            if stop_event.wait(10):
+                stopped.set()
+            return []
+
+        def create_or_update_rule(*args):
+            # Fail while the activations are being waited on
+            waiting.wait(10)
+            raise ValueError("Rule failed")
+
+        self.mock_rule.get_rule_expression.return_value = "$demo_model_insightscore >= 900"
+        self.mock_client.get_model_version.return_value = {"status": "TRAINING_COMPLETE"}
+        self.mock_utils.create_or_update_rule.side_effect = create_or_update_rule
+        self.mock_utils.wait_until_model_statuses.side_effect = wait_until_model_statuses
+        sut = FraudDetectorReconciler(client=self.mock_client, fraud_detector_utils=self.mock_utils)
+        stime = time.monotonic()
+
+        # Act
+        with self.assertRaises(ValueError):
+            sut.deploy(self.detector_name, "This is demo", "demoevent", [self.mock_rule],
+                       model_versions=self.model_versions)
+
+        # Assert
+        self.assertLess(time.monotonic() - stime, 5)
+        self.mock_client.create_detector_version.assert_not_called()
+        self.assertTrue(stopped.wait(5))
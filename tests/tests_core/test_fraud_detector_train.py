@@ -85,4 +85,5 @@ class TestFraudDetectorTrain(TestCase):
 
         # Assert
         mock_utils.wait_until_model_status.assert_called_with(self.model_name, self.model_version, self.model_type,
-                                                              fail_states='ERROR', success_states='TRAINING_COMPLETE')
+                                                              fail_states='ERROR', success_states='TRAINING_COMPLETE',
+                                                              operation='training')
@@ -0,0 +1,100 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from unittest import TestCase
+from unittest.mock import MagicMock, call
+
+from core.fraud_detector_undeploy import FraudDetectorUndeploy
+
+
+class TestFraudDetectorUndeploy(TestCase):
+
+    def test_delete_all_detector_versions_across_pages(self):
+        """
+        Test every version on every page is deactivated when active and deleted
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.describe_detector.side_effect = [
+            {"detectorVersionSummaries": [{"detectorVersionId": "1", "status": "INACTIVE"},
+                                          {"detectorVersionId": "2", "status": "ACTIVE"}],
+             "nextToken": "page2"},
+            {"detectorVersionSummaries": [{"detectorVersionId": "3", "status": "DRAFT"}]}
+        ]
+        mock_fraud_detector.delete_detector_version.return_value = {}
+
+        sut = FraudDetectorUndeploy(client=mock_fraud_detector, fraud_detector_utils=MagicMock())
+
+        # Act
+        sut.delete_all_detector_versions("demo")
+
+        # Assert
+        mock_fraud_detector.describe_detector.assert_has_calls([call(detectorId="demo", nextToken=""),
+                                                                call(detectorId="demo", nextToken="page2")])
+        mock_fraud_detector.update_detector_version_status.assert_called_once_with(detectorId="demo",
+                                                                                   detectorVersionId="2",
+                                                                                   status="INACTIVE")
+        self.assertCountEqual(["1", "2", "3"],
+                              [c[1]["detectorVersionId"] for c in
+                               mock_fraud_detector.delete_detector_version.call_args_list])
+
+    def test_delete_all_rules_across_pages(self):
+        """
+        Test every rule version on every page is deleted and the rule index invalidated
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_utils = MagicMock()
+        mock_fraud_detector.get_rules.side_effect = [
+            {"ruleDetails": [{"ruleId": "rule1", "ruleVersion": "1"}], "nextToken": "page2"},
+            {"ruleDetails": [{"ruleId": "rule2", "ruleVersion": 2}]}
+        ]
+        mock_fraud_detector.delete_rule.return_value = {}
+
+        sut = FraudDetectorUndeploy(client=mock_fraud_detector, fraud_detector_utils=mock_utils)
+
+        # Act
+        sut.delete_all_rules("demo")
+
+        # Assert
+        self.assertCountEqual([{"detectorId": "demo", "ruleId": "rule1", "ruleVersion": "1"},
+                               {"detectorId": "demo", "ruleId": "rule2", "ruleVersion": "2"}],
+                              [c[1]["rule"] for c in mock_fraud_detector.delete_rule.call_args_list])
+        mock_utils.invalidate_rule_index.assert_called_once_with("demo")
+
+    def test_delete_detector_order(self):
+        """
+        Test the versions are deleted before the rules, and the rules before the detector
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.describe_detector.return_value = {
+            "detectorVersionSummaries": [{"detectorVersionId": "1", "status": "ACTIVE"}]}
+        mock_fraud_detector.get_rules.return_value = {"ruleDetails": [{"ruleId": "rule1", "ruleVersion": "1"}]}
+
+        sut = FraudDetectorUndeploy(client=mock_fraud_detector, fraud_detector_utils=MagicMock())
+
+        # Act
+        sut.delete_detector("demo")
+
+        # Assert
+        called_operations = [c[0] for c in mock_fraud_detector.method_calls]
+        self.assertEqual(["describe_detector", "update_detector_version_status", "delete_detector_version",
+                          "get_rules", "delete_rule", "delete_detector"], called_operations)
@@ -15,11 +15,33 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
 # ***************************************************************************************
 
+import functools
+import threading
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import botocore
-from core.fraud_detector_utils import FraudDetectorUtils
+from core.fraud_detector_metadata_cache import FraudDetectorMetadataCache
+from core.fraud_detector_utils import FraudDetectorUtils, ModelStatusTarget
+from core.polling_strategy import FixedIntervalPolling, ExponentialBackoffPolling
+from rules.detector_rule_base import DetectorRuleBase, rule_content_hash
+
+
+class FakeTime:
+    """
+    Replaces the time module, so sleeping advances the clock instantly
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
 
 
 class TestFraudDetectorUtils(TestCase):
@@ -82,3 +104,461 @@ class TestFraudDetectorUtils(TestCase):
         # Assert
         mock_fraud_detector.create_variable.assert_called()
         self.assertEqual(expected_num_variable, actual_variable_name)
+
+    def test_try_create_variables_creates_missing_in_chunks(self):
+        """
+        Only the variables that do not exist are created, using a few batch calls
+        :return:
+        """
+        # Arrange
+        names = ["var_{}".format(i) for i in range(150)]
+        entries = [{"name": n, "variableType": "NUMERIC", "dataType": "FLOAT", "defaultValue": 0.0,
+                    "description": n} for n in names]
+        existing = [{"name": n, "variableType": "NUMERIC", "dataType": "FLOAT", "defaultValue": "0.0",
+                     "dataSource": "EVENT"} for n in names[:10]]
+
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.batch_get_variable.side_effect = [{"variables": existing, "errors": []},
+                                                              {"variables": [], "errors": []}]
+        mock_fraud_detector.batch_create_variable.return_value = {"errors": []}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        actual = sut.try_create_variables(entries)
+
+        # Assert
+        self.assertEqual(names, actual)
+        self.assertEqual(2, mock_fraud_detector.batch_get_variable.call_count)
+        self.assertEqual(6, mock_fraud_detector.batch_create_variable.call_count)
+        created = [e["name"] for c in mock_fraud_detector.batch_create_variable.call_args_list
+                   for e in c[1]["variableEntries"]]
+        self.assertEqual(names[10:], created)
+        mock_fraud_detector.get_variables.assert_not_called()
+        mock_fraud_detector.create_variable.assert_not_called()
+
+    def test_try_create_variables_lookup_error(self):
+        """
+        A lookup error other than not found raises an error, rather than creating the variable
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.batch_get_variable.return_value = {
+            "variables": [],
+            "errors": [{"name": "dummy", "code": 403, "message": "Access denied"}]}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act + Assert
+        with self.assertRaises(ValueError):
+            sut.try_create_variables([{"name": "dummy", "variableType": "EMAIL_ADDRESS", "dataType": "STRING",
+                                       "defaultValue": "", "description": "mock"}])
+        mock_fraud_detector.batch_create_variable.assert_not_called()
+
+    def test_try_create_variables_mismatch(self):
+        """
+        An existing variable with different details raises an error
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.batch_get_variable.return_value = {
+            "variables": [{"name": "dummy", "variableType": "IP_ADDRESS", "dataType": "STRING", "defaultValue": "",
+                           "dataSource": "EVENT"}],
+            "errors": []}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act + Assert
+        with self.assertRaises(ValueError):
+            sut.try_create_variables([{"name": "dummy", "variableType": "EMAIL_ADDRESS", "dataType": "STRING",
+                                       "defaultValue": "", "description": "mock"}])
+        mock_fraud_detector.batch_create_variable.assert_not_called()
+
+    def test_try_create_variable_cached(self):
+        """
+        A variable created in a previous run is not looked up again
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_variables.side_effect = botocore.errorfactory.ClientError(
+            error_response={"Error": {"Code": "ResourceNotFoundException"}}, operation_name="GetVariables")
+        cache = FraudDetectorMetadataCache()
+        FraudDetectorUtils(fraud_detector_client=mock_fraud_detector, metadata_cache=cache) \
+            .try_create_variable("dummy", "NUMERIC", "FLOAT", 0.0, "mock")
+        mock_fraud_detector.reset_mock()
+
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector, metadata_cache=cache)
+
+        # Act
+        sut.try_create_variable("dummy", "NUMERIC", "FLOAT", 0.0, "mock")
+        sut.try_create_variables([{"name": "dummy", "variableType": "NUMERIC", "dataType": "FLOAT",
+                                   "defaultValue": 0.0, "description": "mock"}])
+
+        # Assert
+        mock_fraud_detector.get_variables.assert_not_called()
+        mock_fraud_detector.batch_get_variable.assert_not_called()
+        mock_fraud_detector.create_variable.assert_not_called()
+        mock_fraud_detector.batch_create_variable.assert_not_called()
+
+    def test_create_or_update_label_cached(self):
+        """
+        An unchanged label is only put once
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector,
+                                 metadata_cache=FraudDetectorMetadataCache())
+
+        # Act
+        sut.create_or_update_label("1", "Fraud flag")
+        sut.create_or_update_label("1", "Fraud flag")
+        sut.create_or_update_label("1", "Changed")
+
+        # Assert
+        self.assertEqual(2, mock_fraud_detector.put_label.call_count)
+
+    def test_try_create_labels_skips_existing(self):
+        """
+        Only the labels missing from the label listing are put, and a second run makes no calls at all
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_labels.side_effect = [{"labels": [{"name": "0", "description": "Legit flag"}],
+                                                       "nextToken": "1"},
+                                                      {"labels": [{"name": "other", "description": "Other"}]}]
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector,
+                                 metadata_cache=FraudDetectorMetadataCache())
+
+        # Act
+        actual = sut.try_create_labels({"1": "Fraud flag", "0": "Legit flag"})
+        sut.try_create_labels({"1": "Fraud flag", "0": "Legit flag"})
+
+        # Assert
+        self.assertEqual(["1", "0"], actual)
+        mock_fraud_detector.put_label.assert_called_once_with(name="1", description="Fraud flag")
+        self.assertEqual(2, mock_fraud_detector.get_labels.call_count)
+
+    def test_wait_until_model_status_immediate_first_check(self):
+        """
+        A model that is already active does not wait at all
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.return_value = {"status": "ACTIVE"}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        with patch("core.fraud_detector_utils.time", fake_time):
+            sut.wait_until_model_status("demo", "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE",
+                                        operation="activation")
+
+        # Assert
+        self.assertEqual([], fake_time.sleeps)
+        self.assertEqual(1, mock_fraud_detector.get_model_version.call_count)
+
+    def test_wait_until_model_status_records_transitions(self):
+        """
+        Backs off between checks and records how long each status lasted
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.side_effect = [{"status": "ACTIVATE_REQUESTED"},
+                                                             {"status": "ACTIVATE_IN_PROGRESS"},
+                                                             {"status": "ACTIVE"}]
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        with patch("core.fraud_detector_utils.time", fake_time):
+            sut.wait_until_model_status("demo", "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE",
+                                        operation="activation",
+                                        polling_strategy=ExponentialBackoffPolling(initial_interval=5, jitter=0))
+
+        # Assert
+        self.assertEqual([5, 10], fake_time.sleeps)
+        self.assertEqual([(None, "ACTIVATE_REQUESTED", 0), ("ACTIVATE_REQUESTED", "ACTIVATE_IN_PROGRESS", 5),
+                          ("ACTIVATE_IN_PROGRESS", "ACTIVE", 10)],
+                         [(t["fromStatus"], t["toStatus"], t["durationSeconds"]) for t in sut.status_transitions])
+
+    def test_wait_until_model_statuses_stop_event(self):
+        """
+        Stops waiting, without raising, once the stop event is set
+        :return:
+        """
+        # Arrange
+        stop_event = threading.Event()
+        mock_fraud_detector = MagicMock()
+
+        def get_model_version(**kwargs):
+            stop_event.set()
+            return {"status": "ACTIVATE_IN_PROGRESS"}
+
+        mock_fraud_detector.get_model_version.side_effect = get_model_version
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+        targets = [ModelStatusTarget("demo", "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE")]
+
+        # Act
+        actual = list(sut.wait_until_model_statuses(targets, polling_strategy=FixedIntervalPolling(interval=60),
+                                                    stop_event=stop_event))
+
+        # Assert
+        self.assertEqual([], actual)
+        self.assertEqual(1, mock_fraud_detector.get_model_version.call_count)
+
+    def test_wait_until_model_status_deadline(self):
+        """
+        Gives up once the deadline has passed
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.return_value = {"status": "TRAINING_IN_PROGRESS"}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act + Assert
+        with patch("core.fraud_detector_utils.time", fake_time), self.assertRaises(TimeoutError):
+            sut.wait_until_model_status("demo", "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "TRAINING_COMPLETE",
+                                        polling_strategy=FixedIntervalPolling(interval=60, deadline=120))
+        self.assertEqual(3, mock_fraud_detector.get_model_version.call_count)
+
+    def test_wait_until_model_status_error(self):
+        """
+        Fails as soon as the fail state is reached
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.return_value = {"status": "ERROR"}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act + Assert
+        with patch("core.fraud_detector_utils.time", FakeTime()), self.assertRaises(Exception):
+            sut.wait_until_model_status("demo", "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE")
+
+    def test_wait_until_model_statuses_as_slow_as_slowest(self):
+        """
+        Several models are waited on together and returned as each one finishes
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        activation_seconds = {"fast": 10, "medium": 60, "slow": 120}
+
+        def get_model_version(modelId, modelType, modelVersionNumber):
+            status = "ACTIVE" if fake_time.now >= activation_seconds[modelId] else "ACTIVATE_IN_PROGRESS"
+            return {"modelId": modelId, "status": status}
+
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.side_effect = get_model_version
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+        targets = [ModelStatusTarget(name, "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE")
+                   for name in ["slow", "medium", "fast"]]
+
+        # Act
+        with patch("core.fraud_detector_utils.time", fake_time):
+            actual = [t.model_name for t, _ in
+                      sut.wait_until_model_statuses(targets,
+                                                    polling_strategy=FixedIntervalPolling(interval=10),
+                                                    max_calls_per_second=10)]
+
+        # Assert
+        self.assertEqual(["fast", "medium", "slow"], actual)
+        self.assertLess(fake_time.now, 125)
+
+    def test_wait_until_model_statuses_fail_fast(self):
+        """
+        The first model in error fails the wait without waiting for the others
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_model_version.side_effect = \
+            lambda modelId, **kwargs: {"status": "ERROR" if modelId == "broken" else "ACTIVATE_IN_PROGRESS"}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+        targets = [ModelStatusTarget(name, "1.0", "ONLINE_FRAUD_INSIGHTS", "ERROR", "ACTIVE")
+                   for name in ["pending", "broken"]]
+
+        # Act + Assert
+        with patch("core.fraud_detector_utils.time", FakeTime()), self.assertRaises(Exception):
+            list(sut.wait_until_model_statuses(targets))
+        self.assertEqual(2, mock_fraud_detector.get_model_version.call_count)
+
+    def test_create_or_update_rule_single_scan(self):
+        """
+        All the rules of a detector are indexed with a single paginated scan, and the highest version is updated
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_rules.side_effect = [
+            {"ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "1"}, {"ruleId": "rule_a", "ruleVersion": "10"}],
+             "nextToken": "page2"},
+            {"ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "9"}, {"ruleId": "rule_b", "ruleVersion": "2"}]}]
+        mock_fraud_detector.update_rule_version.side_effect = lambda rule, **kwargs: {
+            "rule": dict(rule, ruleVersion=str(int(rule["ruleVersion"]) + 1))}
+        mock_fraud_detector.create_rule.return_value = {"rule": {"ruleVersion": "1"}}
+        rules = []
+        for rule_id in ["rule_a", "rule_b", "rule_c"]:
+            mock_rule = MagicMock()
+            mock_rule.rule_id = rule_id
+            mock_rule.get_rule_expression.return_value = "$score >= 950"
+            mock_rule.outcomes = ["positive"]
+            mock_rule.description = "Positive score"
+            mock_rule.get_content_hash.side_effect = functools.partial(DetectorRuleBase.get_content_hash, mock_rule)
+            rules.append(mock_rule)
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        actual = [sut.create_or_update_rule("demo_detector", r)["ruleVersion"] for r in rules]
+
+        # Assert
+        self.assertEqual(["11", "3", "1"], actual)
+        self.assertEqual(2, mock_fraud_detector.get_rules.call_count)
+        self.assertEqual("10", mock_fraud_detector.update_rule_version.call_args_list[0][1]["rule"]["ruleVersion"])
+        self.assertEqual("11", sut.get_rule_index("demo_detector")["rule_a"]["ruleVersion"])
+
+    def test_invalidate_cache_on_error_stale_rule(self):
+        """
+        A cached rule version that no longer exists is dropped from the cache when a call using it fails, so the
+        next attempt scans the rules again
+        :return:
+        """
+        # Arrange
+        cache = FraudDetectorMetadataCache()
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_rules.return_value = {"ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "2"}]}
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector, metadata_cache=cache)
+        sut.get_rule_index("demo_detector")
+        error = botocore.errorfactory.ClientError(error_response={"Error": {"Code": "ValidationException"}},
+                                                  operation_name="CreateDetectorVersion")
+
+        # Act
+        with self.assertRaises(botocore.errorfactory.ClientError):
+            with sut.invalidate_cache_on_error([("rule", "demo_detector")]):
+                raise error
+
+        # Assert
+        self.assertIsNone(cache.get("rule", "demo_detector"))
+        sut.get_rule_index("demo_detector")
+        self.assertEqual(2, mock_fraud_detector.get_rules.call_count)
+
+    def test_invalidate_cache_on_error_other_errors(self):
+        # Arrange
+        cache = FraudDetectorMetadataCache()
+        cache.put("model", "ONLINE_FRAUD_INSIGHTS/demo", {"modelId": "demo"})
+        sut = FraudDetectorUtils(fraud_detector_client=MagicMock(), metadata_cache=cache)
+        error = botocore.errorfactory.ClientError(error_response={"Error": {"Code": "ThrottlingException"}},
+                                                  operation_name="CreateModelVersion")
+
+        # Act
+        with self.assertRaises(botocore.errorfactory.ClientError):
+            with sut.invalidate_cache_on_error([("model", "ONLINE_FRAUD_INSIGHTS/demo")]):
+                raise error
+
+        # Assert
+        self.assertEqual({"modelId": "demo"}, cache.get("model", "ONLINE_FRAUD_INSIGHTS/demo"))
+
+    def test_try_create_model_stale_cache(self):
+        """
+        A cached model deleted outside of this run is created again once a call using it has failed
+        :return:
+        """
+        # Arrange
+        cache = FraudDetectorMetadataCache()
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_models.side_effect = botocore.errorfactory.ClientError(
+            error_response={"Error": {"Code": "ResourceNotFoundException"}}, operation_name="GetModels")
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector, metadata_cache=cache)
+        cache.put("model", sut.model_cache_key("ONLINE_FRAUD_INSIGHTS", "demo"), {"modelId": "demo"})
+        error = botocore.errorfactory.ClientError(error_response={"Error": {"Code": "ResourceNotFoundException"}},
+                                                  operation_name="CreateModelVersion")
+
+        # Act
+        with self.assertRaises(botocore.errorfactory.ClientError):
+            with sut.invalidate_cache_on_error([("model", sut.model_cache_key("ONLINE_FRAUD_INSIGHTS", "demo"))]):
+                raise error
+        sut.try_create_model("demo", "ONLINE_FRAUD_INSIGHTS", "Demo model", "demoevent")
+
+        # Assert
+        mock_fraud_detector.create_model.assert_called_once()
+
+    def test_create_or_update_rule_unchanged(self):
+        """
+        A rule with the same expression, outcomes and description as the deployed version is not updated
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_rules.return_value = {
+            "ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "2", "expression": "$score >= 900",
+                             "outcomes": ["positive"], "description": "Positive score"}]}
+        mock_rule = MagicMock()
+        mock_rule.rule_id = "rule_a"
+        mock_rule.get_rule_expression.return_value = "$score >= 900"
+        mock_rule.outcomes = ["positive"]
+        mock_rule.description = "Positive score"
+        mock_rule.get_content_hash.side_effect = functools.partial(DetectorRuleBase.get_content_hash, mock_rule)
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        actual = sut.create_or_update_rule("demo_detector", mock_rule)
+
+        # Assert
+        self.assertEqual({"ruleId": "rule_a", "detectorId": "demo_detector", "ruleVersion": "2"}, actual)
+        mock_fraud_detector.update_rule_version.assert_not_called()
+        mock_fraud_detector.create_rule.assert_not_called()
+
+    def test_create_or_update_rule_content_hash_override(self):
+        """
+        The rule's own content hash decides whether it has changed, so a rule can ignore e.g. cosmetic differences
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_rules.return_value = {
+            "ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "2", "expression": "$score >= 900",
+                             "outcomes": ["positive"], "description": "Positive score"}]}
+        mock_rule = MagicMock()
+        mock_rule.rule_id = "rule_a"
+        mock_rule.get_rule_expression.return_value = "$score  >=  900"
+        mock_rule.get_content_hash.return_value = rule_content_hash("$score >= 900", ["positive"], "Positive score")
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        sut.create_or_update_rule("demo_detector", mock_rule)
+
+        # Assert
+        mock_rule.get_content_hash.assert_called_once_with("$score  >=  900")
+        mock_fraud_detector.update_rule_version.assert_not_called()
+
+    def test_create_or_update_rule_changed_threshold(self):
+        """
+        A rule with a different expression is updated
+        :return:
+        """
+        # Arrange
+        mock_fraud_detector = MagicMock()
+        mock_fraud_detector.get_rules.return_value = {
+            "ruleDetails": [{"ruleId": "rule_a", "ruleVersion": "2", "expression": "$score >= 900",
+                             "outcomes": ["positive"], "description": "Positive score"}]}
+        mock_fraud_detector.update_rule_version.return_value = {"rule": {"ruleVersion": "3"}}
+        mock_rule = MagicMock()
+        mock_rule.rule_id = "rule_a"
+        mock_rule.get_rule_expression.return_value = "$score >= 950"
+        mock_rule.outcomes = ["positive"]
+        mock_rule.description = "Positive score"
+        mock_rule.get_content_hash.side_effect = functools.partial(DetectorRuleBase.get_content_hash, mock_rule)
+        sut = FraudDetectorUtils(fraud_detector_client=mock_fraud_detector)
+
+        # Act
+        actual = sut.create_or_update_rule("demo_detector", mock_rule)
+
+        # Assert
+        self.assertEqual("3", actual["ruleVersion"])
+        mock_fraud_detector.update_rule_version.assert_called_once()
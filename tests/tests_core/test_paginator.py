@@ -0,0 +1,139 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, call
+
+from core.paginator import FraudDetectorPaginator
+
+
+class TestFraudDetectorPaginator(TestCase):
+
+    def setUp(self):
+        self.responses = [
+            {"ruleDetails": [{"ruleId": "rule1"}, {"ruleId": "rule2"}], "nextToken": "page2"},
+            {"ruleDetails": [{"ruleId": "rule3"}], "nextToken": "page3"},
+            {"ruleDetails": []}
+        ]
+
+    def test_iterates_items_of_all_pages(self):
+        """
+        Test the items of every page are returned, passing the next token of the previous page
+        :return:
+        """
+        # Arrange
+        mock_operation = MagicMock(side_effect=self.responses)
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", detectorId="demo")
+
+        # Act
+        actual = [r["ruleId"] for r in sut]
+
+        # Assert
+        self.assertEqual(["rule1", "rule2", "rule3"], actual)
+        mock_operation.assert_has_calls([call(nextToken="", detectorId="demo"),
+                                         call(nextToken="page2", detectorId="demo"),
+                                         call(nextToken="page3", detectorId="demo")])
+
+    def test_iterates_lazily(self):
+        """
+        Test the next page is not fetched until the items of the current page are consumed
+        :return:
+        """
+        # Arrange
+        mock_operation = MagicMock(side_effect=self.responses)
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", detectorId="demo")
+
+        # Act
+        actual = next(iter(sut))
+
+        # Assert
+        self.assertEqual({"ruleId": "rule1"}, actual)
+        self.assertEqual(1, mock_operation.call_count)
+
+    def test_iterates_pages_without_items(self):
+        """
+        Test a page without the result key is treated as a page with no items
+        :return:
+        """
+        # Arrange
+        mock_operation = MagicMock(side_effect=[{"nextToken": "page2"}, self.responses[1], self.responses[2]])
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", detectorId="demo")
+
+        # Act
+        actual = [r["ruleId"] for r in sut]
+
+        # Assert
+        self.assertEqual(["rule3"], actual)
+
+    def test_prefetch_one_page_ahead(self):
+        """
+        Test the background thread fetches the next page while the current one is processed, but no further
+        :return:
+        """
+        # Arrange
+        responses = [{"ruleDetails": [{"ruleId": "rule{}".format(i)}], "nextToken": "page{}".format(i + 1)}
+                     for i in range(5)]
+        mock_operation = MagicMock(side_effect=responses)
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", prefetch=True, detectorId="demo")
+
+        # Act
+        items = iter(sut)
+        actual = next(items)
+        deadline = time.monotonic() + 5
+        while mock_operation.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.2)
+
+        # Assert
+        self.assertEqual({"ruleId": "rule0"}, actual)
+        self.assertEqual(2, mock_operation.call_count)
+        items.close()
+
+    def test_prefetch_iterates_items_of_all_pages(self):
+        """
+        Test prefetching in the background returns the same items in the same order
+        :return:
+        """
+        # Arrange
+        mock_operation = MagicMock(side_effect=self.responses)
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", prefetch=True, detectorId="demo")
+
+        # Act
+        actual = [r["ruleId"] for r in sut]
+
+        # Assert
+        self.assertEqual(["rule1", "rule2", "rule3"], actual)
+        self.assertEqual(3, mock_operation.call_count)
+
+    def test_prefetch_raises_error(self):
+        """
+        Test an error fetching a page in the background is raised to the caller
+        :return:
+        """
+        # Arrange
+        mock_operation = MagicMock(side_effect=[self.responses[0], ValueError("failed")])
+        sut = FraudDetectorPaginator(mock_operation, "ruleDetails", prefetch=True, detectorId="demo")
+
+        # Act
+        actual = []
+        with self.assertRaises(ValueError):
+            for r in sut:
+                actual.append(r["ruleId"])
+
+        # Assert
+        self.assertEqual(["rule1", "rule2"], actual)
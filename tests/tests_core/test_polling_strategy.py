@@ -0,0 +1,55 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from itertools import islice
+from unittest import TestCase
+
+from core.polling_strategy import ExponentialBackoffPolling, FixedIntervalPolling
+
+
+class TestPollingStrategy(TestCase):
+
+    def test_fixed_interval(self):
+        # Arrange
+        sut = FixedIntervalPolling(interval=60)
+
+        # Act
+        actual = list(islice(sut.intervals(), 3))
+
+        # Assert
+        self.assertEqual([60, 60, 60], actual)
+
+    def test_exponential_backoff_no_jitter(self):
+        # Arrange
+        sut = ExponentialBackoffPolling(initial_interval=5, max_interval=30, multiplier=2, jitter=0)
+
+        # Act
+        actual = list(islice(sut.intervals(), 5))
+
+        # Assert
+        self.assertEqual([5, 10, 20, 30, 30], actual)
+
+    def test_exponential_backoff_jitter_within_bounds(self):
+        # Arrange
+        sut = ExponentialBackoffPolling(initial_interval=10, max_interval=1000, multiplier=1, jitter=0.2, seed=1)
+
+        # Act
+        actual = list(islice(sut.intervals(), 100))
+
+        # Assert
+        self.assertTrue(all(8 <= i <= 12 for i in actual))
+        self.assertGreater(len(set(actual)), 1)
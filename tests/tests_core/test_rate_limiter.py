@@ -0,0 +1,121 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import boto3
+from botocore.exceptions import ClientError
+from core.rate_limiter import AdaptiveRateLimiter, RateLimitedClient, TokenBucket
+from tests.tests_core.test_fraud_detector_utils import FakeTime
+
+
+class TestRateLimiter(TestCase):
+
+    def test_token_bucket_burst_then_rate(self):
+        """
+        Test the calls within the burst do not wait, and the calls after it are spread at the rate
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        sut = TokenBucket(rate=2, clock=fake_time.monotonic, sleep=fake_time.sleep)
+
+        # Act
+        for _ in range(4):
+            sut.acquire()
+
+        # Assert
+        self.assertEqual([0.5, 0.5], fake_time.sleeps)
+
+    def test_token_bucket_adapts_rate(self):
+        # Arrange
+        fake_time = FakeTime()
+        sut = TokenBucket(rate=4, min_rate=1, max_rate=5, backoff_factor=0.5, increase_factor=0.25,
+                          clock=fake_time.monotonic, sleep=fake_time.sleep)
+
+        # Act
+        sut.on_throttle()
+        rate_throttled = sut.rate
+        sut.on_throttle()
+        sut.on_throttle()
+        rate_min = sut.rate
+        for _ in range(10):
+            sut.on_success()
+
+        # Assert
+        self.assertEqual(2, rate_throttled)
+        self.assertEqual(1, rate_min)
+        self.assertEqual(5, sut.rate)
+
+    def test_limiter_operation_rates(self):
+        # Arrange
+        sut = AdaptiveRateLimiter(default_rate=5, operation_rates={"create_variable": 2})
+
+        # Act
+        create_variable_rate = sut.bucket("frauddetector", "create_variable").rate
+        get_rules_rate = sut.bucket("frauddetector", "get_rules").rate
+
+        # Assert
+        self.assertEqual(2, create_variable_rate)
+        self.assertEqual(5, get_rules_rate)
+
+    def test_limiter_configure_unknown_setting(self):
+        # Arrange
+        sut = AdaptiveRateLimiter()
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            sut.configure(burst=10)
+
+    def test_rate_limited_client_throttled(self):
+        """
+        Test a client without botocore event hooks takes a token per call and shrinks the rate when throttled
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        rate_limiter = AdaptiveRateLimiter(default_rate=4, clock=fake_time.monotonic, sleep=fake_time.sleep)
+        mock_client = MagicMock(spec=["put_label"])
+        mock_client.put_label.side_effect = ClientError({"Error": {"Code": "ThrottlingException"}}, "PutLabel")
+        sut = RateLimitedClient(mock_client, rate_limiter, "frauddetector")
+
+        # Act
+        with self.assertRaises(ClientError):
+            sut.put_label(name="fraud")
+
+        # Assert
+        self.assertEqual(2, rate_limiter.bucket("frauddetector", "put_label").rate)
+
+    def test_rate_limited_botocore_client(self):
+        """
+        Test a botocore client takes a token before every attempt sent
+        :return:
+        """
+        # Arrange
+        fake_time = FakeTime()
+        rate_limiter = AdaptiveRateLimiter(default_rate=1, clock=fake_time.monotonic, sleep=fake_time.sleep)
+        client = boto3.session.Session(aws_access_key_id="key", aws_secret_access_key="secret",
+                                       region_name="us-east-1").client("frauddetector")
+        RateLimitedClient(client, rate_limiter, "frauddetector")
+
+        # Act
+        for _ in range(3):
+            client.meta.events.emit("before-send.frauddetector.GetRules", request=MagicMock())
+
+        # Assert
+        self.assertEqual([1, 1], fake_time.sleeps)
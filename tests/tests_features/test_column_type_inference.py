@@ -0,0 +1,121 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+from unittest import TestCase
+
+import pandas as pd
+from features.column_type_inference import ColumnTypeInference, ip_address_matches, is_ip_address
+
+
+class TestColumnTypeInference(TestCase):
+
+    def test_infer_null_first_value(self):
+        # Arrange
+        df = pd.DataFrame({"contact": [None] + ["user{}@domain.com".format(i) for i in range(9)]})
+        sut = ColumnTypeInference()
+
+        # Act
+        actual = sut.infer(df)
+
+        # Assert
+        self.assertEqual({"contact": ("EMAIL_ADDRESS", "")}, actual)
+
+    def test_infer_match_rate_threshold(self):
+        """
+        Test a column is only an email column when enough of its values are emails, rather than the first one
+        :return:
+        """
+        # Arrange
+        df = pd.DataFrame({"mostly_emails": ["user{}@domain.com".format(i) for i in range(19)] + ["unknown"],
+                           "first_value": ["user@domain.com"] + ["note {}".format(i) for i in range(19)]})
+        sut = ColumnTypeInference(match_threshold=0.9)
+
+        # Act
+        actual = sut.infer(df)
+
+        # Assert
+        self.assertEqual(("EMAIL_ADDRESS", ""), actual["mostly_emails"])
+        self.assertEqual(("FREE_FORM_TEXT", ""), actual["first_value"])
+
+    def test_infer_ip_numeric_strings_and_categorical(self):
+        # Arrange
+        num_rows = 200
+        df = pd.DataFrame({"location": ["10.0.{}.{}".format(i % 256, i % 7) for i in range(num_rows)],
+                           "amount_text": [str(i * 1.5) for i in range(num_rows)],
+                           "payment_type": ["CC", "CASH", "EFTPOS", "CASH"] * (num_rows // 4),
+                           "is_new": [True, False] * (num_rows // 2)})
+        sut = ColumnTypeInference()
+
+        # Act
+        actual = sut.infer(df)
+
+        # Assert
+        self.assertEqual(("IP_ADDRESS", ""), actual["location"])
+        self.assertEqual(("NUMERIC", 0.0), actual["amount_text"])
+        self.assertEqual(("CATEGORICAL", ""), actual["payment_type"])
+        self.assertEqual(("FREE_FORM_TEXT", ""), actual["is_new"])
+
+    def test_infer_ip_not_times_or_mac_addresses(self):
+        """
+        Test times and MAC addresses, which have colons like IPv6 addresses, are not inferred as ip addresses
+        :return:
+        """
+        # Arrange
+        num_rows = 200
+        df = pd.DataFrame({"event_time": ["{:02d}:{:02d}:00".format(i % 24, i % 60) for i in range(num_rows)],
+                           "device": ["aa:bb:cc:dd:{:02x}:{:02x}".format(i % 256, i % 7) for i in range(num_rows)],
+                           "source": ["2001:db8::{:x}".format(i) for i in range(num_rows)],
+                           "gateway": ["300.1.1.{}".format(i) for i in range(num_rows)]})
+        sut = ColumnTypeInference()
+
+        # Act
+        actual = sut.infer(df)
+
+        # Assert
+        self.assertEqual(("FREE_FORM_TEXT", ""), actual["event_time"])
+        self.assertEqual(("FREE_FORM_TEXT", ""), actual["device"])
+        self.assertEqual(("IP_ADDRESS", ""), actual["source"])
+        self.assertEqual(("FREE_FORM_TEXT", ""), actual["gateway"])
+
+    def test_ip_address_matches(self):
+        # Arrange
+        values = pd.Series(["10.0.0.1", "256.0.0.1", "2001:db8::1", "10:15:00", "aa:bb:cc:dd:ee:ff", "::1", "text"],
+                           dtype=object)
+
+        # Act
+        actual = ip_address_matches(values)
+
+        # Assert
+        self.assertEqual([True, False, True, False, False, True, False], actual.tolist())
+        self.assertEqual([is_ip_address(v) for v in values], actual.tolist())
+
+    def test_infer_sampled_mostly_null_column(self):
+        """
+        Test a sparse column is inferred from its non null values, even when the sampled rows are mostly null
+        :return:
+        """
+        # Arrange
+        values = [None] * 5000
+        values[::100] = ["user{}@domain.com".format(i) for i in range(50)]
+        df = pd.DataFrame({"contact": values})
+        sut = ColumnTypeInference(type_sample_size=100)
+
+        # Act
+        actual = sut.infer(df)
+
+        # Assert
+        self.assertEqual(("EMAIL_ADDRESS", ""), actual["contact"])
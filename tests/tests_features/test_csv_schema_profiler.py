@@ -0,0 +1,236 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import io
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from features.column_type_inference import ColumnTypeInference
+from features.csv_schema_profiler import CsvSchemaProfiler, SchemaProfile
+from features.feature_variables_dynamic import FeatureVariablesDynamic
+from features.sketches import HyperLogLog
+
+
+def _to_csv(df):
+    return io.StringIO(df.to_csv(index=False))
+
+
+class TestCsvSchemaProfiler(TestCase):
+
+    def test_profile_chunks(self):
+        """
+        Test the statistics are accumulated across all the chunks, and the types chosen over the whole file rather
+        than the first chunk
+        :return:
+        """
+        # Arrange
+        num_rows = 1000
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(num_rows)],
+                           "ip": ["10.0.{}.{}".format(i % 256, i % 7) for i in range(num_rows)],
+                           "amount": [i * 1.5 for i in range(num_rows)],
+                           "payment_type": ["CC", "CASH", "EFTPOS", "CASH"] * (num_rows // 4),
+                           # Numeric in the first chunks, text afterwards
+                           "notes": [str(i) for i in range(500)] + ["note {}".format(i) for i in range(500)],
+                           "EVENT_LABEL": [1] + [0] * (num_rows - 1)})
+        sut = CsvSchemaProfiler(chunk_size=100, reservoir_size=10)
+
+        # Act
+        actual = sut.profile(_to_csv(df))
+
+        # Assert
+        self.assertEqual(num_rows, actual.num_rows)
+        self.assertEqual({"1": 1, "0": num_rows - 1}, dict(actual.label_counts))
+        self.assertEqual(list(df.columns), list(actual.columns))
+        self.assertEqual({"email": ("EMAIL_ADDRESS", ""),
+                          "ip": ("IP_ADDRESS", ""),
+                          "amount": ("NUMERIC", 0.0),
+                          "payment_type": ("CATEGORICAL", ""),
+                          "notes": ("FREE_FORM_TEXT", "")},
+                         actual.variable_types(columns=["email", "ip", "amount", "payment_type", "notes"]))
+        self.assertEqual(10, len(actual.columns["amount"].sample))
+
+    def test_profile_nulls(self):
+        # Arrange
+        values = [None] * 1000
+        values[::10] = ["user{}@domain.com".format(i) for i in range(100)]
+        df = pd.DataFrame({"contact": values, "EVENT_LABEL": [0] * 1000})
+        sut = CsvSchemaProfiler(chunk_size=128)
+
+        # Act
+        actual = sut.profile(_to_csv(df)).columns["contact"]
+
+        # Assert
+        self.assertEqual(1000, actual.count)
+        self.assertEqual(900, actual.null_count)
+        self.assertEqual(1.0, actual.rate(actual.email_matches))
+
+    def test_profile_distinct_count(self):
+        # Arrange
+        num_rows = 20000
+        df = pd.DataFrame({"id": ["id{}".format(i) for i in range(num_rows)]})
+        sut = CsvSchemaProfiler(chunk_size=3000, match_sample_size=100)
+
+        # Act
+        actual = sut.profile(_to_csv(df)).columns["id"]
+
+        # Assert
+        self.assertAlmostEqual(num_rows, actual.distinct, delta=num_rows * 0.05)
+        self.assertEqual(0.0, actual.rate(actual.numeric_matches))
+
+    def test_profile_statistics(self):
+        """
+        Test the null rate, top k frequencies and min / max are accumulated across the chunks
+        :return:
+        """
+        # Arrange
+        df = pd.DataFrame({"payment_type": (["CC"] * 5 + ["CASH"] * 3 + ["EFTPOS", None]) * 100,
+                           "amount_text": [str(i - 500) for i in range(1000)],
+                           "quantity": [i % 7 for i in range(1000)]})
+        sut = CsvSchemaProfiler(chunk_size=64, top_k=2)
+
+        # Act
+        actual = sut.profile(_to_csv(df)).columns
+
+        # Assert
+        self.assertEqual(0.1, actual["payment_type"].null_rate)
+        self.assertEqual([("CC", 500), ("CASH", 300)], actual["payment_type"].most_frequent)
+        self.assertEqual((-500.0, 499.0), (actual["amount_text"].min, actual["amount_text"].max))
+        self.assertEqual((0.0, 6.0), (actual["quantity"].min, actual["quantity"].max))
+        self.assertEqual(("CATEGORICAL", ""), actual["payment_type"].variable_type(ColumnTypeInference()))
+        self.assertEqual(("NUMERIC", 0.0), actual["amount_text"].variable_type(ColumnTypeInference()))
+
+    def test_profile_ip_not_mac_addresses(self):
+        # Arrange
+        df = pd.DataFrame({"device": ["aa:bb:cc:dd:ee:{:02x}".format(i) for i in range(100)],
+                           "source": ["2001:db8::{:x}".format(i) for i in range(100)]})
+        sut = CsvSchemaProfiler()
+
+        # Act
+        actual = sut.profile(_to_csv(df)).columns
+
+        # Assert
+        self.assertEqual(0.0, actual["device"].rate(actual["device"].ip_matches))
+        self.assertEqual(1.0, actual["source"].rate(actual["source"].ip_matches))
+
+    def test_profile_dataframe_category(self):
+        # Arrange
+        df = pd.DataFrame({"country": pd.Categorical(["AU", "NZ"] * 10)})
+        sut = CsvSchemaProfiler()
+
+        # Act
+        actual = sut.profile_chunks([df])
+
+        # Assert
+        self.assertEqual({"country": ("CATEGORICAL", "")}, actual.variable_types())
+
+    def test_write_and_read_json(self):
+        # Arrange
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(100)],
+                           "amount": [i * 1.5 for i in range(100)],
+                           "EVENT_LABEL": [1, 0, 0, 0] * 25})
+        profile = CsvSchemaProfiler(chunk_size=30).profile(_to_csv(df))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "schema_profile.json")
+
+            # Act
+            profile.write_json(path)
+            actual = SchemaProfile.read_json(path)
+
+        # Assert
+        self.assertEqual(profile.to_dict(), actual.to_dict())
+        self.assertEqual(profile.variable_types(), actual.variable_types())
+        self.assertEqual({"1": 25, "0": 75}, dict(actual.label_counts))
+
+    def test_profile_process_pool(self):
+        """
+        Test the columns profiled in a process pool, each process reading its own columns, give exactly the same
+        profile as profiled in process
+        :return:
+        """
+        # Arrange
+        num_rows = 2000
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(num_rows)],
+                           "amount": [i * 1.5 if i % 10 else None for i in range(num_rows)],
+                           "city": ["Zürich", "東京", "Sydney", None] * (num_rows // 4),
+                           "is_new": [True, False] * (num_rows // 2),
+                           "EVENT_LABEL": [1, 0, 0, 0] * (num_rows // 4)})
+        serial = CsvSchemaProfiler(chunk_size=300, reservoir_size=20)
+        sut = CsvSchemaProfiler(chunk_size=300, reservoir_size=20, max_workers=2)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "data.csv")
+            df.to_csv(path, index=False)
+
+            # Act
+            actual = sut.profile(path)
+
+            # Assert
+            expected = serial.profile(path)
+        self.assertEqual(expected.to_dict(), actual.to_dict())
+        self.assertEqual(list(df.columns), list(actual.columns))
+        self.assertEqual({"1": 500, "0": 1500}, dict(actual.label_counts))
+        self.assertEqual(200, actual.columns["amount"].null_count)
+        self.assertEqual(("CATEGORICAL", ""), actual.variable_types(columns=["city"])["city"])
+
+    def test_profile_process_pool_file_object(self):
+        # Arrange
+        df = pd.DataFrame({"amount": [i * 1.5 for i in range(100)], "EVENT_LABEL": [1, 0, 0, 0] * 25})
+        sut = CsvSchemaProfiler(chunk_size=30, max_workers=2)
+
+        # Act
+        actual = sut.profile(_to_csv(df))
+
+        # Assert
+        self.assertEqual(CsvSchemaProfiler(chunk_size=30).profile(_to_csv(df)).to_dict(), actual.to_dict())
+
+    def test_hyperloglog_merge(self):
+        # Arrange
+        left = HyperLogLog()
+        right = HyperLogLog()
+        left.add(np.arange(0, 6000))
+        right.add(np.arange(4000, 10000))
+
+        # Act
+        left.merge(right)
+
+        # Assert
+        self.assertAlmostEqual(10000, left.estimate(), delta=500)
+
+    def test_feature_variables_from_csv(self):
+        # Arrange
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(300)],
+                           "amount": [i * 1.5 for i in range(300)],
+                           "EVENT_TIMESTAMP": ["2021-01-01T00:00:00Z"] * 300,
+                           "EVENT_LABEL": ["1", "0", "0"] * 100})
+        mock_utils = MagicMock()
+        sut = FeatureVariablesDynamic.from_csv(_to_csv(df), true_labels=[1], chunk_size=50,
+                                               fraud_detector_utils=mock_utils)
+
+        # Act
+        features = sut.create_or_retrieve_features()
+        labels = sut.create_or_retrieve_label()
+
+        # Assert
+        self.assertEqual(["email", "amount"], features)
+        variables = mock_utils.try_create_variables.call_args[0][0]
+        self.assertEqual(["EMAIL_ADDRESS", "NUMERIC"], [v["variableType"] for v in variables])
+        self.assertEqual({"FRAUD": ["1"], "LEGIT": ["0"]}, labels)
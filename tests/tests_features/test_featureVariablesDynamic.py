@@ -15,6 +15,8 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
 # ***************************************************************************************
 
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock
 
@@ -51,9 +53,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(email_field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": email_field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_email_field_value(self):
         # Arrange
@@ -79,9 +83,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(email_field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": email_field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_ip_field_value(self):
         # Arrange
@@ -108,9 +114,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_custom_numeric(self):
         # Arrange
@@ -135,9 +143,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_custom_categorical(self):
         # Arrange
@@ -166,9 +176,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_custom_generic(self):
         # Arrange
@@ -195,9 +207,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_custom_override(self):
         # Arrange
@@ -224,9 +238,11 @@ class TestFeatureVariablesDynamic(TestCase):
         sut.create_or_retrieve_features()
 
         # Assert
-        mock_fraud_detector_utils.try_create_variable.assert_called_with(field_name, expected_var_type,
-                                                                         expected_data_type, default, desc
-                                                                         )
+        mock_fraud_detector_utils.try_create_variables.assert_called_with([{"name": field_name,
+                                                                             "variableType": expected_var_type,
+                                                                             "dataType": expected_data_type,
+                                                                             "defaultValue": default,
+                                                                             "description": desc}])
 
     def test_create_or_retrieve_features_return_variable_names(self):
         # Arrange
@@ -271,5 +287,62 @@ class TestFeatureVariablesDynamic(TestCase):
         actual = sut.create_or_retrieve_label()
 
         # Assert
-        mock_fraud_detector_utils.create_or_update_label.assert_called_with('0', "Legit flag")
+        mock_fraud_detector_utils.try_create_labels.assert_called_once_with({"1": "Fraud flag", "0": "Legit flag"})
         self.assertEqual(expected, actual)
+
+    def test_write_and_reuse_schema_profile(self):
+        """
+        Test the schema profile written by one run creates the same variables and labels in the next
+        :return:
+        """
+        # Arrange
+        df = pd.DataFrame({"customer_contact": ["user{}@domain.com".format(i) for i in range(100)],
+                           "payment_type": ["CC", "CASH"] * 50,
+                           "EVENT_LABEL": [0, 0, 0, 1] * 25})
+        mock_fraud_detector_utils = MagicMock()
+        profiled = FeatureVariablesDynamic(df, true_labels=[1], fraud_detector_utils=mock_fraud_detector_utils)
+        features = profiled.create_or_retrieve_features()
+        labels = profiled.create_or_retrieve_label()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "schema_profile.json")
+            profiled.write_schema_profile(path)
+
+            # Act
+            sut = FeatureVariablesDynamic.from_schema_profile_json(path, true_labels=[1],
+                                                                   fraud_detector_utils=mock_fraud_detector_utils)
+            actual_features = sut.create_or_retrieve_features()
+            actual_labels = sut.create_or_retrieve_label()
+
+        # Assert
+        self.assertEqual(sorted(features), sorted(actual_features))
+        self.assertEqual(labels, actual_labels)
+        variables = mock_fraud_detector_utils.try_create_variables.call_args[0][0]
+        variables = {v["name"]: v["variableType"] for v in variables}
+        self.assertEqual({"customer_contact": "EMAIL_ADDRESS", "payment_type": "CATEGORICAL"}, variables)
+
+    def test_provisioned_once_until_invalidated(self):
+        """
+        Test the variables and labels are provisioned once, however many times they are retrieved, until invalidated
+        :return:
+        """
+        # Arrange
+        df = pd.DataFrame({"customer_contact": ["user{}@domain.com".format(i) for i in range(10)],
+                           "EVENT_LABEL": [0, 1] * 5})
+        mock_fraud_detector_utils = MagicMock()
+        sut = FeatureVariablesDynamic(df, true_labels=[1], fraud_detector_utils=mock_fraud_detector_utils)
+
+        # Act
+        first_features = sut.create_or_retrieve_features()
+        first_labels = sut.create_or_retrieve_label()
+        second_features = sut.create_or_retrieve_features()
+        second_labels = sut.create_or_retrieve_label()
+        sut.invalidate()
+        sut.create_or_retrieve_features()
+        sut.create_or_retrieve_label()
+
+        # Assert
+        self.assertEqual(first_features, second_features)
+        self.assertEqual(first_labels, second_labels)
+        self.assertEqual(2, mock_fraud_detector_utils.try_create_variables.call_count)
+        self.assertEqual(2, mock_fraud_detector_utils.try_create_labels.call_count)
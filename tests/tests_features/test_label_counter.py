@@ -0,0 +1,49 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import io
+from unittest import TestCase
+
+import pandas as pd
+from features.label_counter import LabelCounter
+
+
+class TestLabelCounter(TestCase):
+
+    def test_from_csv(self):
+        # Arrange
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(100)],
+                           "EVENT_LABEL": [1, 0, 0, 0, None] * 20})
+
+        # Act
+        actual = LabelCounter.from_csv(io.StringIO(df.to_csv(index=False)), chunk_size=7)
+
+        # Assert
+        self.assertEqual({"1": 20, "0": 60}, dict(actual.counts))
+        self.assertEqual(["0", "1"], actual.labels)
+        self.assertEqual(0.25, actual.class_balance([1]))
+
+    def test_update_chunks(self):
+        # Arrange
+        sut = LabelCounter()
+
+        # Act
+        sut.update(pd.DataFrame({"EVENT_LABEL": ["fraud", "legit"]}))
+        sut.update(pd.Series(["legit", "legit"]))
+
+        # Assert
+        self.assertEqual({"fraud": 1, "legit": 3}, dict(sut.counts))
@@ -0,0 +1,85 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas as pd
+from features import parquet_schema_profiler
+from features.column_type_inference import ColumnTypeInference
+from features.csv_schema_profiler import ColumnProfile
+from features.parquet_schema_profiler import ParquetSchemaProfiler
+
+
+class TestParquetSchemaProfiler(TestCase):
+
+    def test_profile(self):
+        """
+        Test the numeric columns are typed from the schema and statistics, and only the string columns are read
+        :return:
+        """
+        # Arrange
+        num_rows = 1000
+        df = pd.DataFrame({"email": ["user{}@domain.com".format(i) for i in range(num_rows)],
+                           "amount": [i * 1.5 if i % 10 else None for i in range(num_rows)],
+                           "payment_type": pd.Categorical(["CC", "CASH"] * (num_rows // 2)),
+                           "EVENT_LABEL": [1, 0, 0, 0] * (num_rows // 4)})
+        sut = ParquetSchemaProfiler(sample_rows=200)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "train.parquet")
+            df.to_parquet(path, row_group_size=100)
+
+            # Act
+            with patch.object(ColumnProfile, "update", autospec=True,
+                              side_effect=ColumnProfile.update) as mock_update:
+                actual = sut.profile(path)
+
+        # Assert
+        self.assertEqual(["email"], [c[0][1].name for c in mock_update.call_args_list])
+        self.assertEqual(200, actual.columns["email"].count)
+        self.assertEqual((num_rows, 100), (actual.columns["amount"].count, actual.columns["amount"].null_count))
+        self.assertEqual((1.5, 1498.5), (actual.columns["amount"].min, actual.columns["amount"].max))
+        self.assertEqual({"email": ("EMAIL_ADDRESS", ""), "amount": ("NUMERIC", 0.0),
+                          "payment_type": ("CATEGORICAL", "")},
+                         actual.variable_types(columns=["email", "amount", "payment_type"]))
+        self.assertEqual({"1": 250, "0": 750}, dict(actual.label_counts))
+
+    def test_profile_without_pyarrow(self):
+        # Arrange
+        sut = ParquetSchemaProfiler()
+
+        # Act / Assert
+        with patch.object(parquet_schema_profiler, "pyarrow", None):
+            with self.assertRaises(ImportError):
+                sut.profile("train.parquet")
+
+    def test_column_profile_from_statistics(self):
+        # Arrange
+        sut = ColumnProfile("amount")
+
+        # Act
+        sut.update_from_statistics(100, 10, "numeric", 1.0, 5.0)
+        sut.update_from_statistics(50, 0, "numeric", 0.5, 2.0)
+
+        # Assert
+        self.assertEqual((150, 10), (sut.count, sut.null_count))
+        self.assertEqual((0.5, 5.0), (sut.min, sut.max))
+        self.assertIsNone(sut.distinct)
+        self.assertEqual(("NUMERIC", 0.0), sut.variable_type(ColumnTypeInference()))
@@ -0,0 +1,150 @@
+# ***************************************************************************************
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.                    *
+#                                                                                       *
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this  *
+# software and associated documentation files (the "Software"), to deal in the Software *
+# without restriction, including without limitation the rights to use, copy, modify,    *
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to    *
+# permit persons to whom the Software is furnished to do so.                            *
+#                                                                                       *
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,   *
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A         *
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT    *
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION     *
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE        *
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.                                *
+# ***************************************************************************************
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import pandas as pd
+from features.ranged_sample_reader import RangedSampleReader, S3ObjectStore
+
+
+class TestRangedSampleReader(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        num_rows = 5000
+        self.df = pd.DataFrame({"id": range(num_rows),
+                                "email": ["user{}@domain.com".format(i) for i in range(num_rows)],
+                                "amount": [i * 1.5 for i in range(num_rows)],
+                                "EVENT_LABEL": [1 if i % 50 == 0 else 0 for i in range(num_rows)]})
+        self.path = os.path.join(self.temp_dir.name, "train.csv")
+        self.df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_chunks_realigned(self):
+        """
+        Test only the head and the random ranges are read, and each is realigned to whole records
+        :return:
+        """
+        # Arrange
+        sut = RangedSampleReader(head_bytes=1000, num_ranges=3, range_bytes=500)
+
+        # Act
+        actual = list(sut.read_chunks("file://" + self.path))
+
+        # Assert
+        self.assertEqual(4, len(actual))
+        sample = pd.concat(actual)
+        self.assertLess(len(sample), len(self.df) / 10)
+        self.assertEqual(list(self.df.columns), list(sample.columns))
+        # Every row is a whole record of the file
+        expected = self.df.set_index("id").loc[sample["id"]]
+        self.assertEqual(list(expected["email"]), list(sample["email"]))
+        self.assertEqual(list(expected["amount"]), list(sample["amount"]))
+        # The random ranges are after the head
+        self.assertGreater(sample["id"].max(), actual[0]["id"].max())
+
+    def test_read_chunks_small_file(self):
+        # Arrange
+        sut = RangedSampleReader()
+
+        # Act
+        actual = pd.concat(sut.read_chunks(self.path))
+
+        # Assert
+        self.assertEqual(list(self.df["id"]), list(actual["id"]))
+
+    def test_read_chunks_skips_bad_lines(self):
+        # Arrange
+        with open(self.path, "a") as f:
+            f.write("1,too,many,fields,here\n")
+        sut = RangedSampleReader()
+
+        # Act
+        actual = pd.concat(sut.read_chunks(self.path))
+
+        # Assert
+        self.assertEqual(list(self.df["id"]), list(actual["id"]))
+
+    def test_read_chunks_directory(self):
+        # Arrange
+        self.df.head(10).to_csv(os.path.join(self.temp_dir.name, "more.csv"), index=False)
+        sut = RangedSampleReader(head_bytes=1000, num_ranges=1, range_bytes=500)
+
+        # Act
+        actual = list(sut.read_chunks("file://" + self.temp_dir.name))
+
+        # Assert
+        self.assertEqual(3, len(actual))
+        self.assertEqual(list(range(10)), list(actual[0]["id"]))
+
+    def test_profile(self):
+        # Arrange
+        sut = RangedSampleReader(head_bytes=2000, num_ranges=2, range_bytes=1000)
+
+        # Act
+        actual = sut.profile("file://" + self.path)
+
+        # Assert
+        self.assertEqual(("EMAIL_ADDRESS", ""), actual.variable_types(columns=["email"])["email"])
+        self.assertEqual({"0", "1"}, set(actual.label_counts))
+
+    def test_unsupported_uri(self):
+        # Arrange
+        sut = RangedSampleReader()
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            list(sut.read_chunks("https://example.com/train.csv"))
+
+
+class TestS3ObjectStore(TestCase):
+
+    def test_read_range(self):
+        # Arrange
+        mock_client = MagicMock()
+        mock_client.get_object.return_value = {"Body": MagicMock(read=MagicMock(return_value=b"data"))}
+        sut = S3ObjectStore(client=mock_client)
+
+        # Act
+        actual = sut.read_range("s3://mybucket/fraud-demo/train.csv", 100, 200)
+
+        # Assert
+        self.assertEqual(b"data", actual)
+        mock_client.get_object.assert_called_once_with(Bucket="mybucket", Key="fraud-demo/train.csv",
+                                                       Range="bytes=100-199")
+
+    def test_list_objects_prefix(self):
+        # Arrange
+        mock_client = MagicMock()
+        mock_client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "fraud-demo/", "Size": 0}, {"Key": "fraud-demo/part1.csv", "Size": 10}]},
+            {"Contents": [{"Key": "fraud-demo/part2.csv", "Size": 20}]}]
+        sut = S3ObjectStore(client=mock_client)
+
+        # Act
+        actual = sut.list_objects("s3://mybucket/fraud-demo/")
+
+        # Assert
+        self.assertEqual([("s3://mybucket/fraud-demo/part1.csv", 10), ("s3://mybucket/fraud-demo/part2.csv", 20)],
+                         actual)
+        mock_client.get_paginator.return_value.paginate.assert_called_once_with(Bucket="mybucket",
+                                                                                Prefix="fraud-demo/")